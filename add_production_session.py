@@ -1,159 +1,153 @@
 #!/usr/bin/env python3
 """
-Add production session reels for a specific gamer from today (UTC)
+Add production session reels to the demo
+
+Fetches production video stories for one or more gamers over a day or a
+date range (UTC), groups them into sessions and adds them to the demo
+stories (story store, exported to demo_stories.json) with their videos and
+thumbnails.
 """
+import argparse
 import json
 import os
-import subprocess
-import boto3
-from datetime import datetime, timezone
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, timedelta
 from pathlib import Path
 
+from aws_clients import get_client
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from media_jobs import build_media, default_workers
+from sessions import DEFAULT_GAP_SECONDS, sessionize, story_partition
+from story_ids import make_story_id
+from s3_downloads import DEFAULT_TRANSFER_CONFIG, DownloadProgress, download_one
+from story_lookup import query_gamer_day
+from story_store import DEFAULT_DB, StoryStore
 
-def get_production_stories(gamer_id, date_str):
-    """Fetch stories from production for a specific gamer and date"""
-    print(f"🔍 Fetching production stories for {gamer_id} from {date_str}...")
-    
-    # Load resources to get production bucket info
+DEFAULT_GAMER = "G#45831fea-23d9-4bba-8638-df82680f97cc"
+# Nov 24, 2025 (when the videos were recorded)
+DEFAULT_DATE = "2025-11-24"
+DEFAULT_QUERY_WORKERS = 8
+DEFAULT_DOWNLOAD_WORKERS = 8
+
+
+def date_range(start_date, end_date=None):
+    """All YYYY-MM-DD days from start_date through end_date (inclusive)"""
+    first = date.fromisoformat(start_date)
+    last = date.fromisoformat(end_date) if end_date else first
+    if last < first:
+        raise ValueError(f"End date {end_date} is before start date {start_date}")
+    return [(first + timedelta(days=i)).isoformat() for i in range((last - first).days + 1)]
+
+
+def load_gamers(gamer_args, gamers_file=None):
+    """
+    Gamer IDs from the CLI and/or a file (JSON list, or one ID per line)
+
+    IDs may be given with or without the 'G#' prefix; duplicates are dropped.
+    """
+    gamers = list(gamer_args or [])
+    if gamers_file:
+        with open(gamers_file, 'r') as f:
+            content = f.read()
+        try:
+            gamers.extend(json.loads(content))
+        except json.JSONDecodeError:
+            gamers.extend(line.strip() for line in content.splitlines()
+                          if line.strip() and not line.startswith('#'))
+    return list(dict.fromkeys(g if g.startswith('G#') else f'G#{g}' for g in gamers))
+
+
+def normalize_production_item(item, gamer):
+    """Production VideoStory item -> story in the common format (None for other types)"""
+    if item.get('type') != 'VideoStory':
+        return None
+    story = dict(item)
+    story['_normalized'] = True
+    story['_timestamp'] = story.get('timestamp', '')
+    story['_video_url'] = story.get('video_url', '')
+    story['_thumbnail_url'] = story.get('thumbnail_url', '')
+    story['_gamer'] = gamer
+    story['_stage'] = 'prod'
+    story['_session_start'] = story.get('session_start', '')
+    story['_session_end'] = story.get('session_end', '')
+    return story
+
+
+def get_production_stories(gamer_ids, dates, workers=DEFAULT_QUERY_WORKERS, endpoint_url=None):
+    """
+    Fetch production video stories for gamers over a set of days
+
+    One GSI1 query task per (gamer, day), each fully paginated, run
+    concurrently on a shared DynamoDB client (prod profile).
+
+    Args:
+        gamer_ids: Gamer IDs ('G#...' or bare UUIDs), or a single ID
+        dates: Days as YYYY-MM-DD, or a single day
+        workers: Concurrent queries
+        endpoint_url: Optional DynamoDB endpoint override (e.g. a local stand-in)
+
+    Returns:
+        list: Normalized video stories, ordered by gamer, day, then GSI1SK
+    """
+    if isinstance(gamer_ids, str):
+        gamer_ids = [gamer_ids]
+    if isinstance(dates, str):
+        dates = [dates]
+    gamers = load_gamers(gamer_ids)
+
+    # Load resources to get production table info
     with open('resources.json', 'r') as f:
         resources = json.load(f)
-    
+
     if 'prod' not in resources.get('stages', {}):
         print("❌ Production stage not found in resources.json")
         return []
-    
+
     stage_config = resources['stages']['prod']
     table_name = stage_config.get('dynamodb_table', 'GGEventsTable-prod')
     region = stage_config.get('region', 'us-east-1')
-    
+
+    tasks = [(gamer, day) for gamer in gamers for day in dates]
+    print(f"🔍 Fetching production stories: {len(gamers)} gamer(s) × {len(dates)} day(s) "
+          f"= {len(tasks)} GSI1 queries")
     print(f"   Table: {table_name}")
     print(f"   Region: {region}")
-    
-    # Query DynamoDB for this gamer's stories from today
-    # Use AWS_PROFILE=prod for production access
-    session = boto3.Session(profile_name='prod')
-    dynamodb = session.client('dynamodb', region_name=region)
-    
-    # Format gamer ID for query
-    gsi1pk = gamer_id if gamer_id.startswith('G#') else f'G#{gamer_id}'
-    
-    try:
-        # Query using GSI1 (gamer index)
-        # Production GSI1SK format for VideoStory is V#{timestamp}
-        date_start = f"V#{date_str}T00:00:00.000Z"
-        date_end = f"V#{date_str}T23:59:59.999Z"
-        
-        print(f"   Querying GSI1 for {gsi1pk} between {date_start} and {date_end}...")
-        
-        response = dynamodb.query(
-            TableName=table_name,
-            IndexName='GSI1',
-            KeyConditionExpression='GSI1PK = :gamer AND GSI1SK BETWEEN :start AND :end',
-            ExpressionAttributeValues={
-                ':gamer': {'S': gsi1pk},
-                ':start': {'S': date_start},
-                ':end': {'S': date_end}
-            }
-        )
-        
-        items = response.get('Items', [])
-        print(f"✅ Found {len(items)} items")
-        
-        # Convert DynamoDB items to regular dict
-        stories = []
-        for item in items:
-            story = {}
-            for key, value in item.items():
-                # Extract value from DynamoDB format
-                if 'S' in value:
-                    story[key] = value['S']
-                elif 'N' in value:
-                    story[key] = value['N']
-                elif 'BOOL' in value:
-                    story[key] = value['BOOL']
-                elif 'L' in value:
-                    story[key] = [v.get('S', '') for v in value['L']]
-            
-            # Only include video stories
-            if story.get('type') == 'VideoStory':
-                # Normalize to common format
-                story['_normalized'] = True
-                story['_timestamp'] = story.get('timestamp', '')
-                story['_video_url'] = story.get('video_url', '')
-                story['_thumbnail_url'] = story.get('thumbnail_url', '')
-                story['_gamer'] = gsi1pk
-                story['_stage'] = 'prod'
-                story['_session_start'] = story.get('session_start', '')
-                story['_session_end'] = story.get('session_end', '')
-                stories.append(story)
-        
-        print(f"✅ Found {len(stories)} video stories")
-        return stories
-        
-    except Exception as e:
-        print(f"❌ Error querying DynamoDB: {e}")
-        import traceback
-        traceback.print_exc()
-        return []
 
+    # Use AWS_PROFILE=prod for production access; one client shared by all workers
+    dynamodb = get_client('dynamodb', region, 'prod', endpoint_url=endpoint_url)
 
-def group_into_sessions(stories):
-    """Group stories into sessions based on start/end times or time proximity"""
-    from collections import defaultdict
-    from datetime import datetime, timedelta
-    
-    # Group by session
-    sessions = defaultdict(list)
-    
-    for story in stories:
-        session_start = story.get('_session_start', story.get('start', ''))
-        session_end = story.get('_session_end', story.get('end', ''))
-        
-        if session_start and session_end:
-            session_key = (session_start, session_end)
-        else:
-            # Use timestamp as session key
-            timestamp = story.get('_timestamp', story.get('start', ''))
-            session_key = (timestamp, timestamp)
-        
-        sessions[session_key].append(story)
-    
-    # Merge sessions that overlap or are within 10 minutes
-    merged = []
-    for session_key, session_stories in sessions.items():
-        # Sort stories by timestamp
-        session_stories.sort(key=lambda s: s.get('_timestamp', s.get('start', '')))
-        
-        # Find or create merged session
-        added = False
-        for merged_session in merged:
-            merged_start = merged_session['start']
-            merged_end = merged_session['end']
-            
-            # Check if this session overlaps or is close
-            start_dt = datetime.fromisoformat(session_key[0].replace('Z', '+00:00'))
-            end_dt = datetime.fromisoformat(session_key[1].replace('Z', '+00:00'))
-            merged_start_dt = datetime.fromisoformat(merged_start.replace('Z', '+00:00'))
-            merged_end_dt = datetime.fromisoformat(merged_end.replace('Z', '+00:00'))
-            
-            # Within 10 minutes or overlapping
-            if (abs((start_dt - merged_end_dt).total_seconds()) <= 600 or
-                abs((end_dt - merged_start_dt).total_seconds()) <= 600 or
-                (start_dt <= merged_end_dt and end_dt >= merged_start_dt)):
-                merged_session['stories'].extend(session_stories)
-                merged_session['start'] = min(merged_start, session_key[0])
-                merged_session['end'] = max(merged_end, session_key[1])
-                added = True
-                break
-        
-        if not added:
-            merged.append({
-                'start': session_key[0],
-                'end': session_key[1],
-                'stories': session_stories
-            })
-    
-    return merged
+    def query(task):
+        gamer, day = task
+        try:
+            # Production GSI1SK format for VideoStory is V#{timestamp}
+            return task, query_gamer_day(dynamodb, table_name, gamer, day), None
+        except Exception as e:
+            return task, [], e
+
+    stories = []
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # map() keeps task order, so the output is deterministic
+        for (gamer, day), items, error in executor.map(query, tasks):
+            if error is not None:
+                print(f"   ❌ {gamer} on {day}: {error}")
+                failed += 1
+                continue
+            found = [story for story in (normalize_production_item(item, gamer) for item in items) if story]
+            if found:
+                print(f"   ✅ {gamer} on {day}: {len(found)} video stories ({len(items)} items)")
+            stories.extend(found)
+
+    print(f"✅ Found {len(stories)} video stories")
+    if failed:
+        print(f"⚠️  {failed}/{len(tasks)} queries failed")
+    return stories
+
+
+def group_into_sessions(stories, gap_seconds=DEFAULT_GAP_SECONDS):
+    """Group each gamer's stories into sessions of overlapping intervals or ones within 10 minutes (see sessions.py)"""
+    return sessionize(stories, gap_seconds, partition=story_partition)
 
 
 def format_story_for_demo(story, demo_id):
@@ -162,13 +156,9 @@ def format_story_for_demo(story, demo_id):
     gamer = story.get('_gamer', story.get('GSI1PK', ''))
     timestamp = story.get('_timestamp', story.get('start', ''))
     
-    # Create story ID
-    gamer_formatted = gamer.replace('G#', 'G_')
-    story_id = f"prod_{gamer_formatted}_{timestamp.replace(':', '_').replace('.', '_')}"
-    
     return {
         'demo_id': demo_id,
-        'original_story_id': story_id,
+        'original_story_id': make_story_id('prod', gamer, timestamp),
         'video_file': f"{demo_id}.mp4",
         'thumbnail_file': f"{demo_id}.jpg",
         'gamer': gamer,
@@ -183,114 +173,200 @@ def format_story_for_demo(story, demo_id):
     }
 
 
-def download_story_assets(story, demo_id, demo_dir='demo-assets'):
-    """Download video and thumbnail for a VideoStory"""
-    print(f"\n📥 Downloading assets for {demo_id}...")
-    
-    # Load resources
+def asset_download_jobs(story, demo_id, demo_dir, bucket, region):
+    """S3 download jobs (see s3_downloads.py) for a story's video and, if it has one, its thumbnail"""
+    jobs = []
+    for key, ext in ((story.get('_video_url', story.get('video_url', '')), 'mp4'),
+                     (story.get('_thumbnail_url', story.get('thumbnail_url', '')), 'jpg')):
+        if key:
+            jobs.append({
+                'bucket': bucket,
+                'key': key,
+                'local_path': os.path.join(demo_dir, f"{demo_id}.{ext}"),
+                'region': region,
+                'profile': 'prod',
+                'label': f"{demo_id}.{ext}",
+                'demo_id': demo_id,
+            })
+    return jobs
+
+
+def download_session_assets(new_stories, demo_dir='demo-assets', workers=DEFAULT_DOWNLOAD_WORKERS,
+                            media_workers=None):
+    """
+    Download videos and thumbnails for new demo stories as one pipeline
+
+    S3 downloads run on a thread pool (shared prod client, see
+    s3_downloads.py). As soon as the video of a story without a thumbnail
+    lands, its thumbnail is generated on a process pool while the remaining
+    downloads continue.
+
+    Args:
+        new_stories: (demo_story, production story) pairs
+        demo_dir: Asset directory
+        workers: Concurrent S3 downloads
+        media_workers: Thumbnail process pool size (default: number of CPUs)
+
+    Returns:
+        dict: demo_id -> True if all of the story's assets are in place
+    """
     with open('resources.json', 'r') as f:
         resources = json.load(f)
-    
     stage_config = resources['stages']['prod']
     bucket = stage_config['s3_bucket']
     region = stage_config['region']
-    
-    # Use production AWS profile
-    session = boto3.Session(profile_name='prod')
-    s3 = session.client('s3', region_name=region)
-    
-    success = True
-    
-    # Download video
-    video_key = story.get('_video_url', story.get('video_url', ''))
-    video_local = os.path.join(demo_dir, f"{demo_id}.mp4")
-    
-    if video_key:
-        try:
-            print(f"   📹 Downloading video from s3://{bucket}/{video_key}")
-            s3.download_file(bucket, video_key, video_local)
-            print(f"   ✅ Video saved: {demo_id}.mp4")
-        except Exception as e:
-            print(f"   ❌ Failed to download video: {e}")
-            success = False
-    else:
-        print(f"   ⚠️  No video URL found")
-        success = False
-    
-    # Download thumbnail
-    thumbnail_key = story.get('_thumbnail_url', story.get('thumbnail_url', ''))
-    thumbnail_local = os.path.join(demo_dir, f"{demo_id}.jpg")
-    
-    if thumbnail_key:
-        try:
-            print(f"   🖼️  Downloading thumbnail from s3://{bucket}/{thumbnail_key}")
-            s3.download_file(bucket, thumbnail_key, thumbnail_local)
-            print(f"   ✅ Thumbnail saved: {demo_id}.jpg")
-        except Exception as e:
-            print(f"   ❌ Failed to download thumbnail: {e}")
-            success = False
-    else:
-        print(f"   ⚠️  No thumbnail URL found")
-        # Generate thumbnail from video if available
-        if os.path.exists(video_local):
-            print(f"   🔧 Generating thumbnail from video...")
-            try:
-                cmd = [
-                    'ffmpeg',
-                    '-i', video_local,
-                    '-vframes', '1',
-                    '-vf', 'scale=600:400:force_original_aspect_ratio=increase,crop=600:400',
-                    '-q:v', '2',
-                    '-f', 'image2',
-                    '-y',
-                    thumbnail_local
-                ]
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                if result.returncode == 0:
-                    print(f"   ✅ Thumbnail generated: {demo_id}.jpg")
-                else:
-                    print(f"   ❌ Failed to generate thumbnail")
-                    success = False
-            except Exception as e:
-                print(f"   ❌ Error generating thumbnail: {e}")
-                success = False
-    
-    return success
+
+    Path(demo_dir).mkdir(exist_ok=True)
+    ok = {}
+    jobs = []
+    needs_thumbnail = set()
+    for demo_story, story in new_stories:
+        demo_id = demo_story['demo_id']
+        story_jobs = asset_download_jobs(story, demo_id, demo_dir, bucket, region)
+        ok[demo_id] = any(job['label'].endswith('.mp4') for job in story_jobs)
+        if not ok[demo_id]:
+            print(f"   ⚠️  {demo_id}: no video URL found")
+            continue
+        if len(story_jobs) == 1:
+            needs_thumbnail.add(demo_id)
+        jobs.extend(story_jobs)
+
+    print(f"   {len(jobs)} files from s3://{bucket}, {len(needs_thumbnail)} thumbnails to generate")
+    progress = DownloadProgress(len(jobs))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as downloads, \
+            ProcessPoolExecutor(max_workers=max(1, min(media_workers or default_workers(),
+                                                       len(needs_thumbnail) or 1))) as media:
+        futures = [downloads.submit(download_one, job, DEFAULT_TRANSFER_CONFIG, progress) for job in jobs]
+        thumbnail_futures = []
+        for future in as_completed(futures):
+            result = future.result()
+            job = result['job']
+            if not result['ok']:
+                ok[job['demo_id']] = False
+            elif job['demo_id'] in needs_thumbnail and job['label'].endswith('.mp4'):
+                thumbnail_futures.append(media.submit(build_media, {
+                    'kind': 'thumbnail',
+                    'input': job['local_path'],
+                    'output': os.path.join(demo_dir, f"{job['demo_id']}.jpg"),
+                    'label': job['demo_id'],
+                }))
+
+        for future in as_completed(thumbnail_futures):
+            result = future.result()
+            label = result['job']['label']
+            if result['ok']:
+                print(f"   🔧 {label}.jpg generated from video")
+            else:
+                print(f"   ❌ {label}: failed to generate thumbnail: {result['error']}")
+                ok[label] = False
+
+    elapsed = time.monotonic() - progress.started
+    print(f"   ⏱️  Assets ready in {elapsed:.1f}s")
+    return ok
+
+
+def remove_story_assets(demo_id, demo_dir='demo-assets'):
+    """Remove whatever was fetched for a story that couldn't be added"""
+    for ext in ('mp4', 'jpg'):
+        path = os.path.join(demo_dir, f"{demo_id}.{ext}")
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def save_demo_stories(demo_stories, demo_stories_file='demo_stories.json'):
+    """Write demo_stories.json atomically, so readers never see a partial file"""
+    tmp_file = demo_stories_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(demo_stories, f, indent=2)
+    os.replace(tmp_file, demo_stories_file)
 
 
 def main():
+    parser = argparse.ArgumentParser(
+        description='Add production session reels to the demo',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+Examples:
+  python3 add_production_session.py
+  python3 add_production_session.py --gamer G#45831fea-... --date 2025-11-24
+  python3 add_production_session.py --gamers-file family.txt --start-date 2025-11-18 --end-date 2025-11-24
+  python3 add_production_session.py --gamers-file family.txt --start-date 2025-11-18 --end-date 2025-11-24 --list-only
+
+--gamers-file is a JSON list of gamer IDs or one ID per line. Without
+--gamer/--gamers-file the default gamer ({DEFAULT_GAMER}) is used.
+        """
+    )
+    parser.add_argument('--gamer', '-g', action='append',
+                        help='Gamer ID, with or without the G# prefix (repeatable)')
+    parser.add_argument('--gamers-file', help='File with gamer IDs (JSON list or one per line)')
+    parser.add_argument('--date', help=f'Single day, YYYY-MM-DD UTC (default: {DEFAULT_DATE})')
+    parser.add_argument('--start-date', help='First day of a date range (YYYY-MM-DD UTC)')
+    parser.add_argument('--end-date', help='Last day of a date range, inclusive (default: --start-date)')
+    parser.add_argument('--workers', '-w', type=int, default=DEFAULT_QUERY_WORKERS,
+                        help=f'Concurrent GSI1 queries (default: {DEFAULT_QUERY_WORKERS})')
+    parser.add_argument('--download-workers', type=int, default=DEFAULT_DOWNLOAD_WORKERS,
+                        help=f'Concurrent S3 downloads (default: {DEFAULT_DOWNLOAD_WORKERS})')
+    parser.add_argument('--media-workers', type=int,
+                        help='Thumbnail generation processes (default: number of CPUs)')
+    parser.add_argument('--gap-minutes', type=float, default=DEFAULT_GAP_SECONDS / 60,
+                        help=f'Largest gap within a session (default: {DEFAULT_GAP_SECONDS // 60})')
+    parser.add_argument('--endpoint-url', help='DynamoDB endpoint override (e.g. a local stand-in)')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'Story database (default: {DEFAULT_DB})')
+    parser.add_argument('--list-only', action='store_true',
+                        help='Only list the sessions found; don\'t modify demo_stories.json or download')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
     print("🎬 Add Production Session to Demo")
     print("=" * 70)
-    
-    # Configuration
-    gamer_id = "G#45831fea-23d9-4bba-8638-df82680f97cc"
-    # Use Nov 24, 2025 (when the videos were recorded)
-    target_date = "2025-11-24"
-    
+
+    try:
+        gamers = load_gamers(args.gamer, args.gamers_file) or [DEFAULT_GAMER]
+    except FileNotFoundError:
+        print(f"❌ File not found: {args.gamers_file}")
+        return 1
+    if args.date and args.start_date:
+        parser.error('use either --date or --start-date/--end-date')
+    try:
+        dates = date_range(args.start_date or args.date or DEFAULT_DATE, args.end_date)
+    except ValueError as e:
+        parser.error(str(e))
+
     print(f"\n📋 Configuration:")
-    print(f"   Gamer: {gamer_id}")
-    print(f"   Date: {target_date} (UTC)")
-    
+    print(f"   Gamers: {', '.join(gamers)}")
+    print(f"   Dates: {dates[0]}" + (f" → {dates[-1]} ({len(dates)} days)" if len(dates) > 1 else "") + " (UTC)")
+
     # Fetch production stories
-    stories = get_production_stories(gamer_id, target_date)
+    with phase('query'):
+        stories = get_production_stories(gamers, dates, workers=args.workers, endpoint_url=args.endpoint_url)
     
     if not stories:
         print("\n❌ No stories found!")
         return 1
     
     # Group into sessions
-    sessions = group_into_sessions(stories)
+    with phase('sessionize'):
+        sessions = group_into_sessions(stories, args.gap_minutes * 60)
     print(f"\n📊 Found {len(sessions)} session(s)")
     
     for i, session in enumerate(sessions, 1):
-        print(f"\n   Session {i}: {len(session['stories'])} stories")
+        print(f"\n   Session {i}: {len(session['stories'])} stories ({session['key'][1]})")
         print(f"      Start: {session['start']}")
         print(f"      End: {session['end']}")
-    
-    # Load current demo stories
-    print(f"\n📖 Loading current demo_stories.json...")
-    with open('demo_stories.json', 'r') as f:
-        demo_stories = json.load(f)
+
+    if args.list_only:
+        return 0
+    
+    # Load current demo stories (demo_stories.json seeds an empty store)
+    store = StoryStore(args.db)
+    demo_stories = store.demo_stories()
+    if demo_stories:
+        print(f"\n📖 Loading current demo stories from {args.db}...")
+    else:
+        print(f"\n📖 Loading current demo_stories.json...")
+        with open('demo_stories.json', 'r') as f:
+            demo_stories = json.load(f)
+        store.upsert_demo_stories(demo_stories)
     
     current_count = len(demo_stories)
     print(f"   Current stories: {current_count}")
@@ -311,38 +387,39 @@ def main():
     
     for story in all_session_stories:
         demo_id = f"demostory{demo_num:03d}"
-        demo_story = format_story_for_demo(story, demo_id)
-        new_stories.append((demo_story, story))
-        demo_stories.append(demo_story)
-        print(f"   Added: {demo_id} - {demo_story['timestamp']}")
+        new_stories.append((format_story_for_demo(story, demo_id), story))
         demo_num += 1
     
-    # Save updated demo_stories.json
-    print(f"\n💾 Saving updated demo_stories.json...")
-    with open('demo_stories.json', 'w') as f:
-        json.dump(demo_stories, f, indent=2)
-    
-    print(f"✅ Added {len(new_stories)} new stories")
-    print(f"   Total stories: {len(demo_stories)}")
-    
-    # Download assets
-    print(f"\n📥 Downloading assets...")
-    Path('demo-assets').mkdir(exist_ok=True)
+    # Download assets before touching demo_stories.json
+    print(f"\n📥 Downloading assets for {len(new_stories)} stories...")
+    with phase('download'):
+        downloaded = download_session_assets(new_stories, workers=args.download_workers,
+                                             media_workers=args.media_workers)
+    
+    added = []
+    for demo_story, _ in new_stories:
+        if downloaded[demo_story['demo_id']]:
+            added.append(demo_story)
+            print(f"   Added: {demo_story['demo_id']} - {demo_story['timestamp']}")
+        else:
+            print(f"   Skipped: {demo_story['demo_id']} - {demo_story['timestamp']} (assets missing)")
+            remove_story_assets(demo_story['demo_id'])
     
-    success_count = 0
-    for demo_story, original_story in new_stories:
-        if download_story_assets(original_story, demo_story['demo_id']):
-            success_count += 1
+    if added:
+        demo_stories.extend(added)
+        print(f"\n💾 Saving updated demo stories ({args.db}, demo_stories.json)...")
+        with phase('write'):
+            store.upsert_demo_stories(added)
+            save_demo_stories(demo_stories)
     
     print(f"\n{'=' * 70}")
     print(f"✅ Complete!")
     print(f"\n📊 Summary:")
-    print(f"   Stories added: {len(new_stories)}")
-    print(f"   Assets downloaded: {success_count}/{len(new_stories)}")
+    print(f"   Stories added: {len(added)}/{len(new_stories)}")
     print(f"   Total demo stories: {len(demo_stories)}")
     
-    return 0
+    return 0 if len(added) == len(new_stories) else 1
 
 
 if __name__ == '__main__':
-    exit(main())
+    exit(run_main(main))
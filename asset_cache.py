@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Content-addressed local cache for demo assets.
+
+Blobs are stored by SHA-256 under <cache>/blobs/<aa>/<sha256>. Two indexes map
+into them:
+
+- objects: "s3://<bucket>/<key>#<etag>" -> blob, so an S3 object is only
+  downloaded again when its ETag changes
+- derived: "<kind>:<source sha256>:<params>" -> blob, for files computed from
+  other blobs (e.g. thumbnails generated by ffmpeg), so they are only
+  recomputed when their input or parameters change. Derived directories
+  (e.g. HLS packages) are stored as a JSON listing blob of
+  {relative path: sha256}, with every file a blob of its own
+
+Blobs are placed into output directories with hardlinks, falling back to
+reflinks and then plain copies, so demo-assets/ costs no extra disk space
+and rebuilding it is almost free.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from aws_clients import get_client
+from s3_downloads import DEFAULT_WORKERS, download_all
+
+try:
+    import fcntl
+except ImportError:  # Windows: no reflinks, fall back to copies
+    fcntl = None
+
+DEFAULT_CACHE_DIR = '.demo-cache'
+
+# ioctl(dest_fd, FICLONE, src_fd) from linux/fs.h: copy-on-write clone (btrfs, xfs)
+_FICLONE = 0x40049409
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(src: str, dest: str) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        with open(src, 'rb') as s, open(dest, 'wb') as d:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        return True
+    except OSError:
+        try:
+            os.unlink(dest)
+        except FileNotFoundError:
+            pass
+        return False
+
+
+def link_tree(files: Dict[str, Path], dest: str):
+    """Recreate dest as a directory of linked files ({relative path: blob})"""
+    if os.path.isdir(dest):
+        shutil.rmtree(dest)
+    for rel_path, blob in files.items():
+        path = os.path.join(dest, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        link_file(str(blob), path)
+
+
+def link_file(src: str, dest: str) -> str:
+    """
+    Place src at dest without copying data when possible
+
+    Returns:
+        str: How the file was placed: 'existing', 'hardlink', 'reflink' or 'copy'
+    """
+    if os.path.exists(dest):
+        if os.path.samefile(src, dest):
+            return 'existing'
+        os.unlink(dest)
+    try:
+        os.link(src, dest)
+        return 'hardlink'
+    except OSError:
+        pass
+    if _reflink(src, dest):
+        return 'reflink'
+    shutil.copyfile(src, dest)
+    return 'copy'
+
+
+class AssetCache:
+    """
+    Content-addressed blob store with S3-object and derived-file indexes
+
+    Args:
+        root: Cache directory (created if missing)
+    """
+
+    def __init__(self, root: str = DEFAULT_CACHE_DIR):
+        self.root = Path(root)
+        self.blob_dir = self.root / 'blobs'
+        self.tmp_dir = self.root / 'tmp'
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / 'index.json'
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            index = {}
+        index.setdefault('objects', {})
+        index.setdefault('derived', {})
+        return index
+
+    def save(self):
+        """Write the indexes atomically"""
+        with self._lock:
+            data = json.dumps(self._index, indent=2, sort_keys=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.index-')
+        with os.fdopen(fd, 'w') as f:
+            f.write(data)
+        os.replace(tmp_path, self.index_path)
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.blob_dir / sha256[:2] / sha256
+
+    def new_temp_path(self, suffix: str = '') -> str:
+        """A fresh path inside the cache, on the same filesystem as the blobs"""
+        fd, path = tempfile.mkstemp(dir=self.tmp_dir, suffix=suffix)
+        os.close(fd)
+        return path
+
+    def new_temp_dir(self) -> str:
+        """A fresh directory inside the cache, on the same filesystem as the blobs"""
+        return tempfile.mkdtemp(dir=self.tmp_dir)
+
+    def _existing_blob(self, sha256: Optional[str]) -> Optional[Path]:
+        if not sha256:
+            return None
+        path = self.blob_path(sha256)
+        return path if path.exists() else None
+
+    @staticmethod
+    def object_key(bucket: str, key: str, etag: str) -> str:
+        return f"s3://{bucket}/{key}#{etag}"
+
+    @staticmethod
+    def derived_key(kind: str, source_sha256: str, params: str = '') -> str:
+        return f"{kind}:{source_sha256}:{params}"
+
+    def lookup_object(self, bucket: str, key: str, etag: str) -> Optional[Path]:
+        """Blob for an S3 object version, if cached"""
+        with self._lock:
+            sha256 = self._index['objects'].get(self.object_key(bucket, key, etag))
+        return self._existing_blob(sha256)
+
+    def lookup_derived(self, kind: str, source_sha256: str, params: str = '') -> Optional[Path]:
+        """Blob for a derived file, if cached"""
+        with self._lock:
+            sha256 = self._index['derived'].get(self.derived_key(kind, source_sha256, params))
+        return self._existing_blob(sha256)
+
+    def lookup_derived_tree(self, kind: str, source_sha256: str, params: str = '') -> Optional[Dict[str, Path]]:
+        """{relative path: blob} for a derived directory, if cached completely"""
+        listing = self.lookup_derived(kind, source_sha256, params)
+        if listing is None:
+            return None
+        with open(listing, 'r') as f:
+            files = {rel_path: self.blob_path(sha256) for rel_path, sha256 in json.load(f).items()}
+        if not all(blob.exists() for blob in files.values()):
+            return None
+        return files
+
+    def ingest(self, path: str) -> Path:
+        """Move a file into the blob store and return its blob path"""
+        sha256 = file_sha256(path)
+        blob = self.blob_path(sha256)
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        if blob.exists():
+            os.unlink(path)
+        else:
+            os.chmod(path, 0o444)  # Blobs are shared via hardlinks; keep them immutable
+            os.replace(path, blob)
+        return blob
+
+    def add_object(self, path: str, bucket: str, key: str, etag: str) -> Path:
+        """Ingest a downloaded S3 object"""
+        blob = self.ingest(path)
+        with self._lock:
+            self._index['objects'][self.object_key(bucket, key, etag)] = blob.name
+        return blob
+
+    def add_derived(self, path: str, kind: str, source_sha256: str, params: str = '') -> Path:
+        """Ingest a file computed from another blob"""
+        blob = self.ingest(path)
+        with self._lock:
+            self._index['derived'][self.derived_key(kind, source_sha256, params)] = blob.name
+        return blob
+
+
+    def add_derived_tree(self, path: str, kind: str, source_sha256: str,
+                         params: str = '') -> Dict[str, Path]:
+        """Ingest a directory computed from another blob; the directory is consumed"""
+        files = {}
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                file_path = os.path.join(dirpath, filename)
+                files[os.path.relpath(file_path, path)] = self.ingest(file_path)
+        shutil.rmtree(path)
+
+        listing = self.new_temp_path('.json')
+        with open(listing, 'w') as f:
+            json.dump({rel_path: blob.name for rel_path, blob in files.items()}, f, indent=2, sort_keys=True)
+        self.add_derived(listing, kind, source_sha256, params)
+        return files
+
+
+def head_etag(job: Dict[str, Any]) -> Optional[str]:
+    """ETag of the job's S3 object, or None if it can't be read"""
+    try:
+        s3 = get_client('s3', job['region'], job.get('profile'))
+        return s3.head_object(Bucket=job['bucket'], Key=job['key'])['ETag']
+    except Exception as e:
+        print(f"   ⚠️  Cannot access s3://{job['bucket']}/{job['key']}: {e}")
+        return None
+
+
+def fetch_all_cached(jobs: List[Dict[str, Any]], cache: AssetCache,
+                     workers: int = DEFAULT_WORKERS) -> List[Dict[str, Any]]:
+    """
+    Download jobs through the cache and link them to their local_path
+
+    Each object's ETag is checked with a (parallel) HEAD request. Objects
+    already cached for that ETag are linked without any transfer; only new
+    or changed objects are downloaded.
+
+    Args:
+        jobs: Download job dicts (see s3_downloads.py)
+        cache: Asset cache
+        workers: Concurrent HEAD requests and downloads
+
+    Returns:
+        list: One result per job, in order:
+        {'job', 'ok', 'cached', 'blob', 'sha256', 'error'}
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        etags = list(executor.map(head_etag, jobs))
+
+    results: List[Dict[str, Any]] = []
+    downloads = []
+    for job, etag in zip(jobs, etags):
+        result = {'job': job, 'ok': False, 'cached': False, 'blob': None, 'sha256': None, 'error': None}
+        results.append(result)
+        if etag is None:
+            result['error'] = 'Object not accessible'
+            continue
+        blob = cache.lookup_object(job['bucket'], job['key'], etag)
+        if blob is not None:
+            result.update(ok=True, cached=True, blob=blob, sha256=blob.name)
+            continue
+        download_job = dict(job, local_path=cache.new_temp_path())
+        downloads.append((result, download_job, etag))
+
+    hits = len([r for r in results if r['cached']])
+    print(f"   ♻️  {hits}/{len(jobs)} assets already cached, downloading {len(downloads)}")
+
+    download_results = download_all([d[1] for d in downloads], workers=workers)
+
+    def ingest(item):
+        (result, download_job, etag), download_result = item
+        if not download_result['ok']:
+            result['error'] = download_result['error']
+            try:
+                os.unlink(download_job['local_path'])
+            except FileNotFoundError:
+                pass
+            return
+        blob = cache.add_object(download_job['local_path'], download_job['bucket'], download_job['key'], etag)
+        result.update(ok=True, blob=blob, sha256=blob.name)
+
+    # Hashing releases the GIL, so ingest in parallel too
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(ingest, zip(downloads, download_results)))
+
+    for result in results:
+        if result['ok']:
+            link_file(str(result['blob']), result['job']['local_path'])
+
+    cache.save()
+    return results
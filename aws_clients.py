@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Shared boto3 clients for the tool scripts.
+
+Creating a boto3 client costs tens of milliseconds (loading service models,
+resolving credentials), and every new client opens its own connection pool.
+get_client() returns one thread-safe client per (service, region, profile,
+endpoint), created on first use and reused by all worker threads.
+"""
+
+import threading
+from typing import Optional
+
+import boto3
+from botocore.config import Config
+
+# Enough connections for a worker pool where each worker runs a multipart transfer
+DEFAULT_MAX_POOL_CONNECTIONS = 64
+
+_lock = threading.Lock()
+_sessions = {}
+_clients = {}
+
+
+def get_session(profile: Optional[str] = None) -> boto3.Session:
+    """Shared boto3 session for a profile (None = default credentials chain)"""
+    with _lock:
+        session = _sessions.get(profile)
+        if session is None:
+            session = boto3.Session(profile_name=profile) if profile else boto3.Session()
+            _sessions[profile] = session
+        return session
+
+
+def get_client(service: str, region: str, profile: Optional[str] = None,
+               endpoint_url: Optional[str] = None,
+               max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS):
+    """
+    Get a shared boto3 client
+
+    Args:
+        service: AWS service name, e.g. 's3' or 'dynamodb'
+        region: AWS region
+        profile: Optional AWS profile name (e.g. 'prod')
+        endpoint_url: Optional endpoint override, e.g. a local stand-in
+        max_pool_connections: HTTP connection pool size for the client
+
+    Returns:
+        A boto3 client, safe to share between threads
+    """
+    key = (service, region, profile, endpoint_url)
+    with _lock:
+        client = _clients.get(key)
+    if client is not None:
+        return client
+
+    session = get_session(profile)
+    config = Config(max_pool_connections=max_pool_connections)
+    if endpoint_url and service == 's3':
+        # Local stand-ins don't do virtual-hosted bucket DNS
+        config = config.merge(Config(s3={'addressing_style': 'path'}))
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            # Session.client() isn't thread-safe, so create under the lock
+            client = session.client(service, region_name=region, endpoint_url=endpoint_url, config=config)
+            _clients[key] = client
+        return client
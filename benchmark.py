@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for every stage of the story pipeline, on synthetic data.
+
+For each dataset size, this script:
+1. Generates synthetic stories for the stages in resources.json (see
+   synthetic_data.py) and loads them into a local DynamoDB stand-in
+2. Puts fake videos and thumbnails for the presign sample into a local S3
+   stand-in (see local_aws.py), and points boto3 at both
+3. Times each stage, in pipeline order, on the previous stage's output:
+
+    scan            scan_video_stories_from_stage, every stage
+    enrich          enrich_video_stories, then every enriched field read
+                    (records compute them on read; see story_record.py)
+    stats           generate_summary_stats
+    enrich_stats    iter_enriched_stories with StoryStats (both in one pass)
+    stats_merge     StoryStats per stage, merged
+    presign         process_video_stories (HeadObject + signing per story,
+                    on an evenly spread sample; see --presign-sample)
+    html_report     generate_html_report
+    html_presigned  generate_html_with_presigned_urls
+    find_by_ids     find_stories_by_ids (IDs spread over the dataset)
+    sessions        group_into_sessions
+
+Each run is appended to benchmarks/results.jsonl, with the git commit, and
+compared with the previous run of the same size (or with --baseline's);
+stages that got slower than --threshold are flagged as regressions.
+
+Usage:
+    python3 benchmark.py
+    python3 benchmark.py --sizes 1000 100000 1000000
+    python3 benchmark.py --sizes 100000 --only scan enrich stats --repeat 3
+    python3 benchmark.py --sizes 100000 --baseline 5c06604 --fail-on-regression
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from add_production_session import group_into_sessions
+from generate_presigned_urls import generate_html_with_presigned_urls, process_video_stories
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from local_aws import LocalDynamoDBServer, LocalS3Server, stage_tables
+from prepare_demo_assets import find_stories_by_ids
+from scrape_video_stories import (enrich_video_stories, generate_html_report, generate_summary_stats,
+                                  iter_enriched_stories, scan_video_stories_from_stage)
+from story_ids import story_id
+from story_record import story_dict
+from story_stats import StoryStats
+from synthetic_data import iter_synthetic_stories
+
+BENCHMARKS = ['scan', 'enrich', 'stats', 'enrich_stats', 'stats_merge', 'presign', 'html_report', 'html_presigned', 'find_by_ids', 'sessions']
+DEFAULT_SIZES = [1000, 100000]
+DEFAULT_RESULTS = 'benchmarks/results.jsonl'
+DEFAULT_PRESIGN_SAMPLE = 5000
+DEFAULT_THRESHOLD = 0.15
+# Changes smaller than this are noise, whatever the percentage
+MIN_REGRESSION_SECONDS = 0.05
+FIND_IDS = 20
+# Share of presign sample stories whose video is missing from S3
+MISSING_VIDEO_RATE = 0.05
+
+
+def git_commit() -> Dict[str, Any]:
+    """Short commit hash of the working tree and whether it has uncommitted changes"""
+    root = Path(__file__).resolve().parent
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return {'git_commit': None, 'git_dirty': None}
+    return {'git_commit': commit, 'git_dirty': bool(dirty)}
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1024 / 1024, 1)
+
+
+def use_local_aws(dynamodb_endpoint: str, s3_endpoint: str):
+    """Point every boto3 client created from now on at the stand-ins, with dummy credentials"""
+    for name in ('AWS_PROFILE', 'AWS_SESSION_TOKEN'):
+        os.environ.pop(name, None)
+    os.environ['AWS_ACCESS_KEY_ID'] = 'benchmark'
+    os.environ['AWS_SECRET_ACCESS_KEY'] = 'benchmark'
+    os.environ['AWS_ENDPOINT_URL_DYNAMODB'] = dynamodb_endpoint
+    os.environ['AWS_ENDPOINT_URL_S3'] = s3_endpoint
+
+
+def spread(items: List[Any], count: int) -> List[Any]:
+    """Up to count items evenly spread over the list, always including the last"""
+    if count <= 0:
+        return []
+    if count >= len(items):
+        return list(items)
+    step = len(items) / count
+    return [items[int(len(items) - 1 - i * step)] for i in range(count)][::-1]
+
+
+class Runner:
+    """Times benchmarks of one size; benchmarks left out by --only still run, untimed, for their output"""
+
+    def __init__(self, only: Optional[List[str]], repeat: int):
+        self.only = only
+        self.repeat = repeat
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def measure(self, name: str, func: Callable, items: int, setup: Optional[Callable[[], tuple]] = None):
+        """Run func(*setup()) repeat times (once if not selected), keep the fastest, return its result"""
+        selected = self.only is None or name in self.only
+        best = None
+        value = None
+        for _ in range(self.repeat if selected else 1):
+            args = setup() if setup else ()
+            gc.collect()
+            wall, cpu = time.perf_counter(), time.process_time()
+            # The stages print progress; formatting it is part of their cost, showing it isn't
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                    phase(f"benchmark/{name}" if selected else f"setup/{name}"):
+                value = func(*args)
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            if best is None or wall < best[0]:
+                best = (wall, cpu)
+        if selected:
+            self.results[name] = {
+                'seconds': round(best[0], 6),
+                'cpu_seconds': round(best[1], 6),
+                'items': items,
+                'us_per_item': round(best[0] / items * 1e6, 3) if items else None,
+                'peak_rss_mb': peak_rss_mb(),
+            }
+            print(f"   {name:<16} {best[0]:9.3f}s  {self.results[name]['us_per_item'] or 0:10.1f} µs/story  "
+                  f"({items} stories)")
+        return value
+
+
+def prepare_s3(root: Path, stories: List[Dict[str, Any]], config: Dict[str, Any], rng: random.Random):
+    """Hardlink a small fake video (and thumbnail) into <root>/<bucket>/<key> for each story"""
+    video_source = root / 'video.bin'
+    video_source.write_bytes(rng.randbytes(4096))
+    for story in stories:
+        if rng.random() < MISSING_VIDEO_RATE:
+            continue
+        bucket = config['stages'][story['_stage']]['s3_bucket']
+        for key in (story.get('_video_url'), story.get('thumbnail_url')):
+            if key and key != 'N/A':
+                path = root / bucket / key
+                path.parent.mkdir(parents=True, exist_ok=True)
+                if not path.exists():
+                    os.link(video_source, path)
+
+
+def fill_presigned_urls(stories: List[Dict[str, Any]], presigned: List[Dict[str, Any]],
+                        config: Dict[str, Any], s3_endpoint: str):
+    """
+    Give every story presign fields for the presigned HTML report
+
+    Stories of the presign sample get their real results; the others get a
+    URL of the same shape, because signing a million URLs would take longer
+    than the benchmarks.
+    """
+    results = {story_id(story): story for story in presigned}
+    signed = next((story['_presigned_url'] for story in presigned if story.get('_presigned_url')), '')
+    query = signed.partition('?')[2] or 'X-Amz-Expires=604800'
+    for story in stories:
+        result = results.get(story_id(story))
+        if result is not None:
+            for field in ('_presigned_url', '_presigned_thumbnail', '_presigned_error'):
+                if field in result:
+                    story[field] = result[field]
+            continue
+        bucket = config['stages'][story['_stage']]['s3_bucket']
+        story['_presigned_url'] = f"{s3_endpoint}/{bucket}/{quote(story['_video_url'])}?{query}"
+        if story.get('thumbnail_url'):
+            story['_presigned_thumbnail'] = f"{s3_endpoint}/{bucket}/{quote(story['thumbnail_url'])}?{query}"
+
+
+def measure_enrich(runner: Runner, scanned: List[Any], size: int) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Time enrichment and statistics on the scanned stories
+
+    Enriching works in place (and records cache what they parse), so every
+    run gets fresh copies of the scanned stories.
+
+    Returns:
+        tuple: (enriched stories, summary statistics)
+    """
+    def enrich(stories):
+        # Scanned records only compute their enriched fields when read, so
+        # read them all: timing enrich_video_stories alone times a list copy
+        stories = enrich_video_stories(stories)
+        for story in stories:
+            story_dict(story)
+        return stories
+
+    def fresh_scanned():
+        return ([story.copy() for story in scanned],)
+
+    def enrich_stats(stories):
+        stats = StoryStats()
+        for _ in iter_enriched_stories(stories, stats):
+            pass
+        return stats.to_dict()
+
+    stories = runner.measure('enrich', enrich, size, fresh_scanned)
+    stats = runner.measure('stats', generate_summary_stats, size, lambda: (stories,))
+    runner.measure('enrich_stats', enrich_stats, size, fresh_scanned)
+    return stories, stats
+
+
+def run_size(size: int, config: Dict[str, Any], workdir: Path, only: Optional[List[str]], repeat: int,
+             presign_sample: int, seed: int) -> Dict[str, Dict[str, Any]]:
+    """Run the benchmarks on one dataset size and return their results"""
+    runner = Runner(only, repeat)
+    stages = list(config['stages'].keys())
+    rng = random.Random(seed)
+
+    dynamodb = LocalDynamoDBServer()
+    with phase('setup/dynamodb'):
+        dynamodb.load_stories(iter_synthetic_stories(size, stages=stages, seed=seed),
+                              stage_tables=stage_tables(config))
+    dynamodb.start_in_background()
+    s3_root = workdir / f"s3-{size}"
+    s3_root.mkdir()
+    s3 = LocalS3Server(str(s3_root))
+    s3.start_in_background()
+    use_local_aws(dynamodb.endpoint_url, s3.endpoint_url)
+
+    try:
+        def scan_all():
+            stories = []
+            for stage, stage_config in config['stages'].items():
+                stories.extend(scan_video_stories_from_stage(stage, stage_config['dynamodb_table'],
+                                                             stage_config['region']))
+            return stories
+
+        scanned = runner.measure('scan', scan_all, size)
+        dynamodb.tables.clear()
+        if len(scanned) != size:
+            raise RuntimeError(f"Scanned {len(scanned)} of {size} stories from the DynamoDB stand-in")
+
+        stories, stats = measure_enrich(runner, scanned, size)
+        # The enriched copies are all that's needed from here on
+        del scanned
+
+        def stats_merge(stories):
+            by_stage = {}
+            for story in stories:
+                stage_stats = by_stage.get(story['_stage'])
+                if stage_stats is None:
+                    stage_stats = by_stage[story['_stage']] = StoryStats()
+                stage_stats.add(story)
+            stats = StoryStats()
+            for stage_stats in by_stage.values():
+                stats.merge(stage_stats)
+            return stats.to_dict()
+
+        runner.measure('stats_merge', stats_merge, size, lambda: (stories,))
+
+        sample = spread(stories, min(presign_sample, size))
+        with phase('setup/s3'):
+            prepare_s3(s3_root, sample, config, rng)
+        presigned = runner.measure('presign', process_video_stories, len(sample),
+                                   lambda: ([dict(story) for story in sample], config))
+        fill_presigned_urls(stories, presigned, config, s3.endpoint_url)
+
+        runner.measure('html_report', generate_html_report, size,
+                       lambda: (stories, stats, str(workdir / 'report.html')))
+        runner.measure('html_presigned', generate_html_with_presigned_urls, size,
+                       lambda: (stories, str(workdir / 'presigned.html')))
+
+        ids = [story_id(story) for story in spread(stories, FIND_IDS)]
+        found = runner.measure('find_by_ids', find_stories_by_ids, size, lambda: (stories, ids))
+        if len(found) != len(set(ids)):
+            raise RuntimeError(f"find_stories_by_ids found {len(found)} of {len(set(ids))} stories")
+        runner.measure('sessions', group_into_sessions, size, lambda: (stories,))
+    finally:
+        dynamodb.shutdown()
+        s3.shutdown()
+    return runner.results
+
+
+def load_results(results_file: str) -> List[Dict[str, Any]]:
+    """Earlier runs from the results file, oldest first"""
+    try:
+        with open(results_file, 'r') as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def find_baseline(history: List[Dict[str, Any]], size: int, baseline: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Latest earlier run of the size, from the given commit if any"""
+    for run in reversed(history):
+        if run['size'] != size:
+            continue
+        if baseline and not (run.get('git_commit') or '').startswith(baseline):
+            continue
+        return run
+    return None
+
+
+def compare_runs(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Print each benchmark's time against the baseline run
+
+    Returns:
+        list: Names of benchmarks that got slower by more than threshold
+    """
+    regressions = []
+    commit = before.get('git_commit') or 'unknown commit'
+    print(f"\n📊 Size {after['size']}: compared with {commit} ({before['started']})")
+    for name, result in after['benchmarks'].items():
+        old = before['benchmarks'].get(name)
+        if old is None:
+            print(f"   {name:<16} {result['seconds']:9.3f}s  (new)")
+            continue
+        change = (result['seconds'] - old['seconds']) / old['seconds'] if old['seconds'] else 0.0
+        slower = change > threshold and result['seconds'] - old['seconds'] > MIN_REGRESSION_SECONDS
+        marker = '⚠️  regression' if slower else ('🚀 faster' if change < -threshold else '')
+        print(f"   {name:<16} {old['seconds']:9.3f}s → {result['seconds']:9.3f}s  {change * 100:+6.1f}%  {marker}")
+        if slower:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark every pipeline stage on synthetic stories against local AWS stand-ins',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 benchmark.py
+  python3 benchmark.py --sizes 1000 100000 1000000
+  python3 benchmark.py --sizes 100000 --only scan enrich stats --repeat 3
+  python3 benchmark.py --sizes 100000 --baseline 5c06604 --fail-on-regression
+        """
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help=f"Dataset sizes in stories (default: {' '.join(map(str, DEFAULT_SIZES))})")
+    parser.add_argument('--only', nargs='+', choices=BENCHMARKS,
+                        help='Only time these benchmarks (the others still run, untimed, for their output)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per benchmark, fastest kept (default: 1)')
+    parser.add_argument('--presign-sample', type=int, default=DEFAULT_PRESIGN_SAMPLE,
+                        help=f'Stories to presign; each one is an S3 round trip (default: {DEFAULT_PRESIGN_SAMPLE})')
+    parser.add_argument('--config', default='resources.json',
+                        help='Resources configuration for stage/table/bucket names (default: resources.json)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--results', default=DEFAULT_RESULTS,
+                        help=f'Results file runs are appended to (default: {DEFAULT_RESULTS})')
+    parser.add_argument('--no-save', action='store_true', help="Don't append this run to the results file")
+    parser.add_argument('--baseline', metavar='COMMIT',
+                        help='Compare with the latest run of this commit (default: the previous run)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Slowdown that counts as a regression, as a fraction (default: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--fail-on-regression', action='store_true', help='Exit with status 1 on a regression')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ Configuration file not found: {args.config}")
+        return 1
+
+    print("🏁 Pipeline Benchmarks")
+    print("=" * 70)
+    environment = {
+        **git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+    print(f"   Commit: {environment['git_commit']}{' (uncommitted changes)' if environment['git_dirty'] else ''}")
+    print(f"   Python: {environment['python']} on {environment['platform']}")
+    print(f"   Sizes: {', '.join(map(str, args.sizes))}")
+
+    history = load_results(args.results)
+    regressions = []
+    for size in args.sizes:
+        print(f"\n⏱️  {size} stories")
+        with tempfile.TemporaryDirectory(prefix='benchmark-') as workdir:
+            try:
+                results = run_size(size, config, Path(workdir), args.only, args.repeat,
+                                   args.presign_sample, args.seed)
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                return 1
+        run = {
+            'started': datetime.now().isoformat(timespec='seconds'),
+            **environment,
+            'size': size,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'presign_sample': min(args.presign_sample, size),
+            'benchmarks': results,
+        }
+        baseline = find_baseline(history, size, args.baseline)
+        if baseline is not None:
+            regressions.extend(f"{name} ({size})" for name in compare_runs(baseline, run, args.threshold))
+        elif args.baseline:
+            print(f"\nℹ️  No run of size {size} from {args.baseline} to compare with")
+        if not args.no_save:
+            if os.path.dirname(args.results):
+                os.makedirs(os.path.dirname(args.results), exist_ok=True)
+            with open(args.results, 'a') as f:
+                f.write(json.dumps(run) + '\n')
+
+    if not args.no_save:
+        print(f"\n💾 Results appended to: {args.results}")
+    if regressions:
+        print(f"\n⚠️  Regressions: {', '.join(regressions)}")
+        return 1 if args.fail_on_regression else 0
+    return 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Generate the demo gallery (demo-assets/index.html) from demo_stories.json.
+
+Cards show the thumbnail through <picture>/srcset, so the browser downloads
+the WebP variant that fits the card (falling back to the JPEG), and images
+below the fold are lazy-loaded. Hovering a card scrubs through the story's
+sprite sheet, which is only fetched on the first hover; the video itself is
+not requested until the card is clicked. On slow or data-saver connections
+the player picks the lower-bitrate rendition when one was generated. Stories
+packaged as HLS are streamed adaptively instead (natively in Safari, through
+hls.js elsewhere), so seeks and early exits only fetch the segments watched.
+
+Usage:
+    python3 demo_gallery.py
+    python3 demo_gallery.py --demo-dir demo-assets
+"""
+
+import argparse
+import json
+import os
+from html import escape
+from typing import Any, Dict, List
+
+from instrumentation import add_instrumentation_arguments, run_main
+
+# Rendered card width; keep in sync with the grid's minmax() below
+CARD_SIZES = "(max-width: 640px) 100vw, 320px"
+
+# Loaded on the first HLS play in browsers without native HLS
+HLS_JS_URL = "https://cdn.jsdelivr.net/npm/hls.js@1/dist/hls.min.js"
+
+
+def picture_html(story: Dict[str, Any]) -> str:
+    """<picture> for a story's thumbnail, with WebP variants when available"""
+    variants = story.get('thumbnail_variants') or []
+    fallback = escape(story.get('thumbnail_file', ''))
+    source = ''
+    if variants:
+        srcset = ', '.join(f"{escape(v['file'])} {v['width']}w" for v in variants)
+        source = f'<source type="image/webp" srcset="{srcset}" sizes="{CARD_SIZES}">'
+    return (f'<picture>{source}<img src="{fallback}" alt="" loading="lazy" decoding="async" '
+            f'width="600" height="400"></picture>')
+
+
+def card_html(story: Dict[str, Any]) -> str:
+    sprite = story.get('sprite')
+    scrub = ''
+    if sprite:
+        scrub = (f'<div class="scrub" data-sprite="{escape(sprite["file"])}" '
+                 f'data-frames="{sprite["frames"]}"></div>')
+    renditions = story.get('renditions') or []
+    low = f' data-video-low="{escape(renditions[0]["file"])}"' if renditions else ''
+    hls = f' data-hls="{escape(story["hls"])}"' if story.get('hls') else ''
+    description = story.get('description', '')
+    display_desc = description if len(description) <= 200 else description[:197] + '...'
+    return f"""
+        <div class="story-card" data-video="{escape(story['video_file'])}"{low}{hls}>
+            <div class="media">
+                {picture_html(story)}
+                {scrub}
+                <div class="play-button"></div>
+            </div>
+            <div class="story-content">
+                <div class="story-title">{escape(story.get('demo_id', ''))} · {escape(story.get('stage', ''))}</div>
+                <div class="story-meta">{escape(str(story.get('timestamp', '')))}</div>
+                <div class="story-description">{escape(display_desc)}</div>
+            </div>
+        </div>
+"""
+
+
+def generate_demo_gallery(stories: List[Dict[str, Any]], output_file: str):
+    """
+    Write the gallery HTML; asset paths are relative to the output file
+
+    Args:
+        stories: demo_stories.json entries
+        output_file: Path of the HTML file (inside the demo directory)
+    """
+    cards = ''.join(card_html(story) for story in stories)
+    html = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>GuardianGamer Demo Stories</title>
+    <style>
+        * {{
+            box-sizing: border-box;
+        }}
+        body {{
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, sans-serif;
+            max-width: 1600px;
+            margin: 0 auto;
+            padding: 20px;
+            background: #f5f5f5;
+        }}
+        h1 {{
+            color: #333;
+            border-bottom: 3px solid #4CAF50;
+            padding-bottom: 10px;
+        }}
+        .story-grid {{
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(280px, 1fr));
+            gap: 20px;
+        }}
+        .story-card {{
+            background: white;
+            border-radius: 8px;
+            overflow: hidden;
+            box-shadow: 0 2px 8px rgba(0,0,0,0.1);
+        }}
+        .media {{
+            position: relative;
+            aspect-ratio: 3 / 2;
+            background: #000;
+            cursor: pointer;
+        }}
+        .media img, .media video, .scrub {{
+            position: absolute;
+            top: 0;
+            left: 0;
+            width: 100%;
+            height: 100%;
+            object-fit: cover;
+        }}
+        .scrub {{
+            display: none;
+            background-repeat: no-repeat;
+        }}
+        .media:hover .scrub.ready {{
+            display: block;
+        }}
+        .play-button {{
+            position: absolute;
+            top: 50%;
+            left: 50%;
+            transform: translate(-50%, -50%);
+            width: 56px;
+            height: 56px;
+            background: rgba(255, 255, 255, 0.9);
+            border-radius: 50%;
+            pointer-events: none;
+        }}
+        .play-button::after {{
+            content: '';
+            position: absolute;
+            top: 50%;
+            left: 55%;
+            transform: translate(-50%, -50%);
+            border-style: solid;
+            border-width: 10px 0 10px 17px;
+            border-color: transparent transparent transparent #4CAF50;
+        }}
+        .story-content {{
+            padding: 12px 15px;
+        }}
+        .story-title {{
+            font-weight: bold;
+            color: #333;
+        }}
+        .story-meta {{
+            font-size: 12px;
+            color: #666;
+            margin: 4px 0 8px 0;
+        }}
+        .story-description {{
+            font-size: 14px;
+            color: #444;
+        }}
+    </style>
+</head>
+<body>
+    <h1>🎬 GuardianGamer Demo Stories</h1>
+    <div class="story-grid">
+{cards}
+    </div>
+    <script>
+        document.querySelectorAll('.scrub').forEach(function(scrub) {{
+            const media = scrub.parentElement;
+            const frames = parseInt(scrub.dataset.frames, 10);
+
+            // Fetch the sprite sheet on first hover only
+            media.addEventListener('mouseenter', function() {{
+                if (scrub.classList.contains('ready')) return;
+                scrub.style.backgroundImage = 'url("' + scrub.dataset.sprite + '")';
+                scrub.style.backgroundSize = (frames * 100) + '% 100%';
+                scrub.classList.add('ready');
+            }});
+            media.addEventListener('mousemove', function(event) {{
+                const rect = media.getBoundingClientRect();
+                const fraction = Math.min(Math.max((event.clientX - rect.left) / rect.width, 0), 0.999);
+                const frame = Math.floor(fraction * frames);
+                scrub.style.backgroundPosition = (frames > 1 ? frame / (frames - 1) * 100 : 0) + '% 0';
+            }});
+        }});
+
+        function slowConnection() {{
+            const connection = navigator.connection;
+            return !!connection && (connection.saveData || connection.downlink < 3);
+        }}
+
+        let hlsJs = null;
+        function loadHlsJs() {{
+            if (!hlsJs) {{
+                hlsJs = new Promise(function(resolve) {{
+                    const script = document.createElement('script');
+                    script.src = '{HLS_JS_URL}';
+                    script.onload = function() {{ resolve(window.Hls && window.Hls.isSupported()); }};
+                    script.onerror = function() {{ resolve(false); }};
+                    document.head.appendChild(script);
+                }});
+            }}
+            return hlsJs;
+        }}
+
+        function progressiveSource(card) {{
+            return (slowConnection() && card.dataset.videoLow) || card.dataset.video;
+        }}
+
+        function attachSource(card, video) {{
+            const playlist = card.dataset.hls;
+            if (!playlist || video.canPlayType('application/vnd.apple.mpegurl')) {{
+                video.src = playlist || progressiveSource(card);
+                return;
+            }}
+            loadHlsJs().then(function(supported) {{
+                if (!supported) {{
+                    video.src = progressiveSource(card);
+                    return;
+                }}
+                video.hls = new Hls();
+                video.hls.loadSource(playlist);
+                video.hls.attachMedia(video);
+            }});
+        }}
+
+        document.querySelectorAll('.story-card').forEach(function(card) {{
+            const media = card.querySelector('.media');
+            media.addEventListener('click', function() {{
+                if (media.querySelector('video')) return;
+                // Only one video at a time
+                document.querySelectorAll('.media video').forEach(function(other) {{
+                    other.pause();
+                    if (other.hls) other.hls.destroy();
+                    other.remove();
+                }});
+                const video = document.createElement('video');
+                video.controls = true;
+                video.autoplay = true;
+                media.appendChild(video);
+                attachSource(card, video);
+            }});
+        }});
+    </script>
+</body>
+</html>
+"""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate the demo gallery from demo_stories.json',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 demo_gallery.py
+  python3 demo_gallery.py --demo-dir demo-assets
+        """
+    )
+    parser.add_argument('--demo-dir', default='demo-assets',
+                        help='Demo assets directory (default: demo-assets)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    metadata_file = os.path.join(args.demo_dir, "demo_stories.json")
+    try:
+        with open(metadata_file, 'r') as f:
+            stories = json.load(f)
+    except FileNotFoundError:
+        print(f"❌ File not found: {metadata_file}")
+        return 1
+
+    output_file = os.path.join(args.demo_dir, "index.html")
+    generate_demo_gallery(stories, output_file)
+    print(f"✅ Wrote {output_file} ({len(stories)} stories)")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
@@ -3,27 +3,42 @@
 Generate presigned URLs for video stories to make them viewable in the browser.
 
 This script:
-1. Reads the video stories JSON file
+1. Reads the video stories from the story store (stories.db, see
+   story_store.py), or streams them from a dataset file (see story_io.py)
 2. Generates presigned S3 URLs for each video (valid for 7 days by default)
-3. Updates the JSON with presigned URLs
+3. Writes the updated stories back to the store and to the output dataset,
+   story by story as they are signed
 4. Optionally generates a new HTML report with working video links
 
 Usage:
-    python3 generate_presigned_urls.py --input all_video_stories.json
-    python3 generate_presigned_urls.py --input all_video_stories.json --expiration 86400  # Override to 1 day
-    python3 generate_presigned_urls.py --input all_video_stories.json --html-only  # Just regenerate HTML
+    python3 generate_presigned_urls.py --input all_video_stories.jsonl
+    python3 generate_presigned_urls.py --input all_video_stories.jsonl --expiration 86400  # Override to 1 day
+    python3 generate_presigned_urls.py --input all_video_stories.jsonl --html-only  # Just regenerate HTML
 """
 
-import boto3
 import argparse
 import json
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from decimal import Decimal
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Tuple, Union
+from urllib.parse import quote
 from botocore.exceptions import ClientError
 
+from aws_clients import get_client
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from story_ids import story_id as compute_story_id
+from story_io import StoryWriter, dataset_stem, dataset_suffix, iter_stories
+from story_parquet import write_parquet
+from story_store import DEFAULT_BATCH_SIZE, DEFAULT_DB, StoryStore
+
+
+DEFAULT_INPUT = 'all_video_stories.jsonl'
+
+# Stories for the HTML report: a list, or a function streaming them afresh for each pass
+StorySource = Union[List[Dict[str, Any]], Callable[[], Iterable[Dict[str, Any]]]]
+
 
 class DecimalEncoder(json.JSONEncoder):
     """Helper to convert Decimal types to int/float for JSON serialization"""
@@ -44,21 +59,6 @@ def load_resources_config(config_path: str = "resources.json") -> Dict[str, Any]
         sys.exit(1)
 
 
-def load_video_stories(input_file: str) -> List[Dict[str, Any]]:
-    """Load video stories from JSON file"""
-    try:
-        with open(input_file, 'r') as f:
-            stories = json.load(f)
-        print(f"✅ Loaded {len(stories)} video stories from {input_file}")
-        return stories
-    except FileNotFoundError:
-        print(f"❌ Input file not found: {input_file}")
-        sys.exit(1)
-    except json.JSONDecodeError as e:
-        print(f"❌ Invalid JSON in input file: {e}")
-        sys.exit(1)
-
-
 def generate_presigned_url(bucket_name: str, object_key: str, region: str, expiration: int = 2592000) -> str:
     """
     Generate a presigned URL for an S3 object
@@ -73,7 +73,8 @@ def generate_presigned_url(bucket_name: str, object_key: str, region: str, expir
         str: Presigned URL or error message
     """
     try:
-        s3_client = boto3.client('s3', region_name=region)
+        # Shared per region, and safe to use from concurrent presign workers
+        s3_client = get_client('s3', region)
         
         # First check if the object exists
         try:
@@ -100,166 +101,261 @@ def generate_presigned_url(bucket_name: str, object_key: str, region: str, expir
         return f"ERROR: Failed to generate presigned URL: {str(e)}"
 
 
-def process_video_stories(stories: List[Dict[str, Any]], config: Dict[str, Any], 
-                          expiration: int = 2592000, skip_missing: bool = True) -> List[Dict[str, Any]]:
+def is_presigned_url(url) -> bool:
+    """Whether a stored URL looks like a usable presigned URL (Signature V2 or V4)"""
+    return bool(url) and not url.startswith('ERROR:') and '?' in url and \
+        ('X-Amz-Expires=' in url or 'AWSAccessKeyId=' in url or 'Signature=' in url)
+
+
+def presign_story(story: Dict[str, Any], config: Dict[str, Any], expiration: int = 2592000,
+                  skip_missing: bool = True) -> str:
+    """
+    Generate presigned URLs for one story (video, and thumbnail if present), in place
+
+    Returns:
+        str: 'signed', 'reused', 'missing' or 'error'
+    """
+    # Check if this story already has a valid presigned URL
+    if is_presigned_url(story.get('_presigned_url')):
+        # URL exists and looks valid, reuse it
+        return 'reused'
+    
+    # Need to generate a new presigned URL
+    stage = story.get('_stage', 'unknown')
+    
+    # Get bucket for this stage
+    if stage not in config['stages']:
+        print(f"⚠️  Unknown stage: {stage}")
+        return 'error'
+    
+    stage_config = config['stages'][stage]
+    bucket_name = stage_config['s3_bucket']
+    region = stage_config['region']
+    
+    # Get video key
+    video_key = story.get('_video_url', story.get('video_url', ''))
+    if not video_key or video_key == 'N/A':
+        return 'error'
+    
+    # Generate presigned URL
+    presigned_url = generate_presigned_url(bucket_name, video_key, region, expiration)
+    
+    if presigned_url.startswith('ERROR:'):
+        if 'not found' in presigned_url:
+            outcome = 'missing'
+            if skip_missing:
+                story['_presigned_url'] = None
+                story['_presigned_error'] = 'Video file not found'
+            else:
+                story['_presigned_url'] = presigned_url
+        else:
+            outcome = 'error'
+            story['_presigned_url'] = presigned_url
+    else:
+        story['_presigned_url'] = presigned_url
+        outcome = 'signed'
+    
+    # Also generate presigned URL for thumbnail if present (or reuse existing)
+    thumbnail_key = story.get('thumbnail_url', '')
+    if not is_presigned_url(story.get('_presigned_thumbnail')) and thumbnail_key and thumbnail_key != 'N/A':
+        # Generate new thumbnail URL
+        thumbnail_presigned = generate_presigned_url(bucket_name, thumbnail_key, region, expiration)
+        if not thumbnail_presigned.startswith('ERROR:'):
+            story['_presigned_thumbnail'] = thumbnail_presigned
+    
+    return outcome
+
+
+PRESIGN_FIELDS = ('_presigned_url', '_presigned_thumbnail', '_presigned_error')
+
+
+def presign_state(story: Dict[str, Any]) -> tuple:
+    """The presigner's fields of a story, to tell which stories signing changed"""
+    return tuple(story.get(field) for field in PRESIGN_FIELDS)
+
+
+def iter_presigned_stories(stories: Iterable[Dict[str, Any]], config: Dict[str, Any],
+                           expiration: int = 2592000, skip_missing: bool = True,
+                           writer: Optional[StoryWriter] = None,
+                           total: Optional[int] = None) -> Iterator[Tuple[Dict[str, Any], bool]]:
     """
-    Process video stories and generate presigned URLs
+    Generate presigned URLs for stories as they stream past
+    
+    Stories can be a list or a stream (e.g. story_io.iter_stories), so
+    signing starts as soon as the first story is read, and only the story
+    being signed is held in memory.
     
     Args:
-        stories: List of video stories
+        stories: Video stories
         config: Resources configuration
         expiration: URL expiration time in seconds
         skip_missing: If True, skip videos that don't exist; if False, keep error messages
+        writer: Optional StoryWriter that receives each story as soon as it is processed
+        total: Number of stories, for progress percentages (default: len(stories) if known)
         
-    Returns:
-        list: Updated stories with presigned URLs
+    Yields:
+        tuple: (story, changed), changed if signing changed its presigned URL fields
     """
     print(f"\n🔗 Generating presigned URLs (expiration: {expiration // 3600} hours)...")
     
-    processed = 0
-    errors = 0
-    missing = 0
-    reused = 0
+    if total is None and hasattr(stories, '__len__'):
+        total = len(stories)
+    counts = {'signed': 0, 'reused': 0, 'missing': 0, 'error': 0}
+    total_processed = 0
     
     for story in stories:
-        # Check if this story already has a valid presigned URL
-        # Presigned URLs can use Signature V2 (AWSAccessKeyId) or V4 (X-Amz-*)
-        existing_url = story.get('_presigned_url')
-        if existing_url and not existing_url.startswith('ERROR:') and ('?' in existing_url) and \
-           ('X-Amz-Expires=' in existing_url or 'AWSAccessKeyId=' in existing_url or 'Signature=' in existing_url):
-            # URL exists and looks valid, reuse it
-            reused += 1
-            
-            # Progress indicator - show every 100 stories
-            total_processed = processed + errors + missing + reused
-            if total_processed % 100 == 0 and total_processed > 0:
-                percentage = (total_processed / len(stories)) * 100
-                print(f"   Progress: {total_processed}/{len(stories)} ({percentage:.1f}%) - "
-                      f"✓ {processed} signed, ♻️ {reused} reused, ✗ {missing} missing, ⚠ {errors} errors")
-            continue
-        
-        # Need to generate a new presigned URL
-        stage = story.get('_stage', 'unknown')
-        
-        # Get bucket for this stage
-        if stage not in config['stages']:
-            print(f"⚠️  Unknown stage: {stage}")
-            errors += 1
-            continue
-        
-        stage_config = config['stages'][stage]
-        bucket_name = stage_config['s3_bucket']
-        region = stage_config['region']
-        
-        # Get video key
-        video_key = story.get('_video_url', story.get('video_url', ''))
-        if not video_key or video_key == 'N/A':
-            errors += 1
-            continue
-        
-        # Generate presigned URL
-        presigned_url = generate_presigned_url(bucket_name, video_key, region, expiration)
-        
-        if presigned_url.startswith('ERROR:'):
-            if 'not found' in presigned_url:
-                missing += 1
-                if skip_missing:
-                    story['_presigned_url'] = None
-                    story['_presigned_error'] = 'Video file not found'
-                else:
-                    story['_presigned_url'] = presigned_url
-            else:
-                errors += 1
-                story['_presigned_url'] = presigned_url
-        else:
-            story['_presigned_url'] = presigned_url
-            processed += 1
-        
-        # Also generate presigned URL for thumbnail if present (or reuse existing)
-        existing_thumbnail = story.get('_presigned_thumbnail')
-        thumbnail_key = story.get('thumbnail_url', '')
-        
-        if existing_thumbnail and not existing_thumbnail.startswith('ERROR:') and ('?' in existing_thumbnail) and \
-           ('X-Amz-Expires=' in existing_thumbnail or 'AWSAccessKeyId=' in existing_thumbnail or 'Signature=' in existing_thumbnail):
-            # Reuse existing thumbnail URL
-            pass
-        elif thumbnail_key and thumbnail_key != 'N/A':
-            # Generate new thumbnail URL
-            thumbnail_presigned = generate_presigned_url(bucket_name, thumbnail_key, region, expiration)
-            if not thumbnail_presigned.startswith('ERROR:'):
-                story['_presigned_thumbnail'] = thumbnail_presigned
+        before = presign_state(story)
+        with phase('presign'):
+            counts[presign_story(story, config, expiration, skip_missing)] += 1
+        total_processed += 1
+        if writer is not None:
+            with phase('write/dataset'):
+                writer.write(story)
+        yield story, presign_state(story) != before
         
         # Progress indicator - show every 100 stories
-        total_processed = processed + errors + missing + reused
-        if total_processed % 100 == 0 and total_processed > 0:
-            percentage = (total_processed / len(stories)) * 100
-            print(f"   Progress: {total_processed}/{len(stories)} ({percentage:.1f}%) - "
-                  f"✓ {processed} signed, ♻️ {reused} reused, ✗ {missing} missing, ⚠ {errors} errors")
+        if total_processed % 100 == 0:
+            progress = f"{total_processed}/{total} ({total_processed / total * 100:.1f}%)" if total \
+                else f"{total_processed}"
+            print(f"   Progress: {progress} - "
+                  f"✓ {counts['signed']} signed, ♻️ {counts['reused']} reused, "
+                  f"✗ {counts['missing']} missing, ⚠ {counts['error']} errors")
     
     # Final summary
-    total_processed = processed + errors + missing + reused
-    total_available = processed + reused
-    percentage = (total_available / len(stories)) * 100 if len(stories) > 0 else 0
+    total_available = counts['signed'] + counts['reused']
+    percentage = (total_available / total_processed) * 100 if total_processed else 0
     print(f"\n{'=' * 70}")
-    print(f"✅ Generated {processed} new presigned URLs")
-    if reused > 0:
-        print(f"♻️  Reused {reused} existing presigned URLs")
-    print(f"📊 Total available: {total_available}/{len(stories)} ({percentage:.1f}% success)")
-    if missing > 0:
-        print(f"⚠️  {missing} video files not found in S3")
-    if errors > 0:
-        print(f"❌ {errors} errors occurred")
-    
-    return stories
+    print(f"✅ Generated {counts['signed']} new presigned URLs")
+    if counts['reused'] > 0:
+        print(f"♻️  Reused {counts['reused']} existing presigned URLs")
+    print(f"📊 Total available: {total_available}/{total_processed} ({percentage:.1f}% success)")
+    if counts['missing'] > 0:
+        print(f"⚠️  {counts['missing']} video files not found in S3")
+    if counts['error'] > 0:
+        print(f"❌ {counts['error']} errors occurred")
 
 
-def save_to_json(stories: List[Dict[str, Any]], output_file: str):
-    """Save video stories with presigned URLs to JSON file"""
+def process_video_stories(stories: Iterable[Dict[str, Any]], config: Dict[str, Any], 
+                          expiration: int = 2592000, skip_missing: bool = True,
+                          writer: Optional[StoryWriter] = None, total: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Process video stories and generate presigned URLs (see iter_presigned_stories)
+        
+    Returns:
+        list: Updated stories with presigned URLs
+    """
+    return [story for story, _ in iter_presigned_stories(stories, config, expiration, skip_missing, writer, total)]
+
+
+def save_to_store(stories: List[Dict[str, Any]], store: StoryStore) -> Optional[int]:
+    """Upsert a batch of stories into the story store; returns the number written, or None on error"""
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(stories, f, indent=2, cls=DecimalEncoder, ensure_ascii=False)
-        print(f"💾 Saved to: {output_file}")
+        with phase('write/store'):
+            return store.upsert_many(stories)
     except Exception as e:
-        print(f"❌ Error saving to file: {e}")
+        print(f"❌ Error saving to story store: {e}")
+        return None
 
 
-def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file: str):
+def _without_presigned_urls(stories: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    # --force-regenerate: sign every story anew
+    for story in stories:
+        story.pop('_presigned_url', None)
+        story.pop('_presigned_thumbnail', None)
+        yield story
+
+
+def save_to_parquet(stories: Iterable[Dict[str, Any]], output_dir: str) -> int:
+    """Export stories to a Parquet dataset (see story_parquet.py); returns the number written"""
+    try:
+        written = write_parquet(stories, output_dir)
+        print(f"📊 Exported {written} stories to Parquet: {output_dir}")
+        return written
+    except Exception as e:
+        print(f"❌ Error exporting to Parquet: {e}")
+        return 0
+
+
+def _dedupe_key(story: Dict[str, Any]) -> str:
+    # Same gamer + timestamp: the same video shown to multiple parents
+    gamer = story.get('GSI1PK', story.get('_gamer_extracted', ''))
+    timestamp = story.get('_created', story.get('timestamp', ''))
+    return f"{gamer}_{timestamp}"
+
+
+def _unique_stories(stories: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    seen = set()
+    for story in stories:
+        key = _dedupe_key(story)
+        if key not in seen:
+            seen.add(key)
+            yield story
+
+
+def generate_html_with_presigned_urls(stories: StorySource, output_file: str, video_proxy: bool = False):
     """
     Generate an HTML report with working presigned video URLs
+
+    The report takes three passes over the stories (header, cards, full
+    descriptions) and is written as it is rendered. Given a function that
+    streams the stories afresh, e.g. lambda: iter_stories(path), neither
+    the stories nor the report are held in memory.
+
+    Args:
+        stories: List of stories, or a function returning an iterator over them
+        output_file: Output HTML file path
+        video_proxy: Play videos through serve.py's caching proxy
+            (/video/<stage>/<key>) instead of directly from the presigned URL
     """
-    # Deduplicate stories based on gamer + timestamp (same video shown to multiple parents)
-    seen = {}
-    deduplicated_stories = []
+    try:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            for part in _presigned_report_parts(stories, video_proxy):
+                f.write(part)
+        print(f"📄 Generated HTML report: {output_file}")
+    except Exception as e:
+        print(f"❌ Error generating HTML report: {e}")
+
+
+def _presigned_report_parts(stories: StorySource, video_proxy: bool) -> Iterator[str]:
+    """The presigned HTML report, in parts"""
+    passes = stories if callable(stories) else lambda: stories
     
-    for story in stories:
-        gamer = story.get('GSI1PK', story.get('_gamer_extracted', ''))
-        timestamp = story.get('_created', story.get('timestamp', ''))
-        key = f"{gamer}_{timestamp}"
+    # Stats and filter options, over the deduplicated stories
+    original_count = total = available = missing = 0
+    stages = set()
+    gamer_info = {}
+    seen = set()
+    for story in passes():
+        original_count += 1
+        key = _dedupe_key(story)
+        if key in seen:
+            continue
+        seen.add(key)
+        total += 1
+        if story.get('_presigned_url') and not story['_presigned_url'].startswith('ERROR:'):
+            available += 1
+        if story.get('_presigned_error'):
+            missing += 1
+        stages.add(story.get('_stage', 'unknown'))
         
-        if key not in seen:
-            seen[key] = True
-            deduplicated_stories.append(story)
-    
-    original_count = len(stories)
-    stories = deduplicated_stories
-    
-    if original_count != len(stories):
-        print(f"ℹ️  Deduplicated: {original_count} → {len(stories)} stories ({original_count - len(stories)} duplicates removed)")
+        # Unique gamers with their extracted names
+        gamer_id = story.get('GSI1PK', story.get('_gamer_extracted', ''))
+        gamer_name = story.get('_gamer_extracted', gamer_id).split('_')[-1] if '_' in gamer_id else gamer_id
+        # Clean up the gamer name
+        gamer_display = gamer_name.replace('G#', '').replace('_', ' ')
+        if gamer_id and gamer_id != 'N/A':
+            gamer_info[gamer_id] = gamer_display
+    del seen
     
-    # Calculate stats
-    total = len(stories)
-    available = len([s for s in stories if s.get('_presigned_url') and not s['_presigned_url'].startswith('ERROR:')])
-    missing = len([s for s in stories if s.get('_presigned_error')])
+    if original_count != total:
+        print(f"ℹ️  Deduplicated: {original_count} → {total} stories ({original_count - total} duplicates removed)")
     
-    # Get expiration info from first valid presigned URL
+    # Expiration info, if any presigned URL is valid
     expiration_hours = 720  # default 30 days
     expiration_date = None
-    for story in stories:
-        if story.get('_presigned_url') and not story['_presigned_url'].startswith('ERROR:'):
-            # Calculate expiration (typically 7 days from now)
-            from datetime import datetime, timedelta
-            expiration_date = datetime.now() + timedelta(hours=expiration_hours)
-            break
+    if available:
+        # Calculate expiration (typically 7 days from now)
+        expiration_date = datetime.now() + timedelta(hours=expiration_hours)
     
     html = f"""<!DOCTYPE html>
 <html lang="en">
@@ -629,9 +725,7 @@ def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file
                 <option value="">All Stages</option>
 """
     
-    # Get unique stages
-    stages = sorted(set(s.get('_stage', 'unknown') for s in stories))
-    for stage in stages:
+    for stage in sorted(stages):
         html += f'            <option value="{stage}">{stage}</option>\n'
     
     html += """
@@ -659,16 +753,6 @@ def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file
                 <option value="">All Gamers</option>
 """
     
-    # Get unique gamers with their extracted names
-    gamer_info = {}
-    for s in stories:
-        gamer_id = s.get('GSI1PK', s.get('_gamer_extracted', ''))
-        gamer_name = s.get('_gamer_extracted', gamer_id).split('_')[-1] if '_' in gamer_id else gamer_id
-        # Clean up the gamer name
-        gamer_display = gamer_name.replace('G#', '').replace('_', ' ')
-        if gamer_id and gamer_id != 'N/A':
-            gamer_info[gamer_id] = gamer_display
-    
     # Sort by display name
     for gamer_id, gamer_display in sorted(gamer_info.items(), key=lambda x: x[1].lower()):
         html += f'                <option value="{gamer_id}">{gamer_display} ({gamer_id[:20]}...)</option>\n'
@@ -684,8 +768,9 @@ def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file
     <h2>Video Stories</h2>
     <div class="story-grid" id="storyGrid">
 """
+    yield html
     
-    for idx, story in enumerate(stories):
+    for idx, story in enumerate(_unique_stories(passes())):
         stage = story.get('_stage', 'unknown')
         gamer = story.get('_gamer_extracted', 'N/A')
         timestamp = story.get('_created', 'N/A')
@@ -704,11 +789,11 @@ def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file
         needs_expand = len(description) > 300
         
         # Create a unique ID for this story
-        story_id = f"{stage}_{gamer}_{timestamp}".replace('#', '_').replace(':', '_').replace('.', '_')
+        story_id = compute_story_id(story)
         
         gamer_id = story.get('GSI1PK', story.get('_gamer_extracted', ''))
         
-        html += f"""
+        html = f"""
         <div class="story-card" data-stage="{stage}" data-availability="{availability_class}" 
              data-search="{gamer.lower()} {description.lower()} {group.lower()}"
              data-story-id="{story_id}" data-gamer-id="{gamer_id}" id="story-{story_id}">
@@ -726,6 +811,11 @@ def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file
             else:
                 thumbnail_class = 'thumbnail-overlay no-thumbnail'
             
+            video_src = presigned_url
+            video_key = story.get('_video_url', story.get('video_url', ''))
+            if video_proxy and video_key and video_key != 'N/A':
+                video_src = f"/video/{quote(stage)}/{quote(video_key)}"
+            
             # Use class and data attributes instead of inline onclick
             html += f"""
             <div class="video-container video-playable">
@@ -733,7 +823,7 @@ def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file
                     <div class="play-button"></div>
                 </div>
                 <video controls preload="none">
-                    <source src="{presigned_url}" type="video/mp4">
+                    <source src="{video_src}" type="video/mp4">
                     Your browser does not support the video tag.
                 </video>
             </div>
@@ -779,8 +869,9 @@ def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file
             </div>
         </div>
 """
+        yield html
     
-    html += """
+    yield """
     </div>
     
     <script>
@@ -942,12 +1033,12 @@ def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file
 """
     
     # Add full descriptions for expanding
-    for idx, story in enumerate(stories):
+    for idx, story in enumerate(_unique_stories(passes())):
         description = story.get('_description', 'No description').replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
         if len(description) > 300:
-            html += f'            {idx}: "{description}",\n'
+            yield f'            {idx}: "{description}",\n'
     
-    html += """
+    yield """
         };
         
         function playVideo(container) {
@@ -1113,13 +1204,6 @@ def generate_html_with_presigned_urls(stories: List[Dict[str, Any]], output_file
 </body>
 </html>
 """
-    
-    try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(html)
-        print(f"📄 Generated HTML report: {output_file}")
-    except Exception as e:
-        print(f"❌ Error generating HTML report: {e}")
 
 
 def main():
@@ -1132,20 +1216,27 @@ Examples:
   python3 generate_presigned_urls.py --force-regenerate  # Regenerate all URLs
   python3 generate_presigned_urls.py --expiration 86400  # Override to 1 day
   python3 generate_presigned_urls.py --html-only  # Skip presigned URL generation
+  python3 generate_presigned_urls.py --html-only --video-proxy  # For serve.py --proxy
+  python3 generate_presigned_urls.py --no-db --input my_stories.jsonl.gz  # File in, file out
+  python3 generate_presigned_urls.py --no-db --input old.json --output new.jsonl  # Convert formats
+  python3 generate_presigned_urls.py --parquet stories.parquet  # Also export for analytics
+
+Stories are read from stories.db when it has any (scrape_video_stories.py
+fills it); only stories whose URLs changed are written back.
         """
     )
     
     parser.add_argument(
         '--input',
         '-i',
-        default='all_video_stories.json',
-        help='Input JSON file with video stories (default: all_video_stories.json)'
+        default=DEFAULT_INPUT,
+        help=f'Input dataset with video stories: .jsonl, .jsonl.gz, .jsonl.zst or legacy .json (default: {DEFAULT_INPUT})'
     )
     
     parser.add_argument(
         '--output',
         '-o',
-        help='Output JSON file (default: <input>_presigned.json)'
+        help='Output dataset; the suffix picks the format (default: <input>_presigned with the input\'s format)'
     )
     
     parser.add_argument(
@@ -1179,12 +1270,37 @@ Examples:
         help='Only regenerate HTML from existing presigned URLs (skip URL generation)'
     )
     
+    parser.add_argument(
+        '--video-proxy',
+        action='store_true',
+        help='Play videos through serve.py --proxy (cached locally) instead of directly from S3'
+    )
+    
     parser.add_argument(
         '--force-regenerate',
         action='store_true',
         help='Force regenerate all URLs (do not reuse existing presigned URLs)'
     )
     
+    parser.add_argument(
+        '--db',
+        default=DEFAULT_DB,
+        help=f'Story database to read from and update (default: {DEFAULT_DB})'
+    )
+    
+    parser.add_argument(
+        '--no-db',
+        action='store_true',
+        help='Read and write JSON files only, not the story database'
+    )
+    
+    parser.add_argument(
+        '--parquet',
+        metavar='DIR',
+        help='Also export the stories to a Parquet dataset partitioned by stage and month (needs pyarrow)'
+    )
+    
+    add_instrumentation_arguments(parser)
     args = parser.parse_args()
     
     print("🔗 Presigned URL Generator for GuardianGamer Video Stories")
@@ -1193,19 +1309,30 @@ Examples:
     # Determine output filenames
     input_path = Path(args.input)
     if not args.output:
-        output_json = input_path.stem + '_presigned.json'
+        output_json = dataset_stem(input_path.name) + '_presigned' + dataset_suffix(input_path.name)
     else:
         output_json = args.output
     
     if not args.html:
-        output_html = input_path.stem + '_presigned.html'
+        output_html = dataset_stem(input_path.name) + '_presigned.html'
     else:
         output_html = args.html
     
+    # The story store already holds the latest stories and URLs
+    store = None
+    if not args.no_db and args.input == DEFAULT_INPUT and Path(args.db).exists():
+        store = StoryStore(args.db)
+        if not store.count():
+            store = None
+    
     # Smart input selection: if a presigned version exists and we're using the default input,
     # use the presigned version to reuse existing URLs (unless force-regenerate is set)
     actual_input = args.input
-    if not args.force_regenerate and args.input == 'all_video_stories.json' and Path(output_json).exists():
+    if store is not None:
+        print(f"ℹ️  Reading stories from story store: {args.db}")
+        if args.force_regenerate:
+            print(f"🔄 Force regenerate mode: Will create all new presigned URLs")
+    elif not args.force_regenerate and args.input == DEFAULT_INPUT and Path(output_json).exists():
         print(f"ℹ️  Found existing presigned file: {output_json}")
         print(f"ℹ️  Will reuse valid URLs from it instead of regenerating all")
         print(f"   (Use --force-regenerate to regenerate all URLs from scratch)")
@@ -1213,25 +1340,74 @@ Examples:
     elif args.force_regenerate:
         print(f"🔄 Force regenerate mode: Will create all new presigned URLs")
     
-    # Load video stories
-    stories = load_video_stories(actual_input)
+    # Stories are streamed, from the store or a file, so signing (and
+    # writing the output) starts with the first story read and memory stays
+    # flat however many there are
+    total = None
+    if store is not None:
+        # Read on a connection of their own, while changed stories are written back
+        reader = StoryStore(args.db)
+        source = reader.iter_stories
+        total = store.count()
+        print(f"✅ Streaming {total} video stories from {args.db}")
+    elif not Path(actual_input).exists():
+        print(f"❌ Input file not found: {actual_input}")
+        return 1
+    else:
+        print(f"✅ Streaming video stories from {actual_input}")
+        source = lambda: iter_stories(actual_input)
     
     if not args.html_only:
         # Load configuration
         config = load_resources_config(args.config)
         
-        # Process and generate presigned URLs
-        stories = process_video_stories(stories, config, args.expiration, args.skip_missing)
+        stories = source()
+        if store is not None and args.force_regenerate:
+            stories = _without_presigned_urls(stories)
+        
+        # Process and generate presigned URLs, writing each story out as it is
+        # done. Updated stories are saved to the store in batches as they come:
+        # only the changed ones when read from it
+        target = None if args.no_db else (store or StoryStore(args.db))
+        batch = []
+        stored = 0
+        try:
+            with StoryWriter(output_json, cls=DecimalEncoder) as writer:
+                for story, changed in iter_presigned_stories(stories, config, args.expiration, args.skip_missing,
+                                                             writer=writer, total=total):
+                    if target is None or not (changed or store is None):
+                        continue
+                    batch.append(story)
+                    if len(batch) >= DEFAULT_BATCH_SIZE:
+                        written = save_to_store(batch, target)
+                        # After an error, keep signing but stop writing to the store
+                        target = None if written is None else target
+                        stored += written or 0
+                        batch = []
+                if target is not None and batch:
+                    written = save_to_store(batch, target)
+                    target = None if written is None else target
+                    stored += written or 0
+        except ValueError as e:
+            print(f"❌ Invalid JSON in input file: {e}")
+            return 1
+        print(f"💾 Saved to: {output_json}")
+        if target is not None:
+            print(f"📚 Updated {stored} stories in: {args.db}")
         
-        # Save updated JSON
-        save_to_json(stories, output_json)
+        # The output now holds every story: later passes stream it back
+        source = lambda: iter_stories(output_json)
+        if args.parquet:
+            with phase('write/parquet'):
+                save_to_parquet(source(), args.parquet)
     else:
         print("ℹ️  HTML-only mode: Using existing presigned URLs from input file")
         output_json = args.input
     
     # Generate HTML report
     print(f"\n📄 Generating HTML report...")
-    generate_html_with_presigned_urls(stories, output_html)
+    with phase('render'):
+        generate_html_with_presigned_urls(source, output_html, video_proxy=args.video_proxy)
     
     print(f"\n{'=' * 70}")
     print("✅ Presigned URL generation complete!")
@@ -1246,5 +1422,5 @@ Examples:
 
 
 if __name__ == '__main__':
-    exit(main())
+    exit(run_main(main))
 
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Per-phase timings and profiling for the tool scripts.
+
+Every entry point accepts:
+
+    --timings [FILE]   Write a JSON report: wall and CPU time per phase,
+                       AWS API calls and bytes per operation, peak memory
+                       (default FILE: timings/<script>-<timestamp>.json)
+    --profile FILE     Profile the run: cProfile stats (.prof, for pstats or
+                       snakeviz), or with --profiler sampling, collapsed stacks
+                       of all threads (for flamegraph.pl or speedscope)
+
+Phases are marked in the code with phase(), which costs next to nothing
+when --timings is off:
+
+    with phase('enrich'):
+        stories = enrich_video_stories(stories)
+
+Repeated phases (e.g. one per scan page) are aggregated: calls, total and
+max wall time, CPU time of the thread that ran them. Compare two reports:
+
+    python3 instrumentation.py compare timings/before.json timings/after.json
+"""
+
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_TIMINGS_DIR = 'timings'
+SAMPLING_INTERVAL = 0.005
+
+_recorder: Optional['Recorder'] = None
+
+
+class Recorder:
+    """Aggregated phase timings and AWS API call counts of one run"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.api_calls: Dict[str, Dict[str, float]] = {}
+        self.started = time.time()
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def add_phase(self, name: str, wall: float, cpu: float):
+        with self.lock:
+            entry = self.phases.get(name)
+            if entry is None:
+                entry = self.phases[name] = {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                                             'max_wall_seconds': 0.0}
+            entry['calls'] += 1
+            entry['wall_seconds'] += wall
+            entry['cpu_seconds'] += cpu
+            if wall > entry['max_wall_seconds']:
+                entry['max_wall_seconds'] = wall
+
+    def add_api_call(self, operation: str, seconds: float, response_bytes: int, error: bool):
+        with self.lock:
+            entry = self.api_calls.get(operation)
+            if entry is None:
+                entry = self.api_calls[operation] = {'calls': 0, 'errors': 0, 'bytes': 0, 'seconds': 0.0}
+            entry['calls'] += 1
+            entry['errors'] += error
+            entry['bytes'] += response_bytes
+            entry['seconds'] += seconds
+
+    def report(self, script: str, exit_code: Any) -> Dict[str, Any]:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        rss_scale = 1 if sys.platform == 'darwin' else 1024
+        round_values = lambda entries: {name: {key: round(value, 6) if isinstance(value, float) else value
+                                               for key, value in entry.items()}
+                                        for name, entry in entries.items()}
+        return {
+            'script': script,
+            'argv': sys.argv[1:],
+            'started': datetime.fromtimestamp(self.started).isoformat(timespec='seconds'),
+            'exit_code': exit_code,
+            'python': sys.version.split()[0],
+            'wall_seconds': round(time.perf_counter() - self.wall_start, 6),
+            'cpu_seconds': round(time.process_time() - self.cpu_start, 6),
+            'children_cpu_seconds': round(children.ru_utime + children.ru_stime, 6),
+            'peak_rss_mb': round(usage.ru_maxrss * rss_scale / 1024 / 1024, 1),
+            'phases': round_values(self.phases),
+            'api_calls': round_values(self.api_calls),
+        }
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block as the named phase (only when --timings is on)"""
+    recorder = _recorder
+    if recorder is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        recorder.add_phase(name, time.perf_counter() - wall, time.thread_time() - cpu)
+
+
+def _instrument_botocore(recorder: Recorder):
+    """Count every AWS API call, whichever session or client makes it"""
+    try:
+        from botocore.client import BaseClient
+    except ImportError:
+        return
+    if getattr(BaseClient._make_api_call, '_instrumented', False):
+        return
+    original = BaseClient._make_api_call
+
+    def _make_api_call(self, operation_name, api_params):
+        operation = f"{self.meta.service_model.service_name}.{operation_name}"
+        start = time.perf_counter()
+        error = False
+        response = {}
+        try:
+            response = original(self, operation_name, api_params)
+            return response
+        except Exception as e:
+            error = True
+            response = getattr(e, 'response', None) or {}
+            raise
+        finally:
+            headers = response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+            try:
+                # A HEAD response's content-length is the object's size, not what was sent
+                response_bytes = 0 if operation_name.startswith('Head') else int(headers.get('content-length', 0))
+            except ValueError:
+                response_bytes = 0
+            recorder.add_api_call(operation, time.perf_counter() - start, response_bytes, error)
+
+    _make_api_call._instrumented = True
+    BaseClient._make_api_call = _make_api_call
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads at a fixed interval, as collapsed stack counts"""
+
+    def __init__(self, interval: float = SAMPLING_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, 'thread'))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self, output_file: str):
+        self._stop.set()
+        self._thread.join()
+        with open(output_file, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def add_instrumentation_arguments(parser: argparse.ArgumentParser):
+    """Add --timings/--profile/--profiler (handled by run_main) to a script's parser"""
+    group = parser.add_argument_group('instrumentation')
+    group.add_argument('--timings', nargs='?', const='', metavar='FILE',
+                       help=f'Write per-phase timings, API calls and bytes as JSON '
+                            f'(default FILE: {DEFAULT_TIMINGS_DIR}/<script>-<timestamp>.json)')
+    group.add_argument('--profile', metavar='FILE',
+                       help='Profile the run into FILE (cProfile stats, or collapsed stacks with --profiler sampling)')
+    group.add_argument('--profiler', choices=['cprofile', 'sampling'], default='cprofile',
+                       help='cprofile: deterministic, main thread only; sampling: all threads, '
+                            'low overhead (default: cprofile)')
+
+
+def _print_summary(report: Dict[str, Any], output_file: str):
+    print(f"\n⏱️  {report['script']}: {report['wall_seconds']:.2f}s wall, {report['cpu_seconds']:.2f}s CPU, "
+          f"peak {report['peak_rss_mb']} MB", file=sys.stderr)
+    for name, entry in sorted(report['phases'].items(), key=lambda item: -item[1]['wall_seconds']):
+        print(f"   {name:<32} {entry['calls']:>6}x  {entry['wall_seconds']:8.3f}s wall  "
+              f"{entry['cpu_seconds']:8.3f}s CPU", file=sys.stderr)
+    for name, entry in sorted(report['api_calls'].items()):
+        print(f"   {name:<32} {entry['calls']:>6}x  {entry['seconds']:8.3f}s  "
+              f"{entry['bytes'] / 1024 / 1024:8.2f} MB", file=sys.stderr)
+    print(f"   Report: {output_file}", file=sys.stderr)
+
+
+def run_main(main: Callable[[], Any]) -> Any:
+    """
+    Run a script's main() with the instrumentation its command line asks for
+
+    Usage (instead of exit(main())):
+        if __name__ == '__main__':
+            exit(run_main(main))
+    """
+    global _recorder
+    parser = argparse.ArgumentParser(add_help=False)
+    add_instrumentation_arguments(parser)
+    options, _ = parser.parse_known_args()
+    script = os.path.splitext(os.path.basename(sys.argv[0]))[0]
+
+    if options.timings is not None:
+        _recorder = Recorder()
+        _instrument_botocore(_recorder)
+    profiler = None
+    if options.profile and options.profiler == 'sampling':
+        profiler = SamplingProfiler()
+        profiler.start()
+    elif options.profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    exit_code = None
+    try:
+        exit_code = main()
+        return exit_code
+    except KeyboardInterrupt:
+        exit_code = 130
+        raise
+    finally:
+        if isinstance(profiler, SamplingProfiler):
+            profiler.stop(options.profile)
+            print(f"🔬 Sampling profile ({sum(profiler.stacks.values())} samples): {options.profile}",
+                  file=sys.stderr)
+        elif profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(options.profile)
+            print(f"🔬 Profile: {options.profile} (top functions by cumulative time:)", file=sys.stderr)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(15)
+        if _recorder is not None:
+            report = _recorder.report(script, exit_code)
+            output_file = options.timings or os.path.join(
+                DEFAULT_TIMINGS_DIR, f"{script}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+            if os.path.dirname(output_file):
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            with open(output_file, 'w') as f:
+                json.dump(report, f, indent=2)
+            _print_summary(report, output_file)
+
+
+def compare_reports(before: Dict[str, Any], after: Dict[str, Any]):
+    """Print per-phase and per-API wall time changes between two reports"""
+    def line(name, old, new):
+        change = f"{(new - old) / old * 100:+.0f}%" if old else 'new'
+        print(f"   {name:<32} {old:10.3f}s → {new:10.3f}s  {change}")
+
+    print(f"⏱️  {before['script']} ({before['started']}) → {after['script']} ({after['started']})")
+    line('total', before['wall_seconds'], after['wall_seconds'])
+    line('cpu', before['cpu_seconds'], after['cpu_seconds'])
+    print(f"   {'peak memory':<32} {before['peak_rss_mb']:10.1f}MB → {after['peak_rss_mb']:10.1f}MB")
+    for section, key in (('phases', 'wall_seconds'), ('api_calls', 'seconds')):
+        for name in sorted(set(before[section]) | set(after[section])):
+            line(name, before[section].get(name, {}).get(key, 0.0), after[section].get(name, {}).get(key, 0.0))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare timing reports written with --timings',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 scrape_video_stories.py --timings timings/before.json
+  python3 scrape_video_stories.py --timings timings/after.json
+  python3 instrumentation.py compare timings/before.json timings/after.json
+        """
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compare = subparsers.add_parser('compare', help='Show time per phase of two reports side by side')
+    compare.add_argument('before')
+    compare.add_argument('after')
+    args = parser.parse_args()
+
+    try:
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e.filename}")
+        return 1
+    compare_reports(before, after)
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Load-testing harness for serve.py.
+
+This script:
+1. Builds a throwaway workspace with synthetic stories, an HTML report and
+   fake mp4/jpg assets (see synthetic_data.py)
+2. Starts serve.py against it in each requested server mode
+3. Replays realistic viewer sessions from many concurrent virtual users:
+   load the page, query the story API (list a stage, open a story), fetch
+   thumbnails, range-read mp4s (start + a seek)
+4. Reports throughput, p50/p95/p99 latency and error rates per step and mode
+
+Server modes:
+    single    - serve.py as-is (single-threaded TCPServer)
+    threaded  - serve.py --threaded
+    proxy     - serve.py --proxy, videos fetched from a local S3 stand-in
+                through the on-disk LRU cache
+
+Usage:
+    python3 loadtest.py
+    python3 loadtest.py --modes single threaded proxy --users 20 --duration 30
+    python3 loadtest.py --modes threaded --json loadtest_results.json
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from urllib.parse import quote
+
+from generate_presigned_urls import generate_html_with_presigned_urls
+from instrumentation import add_instrumentation_arguments, run_main
+from local_aws import LocalS3Server
+from story_ids import story_id
+from scrape_video_stories import enrich_video_stories
+from story_store import StoryStore
+from synthetic_data import generate_synthetic_stories
+
+SERVE_SCRIPT = Path(__file__).resolve().parent / 'serve.py'
+MODES = ['single', 'threaded', 'proxy']
+
+
+def build_workspace(root: Path, story_count: int, video_kb: int, thumbnail_kb: int,
+                    config: Dict[str, Any], seed: int = 42) -> Dict[str, Any]:
+    """
+    Write synthetic stories, HTML reports, a story database and assets into a workspace
+
+    Videos appear twice, as hardlinks: under media/ for direct serving and
+    under s3/<bucket>/<key> for the local S3 stand-in used by proxy mode.
+
+    Returns:
+        dict: Paths and URLs the sessions need (page, thumbnails, videos)
+    """
+    stages = list(config['stages'].keys())
+    stories = enrich_video_stories(generate_synthetic_stories(story_count, stages=stages, seed=seed))
+    rng = random.Random(seed)
+
+    media_dir = root / 'media'
+    media_dir.mkdir(parents=True, exist_ok=True)
+    # Every story gets the same content, hardlinked, so big runs stay cheap on disk
+    video_source = root / 'video.bin'
+    video_source.write_bytes(rng.randbytes(video_kb * 1024))
+    thumbnail_source = root / 'thumbnail.bin'
+    thumbnail_source.write_bytes(rng.randbytes(thumbnail_kb * 1024))
+
+    direct_videos, proxy_videos, thumbnails = [], [], []
+    for idx, story in enumerate(stories):
+        stage = story['_stage']
+        video_key = story['_video_url']
+        name = f"story{idx:05d}"
+
+        os.link(video_source, media_dir / f"{name}.mp4")
+        bucket_path = root / 's3' / config['stages'][stage]['s3_bucket'] / video_key
+        bucket_path.parent.mkdir(parents=True, exist_ok=True)
+        os.link(video_source, bucket_path)
+        story['_presigned_url'] = f"/media/{name}.mp4"
+        direct_videos.append(f"/media/{name}.mp4")
+        proxy_videos.append(f"/video/{quote(stage)}/{quote(video_key)}")
+
+        if story.get('thumbnail_url'):
+            os.link(thumbnail_source, media_dir / f"{name}.jpg")
+            story['_presigned_thumbnail'] = f"/media/{name}.jpg"
+            thumbnails.append(f"/media/{name}.jpg")
+
+    generate_html_with_presigned_urls(stories, str(root / 'direct.html'))
+    generate_html_with_presigned_urls(stories, str(root / 'proxy.html'), video_proxy=True)
+
+    store = StoryStore(str(root / 'stories.db'))
+    store.upsert_many(stories)
+    store.close()
+
+    with open(root / 'resources.json', 'w') as f:
+        json.dump(config, f, indent=2)
+
+    return {
+        'stages': stages,
+        'story_ids': [story_id(story) for story in stories],
+        'direct_videos': direct_videos,
+        'proxy_videos': proxy_videos,
+        'thumbnails': thumbnails,
+        'video_size': video_kb * 1024,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"serve.py did not start listening on port {port}")
+
+
+def start_server(mode: str, workspace: Path, s3_endpoint: str) -> Tuple[subprocess.Popen, int]:
+    """Start serve.py in the given mode and wait until it accepts connections"""
+    port = _free_port()
+    cmd = [sys.executable, str(SERVE_SCRIPT), '--port', str(port), '--db', 'stories.db']
+    env = dict(os.environ)
+    if mode == 'single':
+        cmd += ['--html', 'direct.html']
+    elif mode == 'threaded':
+        cmd += ['--html', 'direct.html', '--threaded']
+    elif mode == 'proxy':
+        cmd += ['--html', 'proxy.html', '--proxy', '--cache-dir', '.video-cache',
+                '--s3-endpoint-url', s3_endpoint]
+        # The local S3 stand-in doesn't check signatures, but boto3 needs credentials to sign
+        env.setdefault('AWS_ACCESS_KEY_ID', 'loadtest')
+        env.setdefault('AWS_SECRET_ACCESS_KEY', 'loadtest')
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+
+    process = subprocess.Popen(cmd, cwd=workspace, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_for_port(port)
+    except RuntimeError:
+        process.kill()
+        raise
+    return process, port
+
+
+class Recorder:
+    """Thread-safe collection of per-step request results"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.bytes = defaultdict(int)
+
+    def record(self, step: str, latency: float, ok: bool, size: int):
+        with self._lock:
+            self.latencies[step].append(latency)
+            self.bytes[step] += size
+            if not ok:
+                self.errors[step] += 1
+
+
+def _request(port: int, path: str, recorder: Recorder, step: str, headers: Dict[str, str] = None,
+             expected=(200,)):
+    start = time.perf_counter()
+    size = 0
+    ok = False
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        while True:
+            chunk = response.read(256 * 1024)
+            if not chunk:
+                break
+            size += len(chunk)
+        ok = response.status in expected
+    except (OSError, http.client.HTTPException):
+        ok = False
+    finally:
+        conn.close()
+    recorder.record(step, time.perf_counter() - start, ok, size)
+
+
+def pick_videos(videos: List[str], count: int, rng: random.Random) -> List[str]:
+    """Choose clips to watch; most plays go to a small set of popular clips, like team reviews"""
+    popular = videos[:max(len(videos) // 10, 1)]
+    return [rng.choice(popular) if rng.random() < 0.8 else rng.choice(videos) for _ in range(count)]
+
+
+def run_session(port: int, assets: Dict[str, Any], videos: List[str], rng: random.Random,
+                recorder: Recorder, thumbnails_per_page: int, videos_per_session: int):
+    """One viewer: open the report, browse the story API, scroll through thumbnails, watch and seek a few clips"""
+    _request(port, '/', recorder, 'page')
+
+    _request(port, f"/api/stories?stage={quote(rng.choice(assets['stages']))}&limit=50", recorder, 'api_list')
+    _request(port, f"/api/stories/{quote(rng.choice(assets['story_ids']))}", recorder, 'api_story')
+
+    if assets['thumbnails']:
+        for path in rng.sample(assets['thumbnails'], min(thumbnails_per_page, len(assets['thumbnails']))):
+            _request(port, path, recorder, 'thumbnail')
+
+    video_size = assets['video_size']
+    for path in pick_videos(videos, videos_per_session, rng):
+        # Browsers open with an unbounded range, then seek somewhere in the middle
+        _request(port, path, recorder, 'video_start', {'Range': 'bytes=0-'}, expected=(200, 206))
+        offset = rng.randrange(video_size // 2, video_size)
+        _request(port, path, recorder, 'video_seek', {'Range': f'bytes={offset}-'}, expected=(206,))
+
+
+def run_load(port: int, assets: Dict[str, Any], videos: List[str], users: int, duration: float,
+             thumbnails_per_page: int, videos_per_session: int, seed: int) -> Tuple[Recorder, float, int]:
+    """Run concurrent virtual users against a server for a fixed duration"""
+    recorder = Recorder()
+    deadline = time.monotonic() + duration
+    sessions = [0]
+    sessions_lock = threading.Lock()
+
+    def user(user_idx):
+        rng = random.Random(seed + user_idx)
+        while time.monotonic() < deadline:
+            run_session(port, assets, videos, rng, recorder, thumbnails_per_page, videos_per_session)
+            with sessions_lock:
+                sessions[0] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - start, sessions[0]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(recorder: Recorder, elapsed: float, sessions: int) -> Dict[str, Any]:
+    """Throughput, latency percentiles and error rates per step and overall"""
+    def stats(latencies, errors, size):
+        ordered = sorted(latencies)
+        count = len(ordered)
+        return {
+            'requests': count,
+            'errors': errors,
+            'error_rate': errors / count if count else 0.0,
+            'requests_per_second': count / elapsed if elapsed else 0.0,
+            'mb_per_second': size / elapsed / (1024 * 1024) if elapsed else 0.0,
+            'p50_ms': percentile(ordered, 50) * 1000,
+            'p95_ms': percentile(ordered, 95) * 1000,
+            'p99_ms': percentile(ordered, 99) * 1000,
+        }
+
+    steps = {step: stats(latencies, recorder.errors[step], recorder.bytes[step])
+             for step, latencies in recorder.latencies.items()}
+    all_latencies = [value for latencies in recorder.latencies.values() for value in latencies]
+    overall = stats(all_latencies, sum(recorder.errors.values()), sum(recorder.bytes.values()))
+    overall['sessions'] = sessions
+    overall['sessions_per_second'] = sessions / elapsed if elapsed else 0.0
+    return {'elapsed_seconds': elapsed, 'overall': overall, 'steps': steps}
+
+
+def print_report(mode: str, summary: Dict[str, Any]):
+    overall = summary['overall']
+    print(f"\n📊 Mode: {mode} ({summary['elapsed_seconds']:.1f}s, {overall['sessions']} sessions)")
+    print(f"   {'step':<12} {'reqs':>7} {'req/s':>8} {'MB/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>8}")
+    rows = sorted(summary['steps'].items()) + [('TOTAL', overall)]
+    for step, row in rows:
+        print(f"   {step:<12} {row['requests']:>7} {row['requests_per_second']:>8.1f} "
+              f"{row['mb_per_second']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['error_rate']:>7.1%}")
+
+
+def print_comparison(results: Dict[str, Dict[str, Any]]):
+    if len(results) < 2:
+        return
+    modes = list(results)
+    baseline = results[modes[0]]['overall']
+    print(f"\n{'=' * 70}")
+    print(f"⚖️  Comparison (relative to {modes[0]}):")
+    for mode in modes:
+        overall = results[mode]['overall']
+        speedup = overall['requests_per_second'] / baseline['requests_per_second'] \
+            if baseline['requests_per_second'] else 0.0
+        print(f"   {mode:<10} {overall['requests_per_second']:>8.1f} req/s ({speedup:.2f}x)  "
+              f"p95 {overall['p95_ms']:.1f} ms  p99 {overall['p99_ms']:.1f} ms  "
+              f"errors {overall['error_rate']:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Load-test serve.py with synthetic viewer sessions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 loadtest.py
+  python3 loadtest.py --modes single threaded proxy --users 20 --duration 30
+  python3 loadtest.py --modes threaded --video-kb 8192 --json results.json
+        """
+    )
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=['single', 'threaded'],
+                        help='Server modes to test, in order (default: single threaded)')
+    parser.add_argument('--users', type=int, default=10, help='Concurrent virtual users (default: 10)')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per mode (default: 15)')
+    parser.add_argument('--stories', type=int, default=500, help='Synthetic stories (default: 500)')
+    parser.add_argument('--video-kb', type=int, default=2048, help='Size of each fake mp4 in KB (default: 2048)')
+    parser.add_argument('--thumbnail-kb', type=int, default=40, help='Size of each fake thumbnail in KB (default: 40)')
+    parser.add_argument('--thumbnails-per-page', type=int, default=12,
+                        help='Thumbnails each session loads (default: 12)')
+    parser.add_argument('--videos-per-session', type=int, default=2,
+                        help='Videos each session plays and seeks (default: 2)')
+    parser.add_argument('--config', default='resources.json',
+                        help='Resources configuration for stage/bucket names (default: resources.json)')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    print("🏋️  serve.py Load Test")
+    print("=" * 70)
+
+    with open(args.config, 'r') as f:
+        config = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix='serve-loadtest-') as tmp:
+        workspace = Path(tmp)
+        print(f"\n🔧 Building workspace with {args.stories} synthetic stories...")
+        assets = build_workspace(workspace, args.stories, args.video_kb, args.thumbnail_kb, config, args.seed)
+
+        s3_server = LocalS3Server(str(workspace / 's3'))
+        s3_server.start_in_background()
+
+        results = {}
+        try:
+            for mode in args.modes:
+                print(f"\n🚀 Running {mode} mode: {args.users} users for {args.duration:.0f}s...")
+                process, port = start_server(mode, workspace, s3_server.endpoint_url)
+                try:
+                    videos = assets['proxy_videos'] if mode == 'proxy' else assets['direct_videos']
+                    recorder, elapsed, sessions = run_load(
+                        port, assets, videos, args.users, args.duration,
+                        args.thumbnails_per_page, args.videos_per_session, args.seed)
+                finally:
+                    process.terminate()
+                    process.wait(timeout=10)
+                results[mode] = summarize(recorder, elapsed, sessions)
+                print_report(mode, results[mode])
+        finally:
+            s3_server.shutdown()
+            s3_server.server_close()
+
+    print_comparison(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+        print(f"\n💾 Saved results to: {args.json}")
+
+    errors = sum(result['overall']['errors'] for result in results.values())
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
@@ -0,0 +1,664 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the AWS services used by the tool scripts.
+
+Lets serve.py's video proxy, the scrapers and the benchmarks (anything that
+talks to S3 or DynamoDB through boto3) run against local data, without AWS
+credentials or network access.
+
+The S3 stand-in serves a directory tree as path-style buckets:
+
+    <root>/<bucket>/<key>  ->  http://127.0.0.1:<port>/<bucket>/<key>
+
+It supports GetObject (including Range requests) and HeadObject, which is all
+the scripts need.
+
+The DynamoDB stand-in holds tables in memory, loaded from story datasets. It
+supports Scan (1 MB pages, FilterExpression), Query (on the table or a GSIn
+index keyed GSInPK/GSInSK), BatchGetItem and DescribeTable, with the
+comparison and begins_with conditions the scripts use.
+
+Usage:
+    python3 local_aws.py s3 --root ./fake-s3 --port 9000
+    python3 local_aws.py dynamodb --dataset synthetic_stories.jsonl --config resources.json --port 9001
+
+    # Then point boto3 at them, e.g.:
+    AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test \\
+        python3 serve.py --proxy --s3-endpoint-url http://127.0.0.1:9000
+    AWS_ACCESS_KEY_ID=test AWS_SECRET_ACCESS_KEY=test AWS_ENDPOINT_URL_DYNAMODB=http://127.0.0.1:9001 \\
+        python3 scrape_video_stories.py
+"""
+
+import argparse
+import email.utils
+import hashlib
+import http.server
+import json
+import mimetypes
+import re
+import threading
+import urllib.parse
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from instrumentation import add_instrumentation_arguments, run_main
+from story_io import iter_stories
+
+# Scan and Query stop after this much data, like DynamoDB
+DYNAMODB_PAGE_BYTES = 1024 * 1024
+DYNAMODB_BATCH_GET_LIMIT = 100
+
+
+def parse_range_header(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range HTTP Range header
+
+    Args:
+        value: Header value, e.g. "bytes=0-1023", "bytes=500-" or "bytes=-500"
+        size: Total size of the resource
+
+    Returns:
+        tuple: Inclusive (start, end) byte positions, or None if the header
+        is malformed or unsatisfiable
+    """
+    if not value.startswith('bytes=') or ',' in value:
+        return None
+    start_str, _, end_str = value[len('bytes='):].strip().partition('-')
+    try:
+        if not start_str:
+            # Suffix range: last N bytes
+            length = int(end_str)
+            if length <= 0:
+                return None
+            return max(size - length, 0), size - 1
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+class LocalS3Handler(http.server.BaseHTTPRequestHandler):
+    """Path-style S3 GetObject/HeadObject over a local directory"""
+
+    root: Path = Path('.')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _resolve(self) -> Optional[Path]:
+        path = urllib.parse.urlsplit(self.path).path
+        parts = urllib.parse.unquote(path).lstrip('/').split('/', 1)
+        if len(parts) != 2 or not parts[1]:
+            return None
+        target = (self.root / parts[0] / parts[1]).resolve()
+        if self.root.resolve() not in target.parents or not target.is_file():
+            return None
+        return target
+
+    def _send_error(self, status: int, code: str, message: str):
+        body = (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                f'<Error><Code>{code}</Code><Message>{message}</Message></Error>').encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/xml')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _serve(self, send_body: bool):
+        target = self._resolve()
+        if target is None:
+            return self._send_error(404, 'NoSuchKey', 'The specified key does not exist.')
+
+        stat = target.stat()
+        size = stat.st_size
+        etag = hashlib.md5(f"{target}:{size}:{stat.st_mtime_ns}".encode('utf-8')).hexdigest()
+
+        start, end = 0, size - 1
+        status = 200
+        range_header = self.headers.get('Range')
+        if range_header and size > 0:
+            byte_range = parse_range_header(range_header, size)
+            if byte_range is None:
+                return self._send_error(416, 'InvalidRange', 'The requested range is not satisfiable')
+            start, end = byte_range
+            status = 206
+
+        length = end - start + 1 if size > 0 else 0
+        self.send_response(status)
+        self.send_header('Content-Type', mimetypes.guess_type(target.name)[0] or 'binary/octet-stream')
+        self.send_header('Content-Length', str(length))
+        self.send_header('ETag', f'"{etag}"')
+        self.send_header('Last-Modified', email.utils.formatdate(stat.st_mtime, usegmt=True))
+        self.send_header('Accept-Ranges', 'bytes')
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+
+        if send_body and length:
+            with open(target, 'rb') as f:
+                f.seek(start)
+                remaining = length
+                while remaining:
+                    chunk = f.read(min(remaining, 256 * 1024))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+
+    def do_GET(self):
+        self._serve(send_body=True)
+
+    def do_HEAD(self):
+        self._serve(send_body=False)
+
+
+class _LocalServer(http.server.ThreadingHTTPServer):
+    """Threaded stand-in server that can run in the background of a script"""
+
+    daemon_threads = True
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_in_background(self) -> threading.Thread:
+        """Serve from a daemon thread and return it"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class LocalS3Server(_LocalServer):
+    """
+    Threaded S3 stand-in serving <root>/<bucket>/<key>
+
+    Args:
+        root: Directory whose subdirectories are buckets
+        port: Port to listen on (0 picks a free port)
+        host: Interface to bind
+    """
+
+    def __init__(self, root: str, port: int = 0, host: str = '127.0.0.1'):
+        handler = type('BoundLocalS3Handler', (LocalS3Handler,), {'root': Path(root)})
+        super().__init__((host, port), handler)
+
+
+class DynamoDBError(Exception):
+    """A DynamoDB API error, sent to the client as its __type and message"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def to_attribute_value(value) -> Dict[str, Any]:
+    """A plain JSON value in DynamoDB's typed wire format ({'S': ...}, {'N': ...}, ...)"""
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, (list, tuple)):
+        return {'L': [to_attribute_value(item) for item in value]}
+    if isinstance(value, dict):
+        return {'M': {key: to_attribute_value(item) for key, item in value.items()}}
+    raise TypeError(f"Can't store {type(value).__name__} in DynamoDB")
+
+
+def to_dynamodb_item(story: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """A story as a DynamoDB item, without the _fields the scripts add"""
+    return {key: to_attribute_value(value) for key, value in story.items() if not key.startswith('_')}
+
+
+def _comparable(value: Optional[Dict[str, Any]]) -> Optional[Tuple[str, Any]]:
+    """(type, value) of a wire-format attribute value, numbers as Decimal"""
+    if not value:
+        return None
+    (kind, raw), = value.items()
+    return kind, Decimal(raw) if kind == 'N' else raw
+
+
+_CLAUSE = re.compile(
+    r'\s*(?:begins_with\(\s*(?P<prefix_attr>[#\w]+)\s*,\s*(?P<prefix>:\w+)\s*\)'
+    r'|(?P<between_attr>[#\w]+)\s+BETWEEN\s+(?P<low>:\w+)\s+AND\s+(?P<high>:\w+)'
+    r'|(?P<attr>[#\w]+)\s*(?P<op><=|>=|=|<|>)\s*(?P<value>:\w+))\s*', re.IGNORECASE)
+_AND = re.compile(r'AND\b\s*', re.IGNORECASE)
+# Top-level attributes kept decoded next to each item: table and GSI keys
+_KEY_ATTRIBUTE = re.compile(r'^(?:GSI\d+)?(?:PK|SK)$')
+
+
+def parse_condition(expression: str, names: Dict[str, str],
+                    values: Dict[str, Dict[str, Any]]) -> List[Tuple[str, str, tuple]]:
+    """
+    Parse a key condition or filter expression into (attribute, operator, operands) clauses
+
+    Supports clauses joined by AND: attr = :v (also <, <=, >, >=),
+    attr BETWEEN :a AND :b and begins_with(attr, :v).
+
+    Raises:
+        DynamoDBError: ValidationException for anything else
+    """
+    clauses = []
+    pos = 0
+    while True:
+        match = _CLAUSE.match(expression, pos)
+        if match is None:
+            raise DynamoDBError('ValidationException', f"Unsupported expression: {expression}")
+        if match.group('prefix_attr'):
+            attr, op, operands = match.group('prefix_attr'), 'begins_with', [match.group('prefix')]
+        elif match.group('between_attr'):
+            attr, op, operands = match.group('between_attr'), 'between', [match.group('low'), match.group('high')]
+        else:
+            attr, op, operands = match.group('attr'), match.group('op'), [match.group('value')]
+        try:
+            clauses.append((names.get(attr, attr), op, tuple(_comparable(values[name]) for name in operands)))
+        except KeyError as e:
+            raise DynamoDBError('ValidationException', f"Undefined expression value or name: {e.args[0]}")
+        pos = match.end()
+        if pos == len(expression):
+            return clauses
+        conjunction = _AND.match(expression, pos)
+        if conjunction is None:
+            raise DynamoDBError('ValidationException', f"Unsupported expression: {expression}")
+        pos = conjunction.end()
+
+
+def _clause_matches(value: Optional[Tuple[str, Any]], op: str, operands: tuple) -> bool:
+    if value is None or value[0] != operands[0][0]:
+        return False
+    if op == 'begins_with':
+        return value[0] in ('S', 'B') and value[1].startswith(operands[0][1])
+    if op == 'between':
+        return operands[0][1] <= value[1] <= operands[1][1]
+    if op == '=':
+        return value[1] == operands[0][1]
+    if value[0] not in ('S', 'N', 'B'):
+        return False
+    if op == '<':
+        return value[1] < operands[0][1]
+    if op == '<=':
+        return value[1] <= operands[0][1]
+    if op == '>':
+        return value[1] > operands[0][1]
+    return value[1] >= operands[0][1]
+
+
+class LocalDynamoDBTable:
+    """
+    An in-memory table with a (PK, SK) primary key
+
+    Items are kept as their wire-format JSON, so a page is sent by joining
+    strings, plus their decoded key attributes (PK/SK, GSInPK/GSInSK), so key
+    conditions and filters on keys never decode the item.
+    """
+
+    def __init__(self, name: str, hash_key: str = 'PK', range_key: str = 'SK'):
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.encoded: List[str] = []
+        self.keys: List[Dict[str, Tuple[str, Any]]] = []
+        self.positions: Dict[tuple, int] = {}
+        self.size_bytes = 0
+        self._partitions: Dict[Optional[str], Dict[Any, List[int]]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, item: Dict[str, Dict[str, Any]]):
+        """Insert or replace a wire-format item"""
+        keys = {name: _comparable(value) for name, value in item.items() if _KEY_ATTRIBUTE.match(name)}
+        primary = (keys.get(self.hash_key), keys.get(self.range_key))
+        if None in primary:
+            raise DynamoDBError('ValidationException', f"Item is missing key {self.hash_key}/{self.range_key}")
+        encoded = json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+        with self._lock:
+            position = self.positions.get(primary)
+            if position is None:
+                self.positions[primary] = len(self.encoded)
+                self.encoded.append(encoded)
+                self.keys.append(keys)
+            else:
+                self.size_bytes -= len(self.encoded[position])
+                self.encoded[position] = encoded
+                self.keys[position] = keys
+            self.size_bytes += len(encoded)
+            self._partitions.clear()
+
+    def _matches(self, position: int, clauses: List[Tuple[str, str, tuple]]) -> bool:
+        keys = self.keys[position]
+        item = None
+        for attr, op, operands in clauses:
+            if attr in keys or _KEY_ATTRIBUTE.match(attr):
+                value = keys.get(attr)
+            else:
+                if item is None:
+                    item = json.loads(self.encoded[position])
+                value = _comparable(item.get(attr))
+            if not _clause_matches(value, op, operands):
+                return False
+        return True
+
+    def _position(self, key: Dict[str, Dict[str, Any]]) -> int:
+        position = self.positions.get((_comparable(key.get(self.hash_key)), _comparable(key.get(self.range_key))))
+        if position is None:
+            raise DynamoDBError('ValidationException', 'The provided starting key does not exist')
+        return position
+
+    def _key_of(self, position: int, index_keys: Tuple[str, ...] = ()) -> Dict[str, Dict[str, Any]]:
+        keys = self.keys[position]
+        return {name: {keys[name][0]: str(keys[name][1]) if keys[name][0] == 'N' else keys[name][1]}
+                for name in (self.hash_key, self.range_key) + index_keys if name in keys}
+
+    def _page(self, positions: Iterable[int], clauses, limit: Optional[int], index_keys: Tuple[str, ...] = ()):
+        """(matching encoded items, scanned count, LastEvaluatedKey or None) of one page"""
+        matched = []
+        scanned = 0
+        size = 0
+        last = None
+        iterator = iter(positions)
+        for position in iterator:
+            scanned += 1
+            size += len(self.encoded[position])
+            if not clauses or self._matches(position, clauses):
+                matched.append(self.encoded[position])
+            if size >= DYNAMODB_PAGE_BYTES or (limit and scanned >= limit):
+                last = position
+                break
+        if last is not None and next(iterator, None) is None:
+            last = None
+        return matched, scanned, None if last is None else self._key_of(last, index_keys)
+
+    def scan(self, clauses=None, limit: Optional[int] = None, start_key=None):
+        start = self._position(start_key) + 1 if start_key else 0
+        return self._page(range(start, len(self.encoded)), clauses, limit)
+
+    def _partition(self, index: Optional[str], hash_key: str, range_key: str) -> Dict[Any, List[int]]:
+        """Positions per partition key value, in sort key order (built on first query)"""
+        with self._lock:
+            partitions = self._partitions.get(index)
+            if partitions is None:
+                partitions = {}
+                for position, keys in enumerate(self.keys):
+                    if keys.get(hash_key) is not None and keys.get(range_key) is not None:
+                        partitions.setdefault(keys[hash_key], []).append(position)
+                for positions in partitions.values():
+                    positions.sort(key=lambda position: self.keys[position][range_key][1])
+                self._partitions[index] = partitions
+            return partitions
+
+    def query(self, key_clauses, filter_clauses=None, index: Optional[str] = None, limit: Optional[int] = None,
+              start_key=None, forward: bool = True):
+        if index is None:
+            hash_key, range_key, index_keys = self.hash_key, self.range_key, ()
+        elif re.match(r'^GSI\d+$', index):
+            hash_key, range_key = f"{index}PK", f"{index}SK"
+            index_keys = (hash_key, range_key)
+        else:
+            raise DynamoDBError('ValidationException', f"The table does not have the specified index: {index}")
+        partition_value = None
+        range_clauses = []
+        for attr, op, operands in key_clauses:
+            if attr == hash_key and op == '=':
+                partition_value = operands[0]
+            elif attr == range_key:
+                range_clauses.append((attr, op, operands))
+            else:
+                raise DynamoDBError('ValidationException', f"Query condition on non-key attribute: {attr}")
+        if partition_value is None:
+            raise DynamoDBError('ValidationException', f"Query condition missed key schema element: {hash_key}")
+
+        positions = self._partition(index, hash_key, range_key).get(partition_value, [])
+        if not forward:
+            positions = positions[::-1]
+        if range_clauses:
+            positions = [position for position in positions if self._matches(position, range_clauses)]
+        if start_key:
+            start = self._position(start_key)
+            positions = positions[positions.index(start) + 1:] if start in positions else []
+        return self._page(positions, filter_clauses, limit, index_keys)
+
+    def get(self, key: Dict[str, Dict[str, Any]]) -> Optional[str]:
+        position = self.positions.get((_comparable(key.get(self.hash_key)), _comparable(key.get(self.range_key))))
+        return None if position is None else self.encoded[position]
+
+
+class LocalDynamoDBHandler(http.server.BaseHTTPRequestHandler):
+    """DynamoDB JSON API (Scan, Query, BatchGetItem, DescribeTable) over in-memory tables"""
+
+    # Keep-alive, so boto3's connection pool is used like against the real endpoint
+    protocol_version = 'HTTP/1.1'
+    tables: Dict[Tuple[str, str], LocalDynamoDBTable] = {}
+    default_region = 'us-east-1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _region(self) -> str:
+        # Tables are per region, as in AWS; the region is in the signature's credential scope
+        match = re.search(r'Credential=[^/]+/\d+/([^/]+)/', self.headers.get('Authorization', ''))
+        return match.group(1) if match else self.default_region
+
+    def _table(self, name: str) -> LocalDynamoDBTable:
+        table = self.tables.get((self._region(), name))
+        if table is None:
+            raise DynamoDBError('ResourceNotFoundException', f"Requested resource not found: Table: {name} not found")
+        return table
+
+    def _send(self, status: int, body: str):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/x-amz-json-1.0')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    @staticmethod
+    def _items_response(matched: List[str], scanned: int, last_key) -> str:
+        body = f'{{"Items":[{",".join(matched)}],"Count":{len(matched)},"ScannedCount":{scanned}'
+        if last_key is not None:
+            body += f',"LastEvaluatedKey":{json.dumps(last_key, ensure_ascii=False)}'
+        return body + '}'
+
+    def _filter(self, request: Dict[str, Any]):
+        expression = request.get('FilterExpression')
+        if not expression:
+            return None
+        return parse_condition(expression, request.get('ExpressionAttributeNames', {}),
+                               request.get('ExpressionAttributeValues', {}))
+
+    def scan(self, request: Dict[str, Any]) -> str:
+        table = self._table(request['TableName'])
+        return self._items_response(*table.scan(self._filter(request), request.get('Limit'),
+                                                request.get('ExclusiveStartKey')))
+
+    def query(self, request: Dict[str, Any]) -> str:
+        table = self._table(request['TableName'])
+        key_clauses = parse_condition(request.get('KeyConditionExpression', ''),
+                                      request.get('ExpressionAttributeNames', {}),
+                                      request.get('ExpressionAttributeValues', {}))
+        return self._items_response(*table.query(
+            key_clauses, self._filter(request), request.get('IndexName'), request.get('Limit'),
+            request.get('ExclusiveStartKey'), request.get('ScanIndexForward', True)))
+
+    def batch_get_item(self, request: Dict[str, Any]) -> str:
+        request_items = request.get('RequestItems', {})
+        if sum(len(entry.get('Keys', [])) for entry in request_items.values()) > DYNAMODB_BATCH_GET_LIMIT:
+            raise DynamoDBError('ValidationException', "Too many items requested for the BatchGetItem call")
+        responses = []
+        for name, entry in request_items.items():
+            table = self._table(name)
+            found = [item for item in (table.get(key) for key in entry.get('Keys', [])) if item is not None]
+            responses.append(f'{json.dumps(name)}:[{",".join(found)}]')
+        return f'{{"Responses":{{{",".join(responses)}}},"UnprocessedKeys":{{}}}}'
+
+    def describe_table(self, request: Dict[str, Any]) -> str:
+        table = self._table(request['TableName'])
+        return json.dumps({'Table': {
+            'TableName': table.name,
+            'TableStatus': 'ACTIVE',
+            'ItemCount': len(table.encoded),
+            'TableSizeBytes': table.size_bytes,
+            'KeySchema': [{'AttributeName': table.hash_key, 'KeyType': 'HASH'},
+                          {'AttributeName': table.range_key, 'KeyType': 'RANGE'}],
+        }})
+
+    OPERATIONS = {
+        'Scan': scan,
+        'Query': query,
+        'BatchGetItem': batch_get_item,
+        'DescribeTable': describe_table,
+    }
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        operation = self.headers.get('X-Amz-Target', '').rpartition('.')[2]
+        try:
+            handler = self.OPERATIONS.get(operation)
+            if handler is None:
+                raise DynamoDBError('UnknownOperationException', f"Operation not supported: {operation}")
+            self._send(200, handler(self, request))
+        except DynamoDBError as e:
+            self._send(400, json.dumps({'__type': f"com.amazonaws.dynamodb.v20120810#{e.code}",
+                                        'message': e.message}))
+
+
+class LocalDynamoDBServer(_LocalServer):
+    """
+    Threaded DynamoDB stand-in with in-memory tables
+
+    Usage:
+        server = LocalDynamoDBServer()
+        server.load_stories(iter_stories('synthetic_stories.jsonl'), stage_tables=stage_tables(config))
+        server.start_in_background()
+        # AWS_ENDPOINT_URL_DYNAMODB=server.endpoint_url
+
+    Args:
+        port: Port to listen on (0 picks a free port)
+        host: Interface to bind
+    """
+
+    def __init__(self, port: int = 0, host: str = '127.0.0.1'):
+        self.tables: Dict[Tuple[str, str], LocalDynamoDBTable] = {}
+        handler = type('BoundLocalDynamoDBHandler', (LocalDynamoDBHandler,), {'tables': self.tables})
+        super().__init__((host, port), handler)
+
+    def table(self, region: str, name: str) -> LocalDynamoDBTable:
+        """The table (created empty on first use)"""
+        table = self.tables.get((region, name))
+        if table is None:
+            table = self.tables[(region, name)] = LocalDynamoDBTable(name)
+        return table
+
+    def load_stories(self, stories: Iterable[Dict[str, Any]], region: Optional[str] = None,
+                     table: Optional[str] = None, stage_tables: Optional[Dict[str, Tuple[str, str]]] = None) -> int:
+        """
+        Put stories into a table, or each into its _stage's table
+
+        Args:
+            stories: Raw or enriched stories (_fields are dropped)
+            region, table: Table for all stories
+            stage_tables: Stage -> (region, table), e.g. from stage_tables(config)
+
+        Returns:
+            int: Number of stories stored
+        """
+        count = 0
+        for story in stories:
+            if table:
+                target = self.table(region or LocalDynamoDBHandler.default_region, table)
+            else:
+                stage = story.get('_stage')
+                if stage not in (stage_tables or {}):
+                    continue
+                target = self.table(*stage_tables[stage])
+            target.put(to_dynamodb_item(story))
+            count += 1
+        return count
+
+
+def stage_tables(config: Dict[str, Any]) -> Dict[str, Tuple[str, str]]:
+    """Stage -> (region, DynamoDB table) from a resources configuration"""
+    return {name: (stage['region'], stage['dynamodb_table']) for name, stage in config['stages'].items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run local stand-ins for AWS services',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 local_aws.py s3 --root ./fake-s3
+  python3 local_aws.py s3 --root ./fake-s3 --port 9100
+  python3 local_aws.py dynamodb --dataset synthetic_stories.jsonl --config resources.json
+  python3 local_aws.py dynamodb --table GGEventsTable-dev=all_video_stories.jsonl --region us-east-1
+        """
+    )
+    subparsers = parser.add_subparsers(dest='service', required=True)
+
+    s3_parser = subparsers.add_parser('s3', help='Serve a directory as path-style S3 buckets')
+    s3_parser.add_argument('--root', required=True, help='Directory containing one subdirectory per bucket')
+    s3_parser.add_argument('--port', type=int, default=9000, help='Port to listen on (default: 9000)')
+
+    dynamodb_parser = subparsers.add_parser('dynamodb', help='Serve story datasets as in-memory DynamoDB tables')
+    dynamodb_parser.add_argument('--dataset', help="Stories to load, each into its _stage's table (see --config)")
+    dynamodb_parser.add_argument('--config', default='resources.json',
+                                 help='Resources configuration mapping stages to tables (default: resources.json)')
+    dynamodb_parser.add_argument('--table', action='append', default=[], metavar='NAME=DATASET',
+                                 help='Load all stories of DATASET into table NAME (repeatable)')
+    dynamodb_parser.add_argument('--region', default=LocalDynamoDBHandler.default_region,
+                                 help=f'Region of the --table tables (default: {LocalDynamoDBHandler.default_region})')
+    dynamodb_parser.add_argument('--port', type=int, default=9001, help='Port to listen on (default: 9001)')
+
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    if args.service == 's3':
+        server = LocalS3Server(args.root, args.port)
+        print("🪣 Local S3 stand-in")
+        print("=" * 50)
+        print(f"   Root: {args.root}")
+    else:
+        if not args.dataset and not args.table:
+            parser.error('give --dataset and/or --table NAME=DATASET')
+        server = LocalDynamoDBServer(args.port)
+        try:
+            if args.dataset:
+                with open(args.config, 'r') as f:
+                    tables = stage_tables(json.load(f))
+                server.load_stories(iter_stories(args.dataset), stage_tables=tables)
+            for spec in args.table:
+                name, _, dataset = spec.partition('=')
+                if not dataset:
+                    parser.error(f'--table wants NAME=DATASET, got {spec}')
+                server.load_stories(iter_stories(dataset), args.region, name)
+        except FileNotFoundError as e:
+            print(f"❌ File not found: {e.filename}")
+            return 1
+        except (ValueError, DynamoDBError) as e:
+            print(f"❌ Can't load stories: {e}")
+            return 1
+        print("🗄️  Local DynamoDB stand-in")
+        print("=" * 50)
+        for (region, name), table in sorted(server.tables.items()):
+            print(f"   {region}/{name}: {len(table.encoded)} items")
+    print(f"   Endpoint: {server.endpoint_url}")
+    print("=" * 50)
+    print("\nPress Ctrl+C to stop the server\n")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n\n👋 Server stopped")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
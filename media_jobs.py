@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Parallel ffmpeg jobs for demo media.
+
+Thumbnails are extracted with input-side seeking (-ss before -i) that stops at
+the nearest keyframe and only decodes keyframes, so ffmpeg reads a few hundred
+KB instead of decoding from the start of the file. Jobs run across a process
+pool sized to the CPU count, with each ffmpeg limited to one thread, so a batch
+takes roughly total/cores time. Jobs whose output is already newer than their
+input are skipped.
+
+Besides the JPEG thumbnail, each story gets resized WebP variants of it for
+srcset and a sprite sheet of evenly spaced low-res frames for hover scrubbing,
+so a page of cards moves a fraction of the image bytes and a clip can be
+previewed without downloading the video.
+
+Videos can also be remuxed with the moov atom up front (faststart), so
+playback starts after the first few KB instead of the whole file, and
+transcoded into a lower-bitrate rendition for slow connections. Longer
+recordings can be packaged as HLS (the source stream plus the rendition, in
+short segments), so seeks and early exits only fetch the segments watched.
+
+A media job is a dict:
+    {
+        'kind': 'thumbnail',     # 'thumbnail', 'variant', 'sprite', 'faststart', 'rendition' or 'hls'
+        'input': 'demo-assets/demostory001.mp4',
+        'output': 'demo-assets/demostory001.jpg',  # a directory for 'hls'
+        'variant': 'small',      # 'variant' jobs only, see IMAGE_VARIANTS
+        'segment_prefix': 'ab12cd34ef56',  # 'hls' jobs only, makes segment names unique
+        'label': 'demostory001', # optional, for progress output
+    }
+"""
+
+import os
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+THUMBNAIL_WIDTH = 600
+THUMBNAIL_HEIGHT = 400
+THUMBNAIL_QUALITY = 2       # JPEG quality (1-31, lower is better)
+THUMBNAIL_SEEK_SECONDS = 1.0  # Skip the fade-in/black first frame
+
+# Part of cache keys for generated thumbnails; change it when the settings above change
+THUMBNAIL_PARAMS = (f"{THUMBNAIL_WIDTH}x{THUMBNAIL_HEIGHT}-crop-q{THUMBNAIL_QUALITY}"
+                    f"-ss{THUMBNAIL_SEEK_SECONDS:g}-keyframe")
+
+# WebP variants of the thumbnail, picked by the browser through srcset
+IMAGE_VARIANTS = {
+    'small': {'width': 300, 'height': 200, 'quality': 70},
+    'large': {'width': 600, 'height': 400, 'quality': 75},
+}
+
+SPRITE_FRAMES = 10
+SPRITE_FRAME_WIDTH = 150
+SPRITE_FRAME_HEIGHT = 100
+SPRITE_QUALITY = 60
+SPRITE_PARAMS = f"{SPRITE_FRAMES}x{SPRITE_FRAME_WIDTH}x{SPRITE_FRAME_HEIGHT}-webp-q{SPRITE_QUALITY}"
+
+FASTSTART_PARAMS = 'copy-faststart'
+
+# Lower-bitrate rendition for slow connections (H.264/AAC, plays everywhere)
+RENDITION = {'height': 480, 'video_bitrate': '900k', 'audio_bitrate': '96k'}
+RENDITION_PARAMS = (f"h264-{RENDITION['height']}p-{RENDITION['video_bitrate']}"
+                    f"-aac-{RENDITION['audio_bitrate']}-faststart")
+
+HLS_SEGMENT_SECONDS = 4
+HLS_MASTER_PLAYLIST = 'index.m3u8'
+HLS_PARAMS = f"source+{RENDITION_PARAMS}-ts{HLS_SEGMENT_SECONDS}"
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
+
+
+def is_fresh(output: str, *inputs: str) -> bool:
+    """True if output exists and is at least as new as every input"""
+    try:
+        output_mtime = os.stat(output).st_mtime
+    except FileNotFoundError:
+        return False
+    try:
+        return all(os.stat(path).st_mtime <= output_mtime for path in inputs)
+    except FileNotFoundError:
+        return False
+
+
+def _has_output(path: str) -> bool:
+    try:
+        return os.path.getsize(path) > 0
+    except FileNotFoundError:
+        return False
+
+
+def _scale_crop(width: int, height: int) -> str:
+    # Scale to cover width x height, then center-crop to exactly that size
+    return (f'scale={width}:{height}:force_original_aspect_ratio=increase,'
+            f'crop={width}:{height}')
+
+
+def thumbnail_command(video_path: str, thumbnail_path: str,
+                      seek_seconds: float = THUMBNAIL_SEEK_SECONDS) -> List[str]:
+    """ffmpeg command extracting one keyframe near seek_seconds as a 600x400 JPEG"""
+    return [
+        'ffmpeg',
+        '-hide_banner', '-loglevel', 'error',
+        '-threads', '1',             # One core per job; the pool provides the parallelism
+        '-skip_frame', 'nokey',      # Only decode keyframes
+        '-ss', f"{seek_seconds:g}",  # Input-side seek: jump straight to the keyframe
+        '-noaccurate_seek',          # ...and use it, instead of decoding up to the exact time
+        '-i', video_path,
+        '-frames:v', '1',
+        '-vf', _scale_crop(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT),
+        '-q:v', str(THUMBNAIL_QUALITY),
+        '-f', 'image2',
+        '-y',
+        thumbnail_path,
+    ]
+
+
+def variant_params(variant: str) -> str:
+    """Cache-key params for an image variant"""
+    spec = IMAGE_VARIANTS[variant]
+    return f"{spec['width']}x{spec['height']}-crop-webp-q{spec['quality']}"
+
+
+def variant_command(image_path: str, output_path: str, variant: str) -> List[str]:
+    """ffmpeg command resizing a thumbnail into a WebP variant"""
+    spec = IMAGE_VARIANTS[variant]
+    return [
+        'ffmpeg',
+        '-hide_banner', '-loglevel', 'error',
+        '-threads', '1',
+        '-i', image_path,
+        '-vf', _scale_crop(spec['width'], spec['height']),
+        '-c:v', 'libwebp',
+        '-quality', str(spec['quality']),
+        '-f', 'webp',
+        '-y',
+        output_path,
+    ]
+
+
+def sprite_command(video_path: str, output_path: str, duration: float) -> List[str]:
+    """ffmpeg command tiling SPRITE_FRAMES evenly spaced keyframes into one WebP row"""
+    return [
+        'ffmpeg',
+        '-hide_banner', '-loglevel', 'error',
+        '-threads', '1',
+        '-skip_frame', 'nokey',  # Keyframes are plenty for a scrub preview
+        '-i', video_path,
+        '-vf', f'fps={SPRITE_FRAMES}/{max(duration, 0.1):.3f},'
+               f'{_scale_crop(SPRITE_FRAME_WIDTH, SPRITE_FRAME_HEIGHT)},'
+               f'tile={SPRITE_FRAMES}x1',
+        '-frames:v', '1',
+        '-c:v', 'libwebp',
+        '-quality', str(SPRITE_QUALITY),
+        '-f', 'webp',
+        '-y',
+        output_path,
+    ]
+
+
+def faststart_command(video_path: str, output_path: str) -> List[str]:
+    """ffmpeg command moving the moov atom to the front without re-encoding"""
+    return [
+        'ffmpeg',
+        '-hide_banner', '-loglevel', 'error',
+        '-i', video_path,
+        '-map', '0',
+        '-c', 'copy',
+        '-movflags', '+faststart',
+        '-f', 'mp4',
+        '-y',
+        output_path,
+    ]
+
+
+def rendition_command(video_path: str, output_path: str) -> List[str]:
+    """ffmpeg command transcoding the lower-bitrate RENDITION"""
+    bitrate = RENDITION['video_bitrate']
+    return [
+        'ffmpeg',
+        '-hide_banner', '-loglevel', 'error',
+        '-threads', '1',
+        '-i', video_path,
+        '-vf', f"scale=-2:'min({RENDITION['height']},ih)'",  # Never upscale
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+        '-b:v', bitrate, '-maxrate', bitrate, '-bufsize', bitrate,
+        '-c:a', 'aac', '-b:a', RENDITION['audio_bitrate'],
+        '-movflags', '+faststart',
+        '-f', 'mp4',
+        '-y',
+        output_path,
+    ]
+
+
+def hls_command(video_path: str, output_dir: str, segment_prefix: str, audio: bool) -> List[str]:
+    """
+    ffmpeg command packaging a video as VOD HLS with two variants
+
+    The source video stream is copied (segments split at its keyframes) and
+    the RENDITION is transcoded with a keyframe every segment. Everything is
+    written flat into output_dir: index.m3u8 (master), <variant>.m3u8 and
+    <segment_prefix>-<variant>-NNNNN.ts.
+    """
+    bitrate = RENDITION['video_bitrate']
+    maps = ['-map', '0:v:0'] + (['-map', '0:a:0'] if audio else [])
+    stream_map = ' '.join(
+        f"v:{idx}{f',a:{idx}' if audio else ''},name:{name}"
+        for idx, name in enumerate(('source', f"{RENDITION['height']}p")))
+    return [
+        'ffmpeg',
+        '-hide_banner', '-loglevel', 'error',
+        '-threads', '1',
+        '-i', video_path,
+        *maps, *maps,
+        '-c:v:0', 'copy',
+        '-c:v:1', 'libx264', '-preset', 'veryfast', '-profile:v:1', 'main',
+        '-filter:v:1', f"scale=-2:'min({RENDITION['height']},ih)'",
+        '-b:v:1', bitrate, '-maxrate:v:1', bitrate, '-bufsize:v:1', bitrate,
+        '-force_key_frames:v:1', f"expr:gte(t,n_forced*{HLS_SEGMENT_SECONDS})",
+        '-c:a', 'aac', '-b:a', RENDITION['audio_bitrate'],
+        '-var_stream_map', stream_map,
+        '-f', 'hls',
+        '-hls_time', str(HLS_SEGMENT_SECONDS),
+        '-hls_playlist_type', 'vod',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_type', 'mpegts',
+        '-master_pl_name', HLS_MASTER_PLAYLIST,
+        '-hls_segment_filename', os.path.join(output_dir, f"{segment_prefix}-%v-%05d.ts"),
+        os.path.join(output_dir, '%v.m3u8'),
+    ]
+
+
+def has_audio(video_path: str) -> bool:
+    """True if ffprobe finds an audio stream"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-select_streams', 'a', '-show_entries', 'stream=index',
+             '-of', 'csv=p=0', video_path],
+            capture_output=True, text=True)
+    except FileNotFoundError:
+        return False
+    return bool(result.stdout.strip())
+
+
+def is_faststart(video_path: str) -> bool:
+    """
+    True if an mp4's moov atom comes before its mdat atom
+    
+    Only the top-level box headers are read, so this is cheap even for large files.
+    """
+    try:
+        with open(video_path, 'rb') as f:
+            while True:
+                header = f.read(8)
+                if len(header) < 8:
+                    return False
+                size = int.from_bytes(header[:4], 'big')
+                box_type = header[4:8]
+                if box_type == b'moov':
+                    return True
+                if box_type == b'mdat':
+                    return False
+                if size == 1:
+                    size = int.from_bytes(f.read(8), 'big') - 8
+                elif size == 0:
+                    return False  # Box extends to end of file
+                f.seek(size - 8, os.SEEK_CUR)
+    except OSError:
+        return False
+
+
+def probe_duration(video_path: str) -> Optional[float]:
+    """Duration of a video in seconds (from the container), or None"""
+    try:
+        result = subprocess.run(
+            ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+             '-of', 'default=noprint_wrappers=1:nokey=1', video_path],
+            capture_output=True, text=True)
+        return float(result.stdout.strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def run_command(cmd: List[str]) -> Dict[str, Any]:
+    """Run an ffmpeg command; returns {'ok', 'error'}"""
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except FileNotFoundError:
+        return {'ok': False, 'error': 'ffmpeg not found. Install with: brew install ffmpeg'}
+    if result.returncode != 0:
+        return {'ok': False, 'error': result.stderr.strip() or f"ffmpeg exited with {result.returncode}"}
+    return {'ok': True, 'error': None}
+
+
+def generate_thumbnail(job: Dict[str, Any]) -> Dict[str, Any]:
+    video, thumbnail = job['input'], job['output']
+    result = run_command(thumbnail_command(video, thumbnail))
+    if result['ok'] and not _has_output(thumbnail):
+        # Clip shorter than the seek offset: take its first keyframe instead
+        result = run_command(thumbnail_command(video, thumbnail, seek_seconds=0))
+        if result['ok'] and not _has_output(thumbnail):
+            result = {'ok': False, 'error': 'ffmpeg produced no frame'}
+    return result
+
+
+def generate_variant(job: Dict[str, Any]) -> Dict[str, Any]:
+    return run_command(variant_command(job['input'], job['output'], job['variant']))
+
+
+def generate_sprite(job: Dict[str, Any]) -> Dict[str, Any]:
+    duration = probe_duration(job['input'])
+    if duration is None:
+        return {'ok': False, 'error': 'Could not read video duration (is ffprobe installed?)'}
+    result = run_command(sprite_command(job['input'], job['output'], duration))
+    if result['ok'] and not _has_output(job['output']):
+        result = {'ok': False, 'error': 'ffmpeg produced no frames'}
+    return result
+
+
+def generate_faststart(job: Dict[str, Any]) -> Dict[str, Any]:
+    return run_command(faststart_command(job['input'], job['output']))
+
+
+def generate_rendition(job: Dict[str, Any]) -> Dict[str, Any]:
+    return run_command(rendition_command(job['input'], job['output']))
+
+
+def generate_hls(job: Dict[str, Any]) -> Dict[str, Any]:
+    os.makedirs(job['output'], exist_ok=True)
+    cmd = hls_command(job['input'], job['output'], job['segment_prefix'], has_audio(job['input']))
+    result = run_command(cmd)
+    if result['ok'] and not _has_output(os.path.join(job['output'], HLS_MASTER_PLAYLIST)):
+        result = {'ok': False, 'error': 'ffmpeg wrote no master playlist'}
+    return result
+
+
+MEDIA_BUILDERS = {
+    'thumbnail': generate_thumbnail,
+    'variant': generate_variant,
+    'sprite': generate_sprite,
+    'faststart': generate_faststart,
+    'rendition': generate_rendition,
+    'hls': generate_hls,
+}
+
+
+def build_media(job: Dict[str, Any], force: bool = False) -> Dict[str, Any]:
+    """
+    Build one media job (runs inside a pool worker)
+
+    Returns:
+        dict: {'job', 'ok', 'skipped', 'error'}
+    """
+    if not force and is_fresh(job['output'], job['input']):
+        return {'job': job, 'ok': True, 'skipped': True, 'error': None}
+    result = MEDIA_BUILDERS[job['kind']](job)
+    return {'job': job, 'ok': result['ok'], 'skipped': False, 'error': result['error']}
+
+
+def run_media_jobs(jobs: List[Dict[str, Any]], workers: Optional[int] = None,
+                   force: bool = False, verbose: bool = True) -> List[Dict[str, Any]]:
+    """
+    Run media jobs across a process pool
+
+    Args:
+        jobs: Media job dicts (see module docstring)
+        workers: Pool size (default: number of CPUs)
+        force: Rebuild even if the output is newer than the input
+        verbose: Print a line per finished job
+
+    Returns:
+        list: One result per job, in the same order as jobs
+    """
+    if not jobs:
+        return []
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+    with ProcessPoolExecutor(max_workers=min(workers or default_workers(), len(jobs))) as executor:
+        futures = {executor.submit(build_media, job, force): idx for idx, job in enumerate(jobs)}
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results[futures[future]] = result
+            if verbose:
+                job = result['job']
+                label = f"{job.get('label', job['output'])} {job['kind']}"
+                if result['skipped']:
+                    print(f"   [{done}/{len(jobs)}] ⏭️  {label} up to date")
+                elif result['ok']:
+                    print(f"   [{done}/{len(jobs)}] ✅ {label} generated")
+                else:
+                    print(f"   [{done}/{len(jobs)}] ⚠️  {label}: {result['error']}")
+    return results
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Refresh the reports (and optionally the demo assets), rerunning only what changed.
+
+The tool scripts are modelled as stages with declared inputs and outputs:
+
+    scrape   scrape_video_stories.py   resources.json            -> all_video_stories.jsonl
+    presign  generate_presigned_urls.py all_video_stories.jsonl  -> all_video_stories_presigned.jsonl
+    demo     prepare_demo_assets.py    *_presigned.jsonl + demo_favorites.json -> demo-assets/
+
+Presigning runs file to file (--no-db), so its result depends only on the
+declared inputs; serve.py --db keeps the URLs the scraper stored.
+
+Each stage's key is a hash of its command line, its input files and its code
+(the script plus the repo modules it imports). A stage is skipped when its
+key matches the last successful run and its outputs are still the files
+that run wrote. An upstream stage that reruns but writes identical output
+doesn't invalidate anything downstream.
+
+Scraping reads DynamoDB, which can't be hashed, so it reruns once its last
+run is older than --scrape-max-age; presigning reruns before URLs get close
+to expiring. File hashes are cached by size and mtime (.pipeline_state.json),
+so a no-op refresh only stats files.
+
+Usage:
+    python3 pipeline.py               # Refresh the report
+    python3 pipeline.py demo          # ... and the demo assets
+    python3 pipeline.py --dry-run     # Show what would run and why
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from story_io import dataset_stem, dataset_suffix
+
+STATE_FILE = '.pipeline_state.json'
+STATE_VERSION = 1
+DEFAULT_SCRAPE_MAX_AGE_MINUTES = 60
+DEFAULT_EXPIRATION = 2592000  # 30 days, as generate_presigned_urls.py
+HASH_CHUNK_SIZE = 1024 * 1024
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def define_stages(args) -> List[Dict[str, Any]]:
+    """The stages, in dependency order, for the given command-line options"""
+    dataset = args.output
+    presigned = dataset_stem(os.path.basename(dataset)) + '_presigned' + dataset_suffix(dataset)
+    stage_args = ['--stages'] + args.stages if args.stages else []
+    return [
+        {
+            'name': 'scrape',
+            'script': 'scrape_video_stories.py',
+            'args': ['--config', args.config, '--output', dataset] + stage_args,
+            'inputs': [args.config],
+            'outputs': [dataset, dataset_stem(dataset) + '.html'],
+            'after': [],
+            'max_age': args.scrape_max_age * 60,
+        },
+        {
+            'name': 'presign',
+            'script': 'generate_presigned_urls.py',
+            # File to file: with the story store, it would read (and write) stories.db instead.
+            # Signed from the dataset every time: without --force-regenerate, the default input
+            # would be swapped for the last run's output, and new stories would never reach it
+            'args': ['--config', args.config, '--input', dataset, '--expiration', str(args.expiration),
+                     '--no-db', '--force-regenerate'],
+            'inputs': [args.config, dataset],
+            'outputs': [presigned, dataset_stem(presigned) + '.html'],
+            'after': ['scrape'],
+            # Re-sign while the URLs from the last run are still valid for half their lifetime
+            'max_age': args.expiration / 2,
+        },
+        {
+            'name': 'demo',
+            'script': 'prepare_demo_assets.py',
+            'args': ['--config', args.config, '--resolve', 'dataset', '--stories', presigned,
+                     '--favorites', args.favorites, '--demo-dir', args.demo_dir],
+            'inputs': [args.config, presigned, args.favorites],
+            'outputs': [os.path.join(args.demo_dir, 'demo_stories.json'),
+                        os.path.join(args.demo_dir, 'index.html')],
+            'after': ['presign'],
+            'max_age': None,
+        },
+    ]
+
+
+def local_imports(script: str) -> List[str]:
+    """The script plus every repo module it imports, directly or not (its code version)"""
+    found = []
+    pending = [os.path.join(REPO_DIR, script)]
+    while pending:
+        path = pending.pop()
+        if path in found or not os.path.exists(path):
+            continue
+        found.append(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module_path = os.path.join(REPO_DIR, name.split('.')[0] + '.py')
+                if os.path.exists(module_path):
+                    pending.append(module_path)
+    return sorted(found)
+
+
+class FileHasher:
+    """sha256 of files, recomputed only when a file's size or mtime changes"""
+
+    def __init__(self, cache: Optional[Dict[str, list]] = None):
+        self.cache = cache if cache is not None else {}
+
+    def __call__(self, path: str) -> Optional[str]:
+        """Hex digest, or None if the file doesn't exist"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = os.path.abspath(path)
+        cached = self.cache.get(key)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        self.cache[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+
+def load_state(state_file: str = STATE_FILE) -> Dict[str, Any]:
+    try:
+        with open(state_file, 'r') as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            return state
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return {'version': STATE_VERSION, 'stages': {}, 'files': {}}
+
+
+def save_state(state: Dict[str, Any], state_file: str = STATE_FILE):
+    tmp_file = state_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, state_file)
+
+
+def stage_fingerprint(stage: Dict[str, Any], hasher: FileHasher) -> Dict[str, Any]:
+    """Everything a stage's result depends on, and the key hashed from it"""
+    fingerprint = {
+        'command': [stage['script']] + stage['args'],
+        'inputs': {path: hasher(path) for path in stage['inputs']},
+        'code': {os.path.relpath(path, REPO_DIR): hasher(path) for path in local_imports(stage['script'])},
+    }
+    fingerprint['key'] = hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode()).hexdigest()
+    return fingerprint
+
+
+def stale_reason(stage: Dict[str, Any], fingerprint: Dict[str, Any], previous: Optional[Dict[str, Any]],
+                 hasher: FileHasher, now: float) -> Optional[str]:
+    """Why a stage has to run, or None if it is up to date"""
+    if previous is None:
+        return 'never run'
+    if previous['key'] != fingerprint['key']:
+        if previous['command'] != fingerprint['command']:
+            return 'options changed'
+        for path, digest in fingerprint['inputs'].items():
+            if previous['inputs'].get(path) != digest:
+                return f'{path} changed' if digest else f'{path} missing'
+        changed = [path for path, digest in fingerprint['code'].items() if previous['code'].get(path) != digest]
+        return f"code changed ({', '.join(changed) or 'modules removed'})"
+    for path in stage['outputs']:
+        if hasher(path) != previous['outputs'].get(path):
+            return f'{path} missing' if not os.path.exists(path) else f'{path} modified'
+    if stage['max_age'] is not None and now - previous['finished'] > stage['max_age']:
+        return f"last run {format_age(now - previous['finished'])} ago"
+    return None
+
+
+def format_age(seconds: float) -> str:
+    if seconds < 120:
+        return f'{seconds:.0f}s'
+    if seconds < 7200:
+        return f'{seconds / 60:.0f} min'
+    if seconds < 172800:
+        return f'{seconds / 3600:.0f} h'
+    return f'{seconds / 86400:.0f} days'
+
+
+def run_pipeline(stages: List[Dict[str, Any]], target: str, force: List[str], dry_run: bool = False,
+                 state_file: str = STATE_FILE) -> int:
+    """
+    Run the target stage and whatever it depends on that is out of date
+
+    Returns:
+        int: 0 on success, else the exit code of the stage that failed
+    """
+    by_name = {stage['name']: stage for stage in stages}
+    needed = []
+    pending = [target]
+    while pending:
+        name = pending.pop()
+        if name not in needed:
+            needed.append(name)
+            pending.extend(by_name[name]['after'])
+    plan = [stage for stage in stages if stage['name'] in needed]
+
+    state = load_state(state_file)
+    hasher = FileHasher(state['files'])
+    would_run = []  # dry run: stages that would run
+    for stage in plan:
+        fingerprint = stage_fingerprint(stage, hasher)
+        previous = state['stages'].get(stage['name'])
+        now = time.time()
+        reason = 'forced' if stage['name'] in force else stale_reason(stage, fingerprint, previous, hasher, now)
+        if dry_run:
+            upstream = next((name for name in stage['after'] if name in would_run), None)
+            if reason is None and upstream is not None:
+                # Its inputs would be rewritten first, so it would be rechecked (and likely run) after
+                reason = f'after {upstream}'
+            if reason is not None:
+                would_run.append(stage['name'])
+                print(f"▶️  {stage['name']}: would run ({reason})")
+                continue
+        if reason is None:
+            print(f"⏭️  {stage['name']}: up to date (ran {format_age(now - previous['finished'])} ago)")
+            continue
+
+        print(f"\n▶️  {stage['name']}: {reason}")
+        print(f"   $ {sys.executable} {' '.join(fingerprint['command'])}")
+        start = time.perf_counter()
+        with phase(f"stage/{stage['name']}"):
+            result = subprocess.run([sys.executable, os.path.join(REPO_DIR, stage['script'])] + stage['args'])
+        elapsed = time.perf_counter() - start
+        if result.returncode != 0:
+            print(f"❌ {stage['name']} failed (exit code {result.returncode}) after {elapsed:.1f}s")
+            save_state(state, state_file)
+            return result.returncode
+
+        missing = [path for path in stage['outputs'] if not os.path.exists(path)]
+        if missing:
+            print(f"❌ {stage['name']} didn't write {', '.join(missing)}")
+            save_state(state, state_file)
+            return 1
+        state['stages'][stage['name']] = dict(
+            fingerprint, outputs={path: hasher(path) for path in stage['outputs']},
+            finished=time.time(), seconds=round(elapsed, 3))
+        save_state(state, state_file)
+        print(f"✅ {stage['name']} finished in {elapsed:.1f}s")
+
+    save_state(state, state_file)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Refresh the video story reports, rerunning only the stages whose inputs changed',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 pipeline.py                      # scrape -> presign, as needed
+  python3 pipeline.py demo                 # ... -> prepare_demo_assets
+  python3 pipeline.py --dry-run            # What would run, and why
+  python3 pipeline.py --force scrape       # Rescrape now, rerun what that changes
+  python3 pipeline.py --scrape-max-age 1440 --stages dev test
+        """
+    )
+    parser.add_argument('target', nargs='?', default='presign', choices=['scrape', 'presign', 'demo'],
+                        help='Last stage to bring up to date (default: presign)')
+    parser.add_argument('--force', nargs='+', default=[], choices=['scrape', 'presign', 'demo'],
+                        help='Rerun these stages even if they are up to date')
+    parser.add_argument('--dry-run', action='store_true', help="Only show what would run")
+    parser.add_argument('--stages', nargs='+', help='DynamoDB stages to scrape (default: all)')
+    parser.add_argument('--config', default='resources.json',
+                        help='Path to resources configuration file (default: resources.json)')
+    parser.add_argument('--output', default='all_video_stories.jsonl',
+                        help='Scraped dataset (default: all_video_stories.jsonl)')
+    parser.add_argument('--favorites', default='demo_favorites.json',
+                        help='Favorites for the demo stage (default: demo_favorites.json)')
+    parser.add_argument('--demo-dir', default='demo-assets',
+                        help='Output directory of the demo stage (default: demo-assets)')
+    parser.add_argument('--expiration', type=int, default=DEFAULT_EXPIRATION,
+                        help=f'Presigned URL lifetime in seconds (default: {DEFAULT_EXPIRATION})')
+    parser.add_argument('--scrape-max-age', type=float, default=DEFAULT_SCRAPE_MAX_AGE_MINUTES,
+                        help=f'Rescrape once the last scrape is older than this many minutes '
+                             f'(default: {DEFAULT_SCRAPE_MAX_AGE_MINUTES})')
+    parser.add_argument('--state', default=STATE_FILE, help=f'Pipeline state file (default: {STATE_FILE})')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    code = run_pipeline(define_stages(args), args.target, args.force, args.dry_run, args.state)
+    if code == 0 and not args.dry_run:
+        print(f"\n✅ Pipeline up to date in {time.perf_counter() - start:.2f}s")
+    return code
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
@@ -4,22 +4,53 @@ Prepare demo assets from favorited video stories.
 
 This script:
 1. Loads demo_favorites.json to get story IDs
-2. Finds matching stories in all_video_stories_presigned.json
-3. Downloads videos and thumbnails from S3
-4. Generates thumbnails for videos that don't have them
-5. Renames files to demostoryXXX.mp4 and demostoryXXX.jpg
-6. Creates demo_stories.json with all metadata
+2. Looks up the matching stories in the story store (stories.db), or finds
+   them in all_video_stories_presigned.jsonl, reading only those stories
+   through its ID index (.idx.json) when it is up to date (else streaming
+   through the file until all are found), or fetches just
+   those stories from DynamoDB (--resolve dynamodb)
+3. Downloads videos and thumbnails from S3 (concurrently) into a
+   content-addressed cache, skipping objects whose ETag is already cached
+4. Generates thumbnails for videos that don't have them (cached too)
+5. Generates small/large WebP thumbnail variants and a hover-scrub sprite
+   sheet per video (cached too)
+6. Links files into demo-assets/ as demostoryXXX.mp4, demostoryXXX.jpg,
+   demostoryXXX-300w.webp, ..., keeping each story's demo ID stable across
+   runs (demo_manifest.json)
+7. Optionally remuxes videos with faststart (--faststart), transcodes a
+   lower-bitrate rendition (--rendition) and packages HLS (--hls) into
+   demostoryXXX-hls/, all cached by source hash
+8. Creates demo_stories.json with all metadata and an index.html gallery
 
 Usage:
     python3 prepare_demo_assets.py
+    python3 prepare_demo_assets.py --workers 16
+    python3 prepare_demo_assets.py --resolve dynamodb
+    python3 prepare_demo_assets.py --faststart --rendition
+    python3 prepare_demo_assets.py --hls
 """
 
-import boto3
+import argparse
+import glob
+import hashlib
 import json
 import os
-import subprocess
+import shutil
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Iterable, List, Dict, Any
+
+from asset_cache import DEFAULT_CACHE_DIR, AssetCache, fetch_all_cached, link_file, link_tree
+from demo_gallery import generate_demo_gallery
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from media_jobs import (FASTSTART_PARAMS, HLS_MASTER_PLAYLIST, HLS_PARAMS, IMAGE_VARIANTS,
+                        RENDITION, RENDITION_PARAMS, SPRITE_FRAME_HEIGHT, SPRITE_FRAME_WIDTH,
+                        SPRITE_FRAMES, SPRITE_PARAMS, THUMBNAIL_PARAMS, is_faststart,
+                        run_media_jobs, variant_params)
+from s3_downloads import DEFAULT_WORKERS
+from story_ids import StoryIndex, story_id as compute_story_id
+from story_io import iter_stories
+from story_lookup import fetch_stories_by_ids
+from story_store import DEFAULT_DB, StoryStore
 
 
 def load_favorites(favorites_file: str = "demo_favorites.json") -> List[str]:
@@ -44,79 +75,182 @@ def load_favorites(favorites_file: str = "demo_favorites.json") -> List[str]:
         return []
 
 
-def load_video_stories(stories_file: str = "all_video_stories_presigned.json") -> List[Dict[str, Any]]:
-    """Load all video stories"""
-    try:
-        with open(stories_file, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"❌ File not found: {stories_file}")
-        return []
-
-
-def find_stories_by_ids(all_stories: List[Dict[str, Any]], story_ids: List[str]) -> List[Dict[str, Any]]:
-    """Find stories matching the favorite IDs (deduplicated)"""
-    seen = {}
+def find_stories_by_ids(all_stories: Iterable[Dict[str, Any]], story_ids: List[str]) -> List[Dict[str, Any]]:
+    """Find stories matching the favorite IDs (deduplicated), stopping once all are found"""
+    wanted = set(story_ids)
+    seen = set()
     matched = []
     
-    # Create story ID for each story and deduplicate
     for story in all_stories:
-        stage = story.get('_stage', 'unknown')
-        gamer = story.get('_gamer_extracted', 'N/A')
-        timestamp = story.get('_created', story.get('timestamp', 'N/A'))
-        story_id = f"{stage}_{gamer}_{timestamp}".replace('#', '_').replace(':', '_').replace('.', '_')
-        
-        if story_id in story_ids and story_id not in seen:
+        story_id = compute_story_id(story)
+        if story_id in wanted and story_id not in seen:
             story['_computed_story_id'] = story_id
             matched.append(story)
-            seen[story_id] = True
+            seen.add(story_id)
+            if len(seen) == len(wanted):
+                break
     
     return matched
 
 
-def download_from_s3(bucket: str, key: str, local_path: str, region: str) -> bool:
-    """Download a file from S3"""
-    try:
-        s3 = boto3.client('s3', region_name=region)
-        s3.download_file(bucket, key, local_path)
-        return True
-    except Exception as e:
-        print(f"   ⚠️  Failed to download s3://{bucket}/{key}: {e}")
-        return False
+def unresolved_ids(story_ids: List[str], found: List[Dict[str, Any]]) -> List[str]:
+    """The IDs (in order) that none of the found stories have"""
+    resolved = {story['_computed_story_id'] for story in found}
+    return [sid for sid in story_ids if sid not in resolved]
+
+
+def find_stories_in_index(index, story_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Read only the stories matching the favorite IDs, via the dataset's ID index or the story store
 
+    One story per ID, like a dataset scan: the store has one per parent of a shared video.
+    """
+    matched = {}
+    for story in index.get_many(story_ids):
+        matched.setdefault(compute_story_id(story), story)
+    for sid, story in matched.items():
+        story['_computed_story_id'] = sid
+    return list(matched.values())
 
-def generate_thumbnail_from_video(video_path: str, thumbnail_path: str) -> bool:
-    """Generate a thumbnail from the first frame of a video using ffmpeg"""
+
+def load_manifest(manifest_file: str, demo_dir: str) -> Dict[str, Any]:
+    """
+    Load the demo manifest (story ID -> demo ID, demo ID -> cached blobs)
+    
+    Without a manifest, demo IDs are seeded from an existing
+    demo_stories.json so earlier builds keep their IDs.
+    """
     try:
-        # Scale to cover 600x400, then center-crop to exactly 600x400
-        # This ensures consistent thumbnail size regardless of video aspect ratio
-        cmd = [
-            'ffmpeg',
-            '-i', video_path,
-            '-vframes', '1',           # Extract 1 frame
-            '-vf', 'scale=600:400:force_original_aspect_ratio=increase,crop=600:400',  # Scale and center-crop to 600x400
-            '-q:v', '2',                # High quality JPEG (1-31, lower is better)
-            '-f', 'image2',
-            '-y',                       # Overwrite
-            thumbnail_path
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            return True
+        with open(manifest_file, 'r') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        manifest = {'ids': {}, 'assets': {}}
+        try:
+            with open(os.path.join(demo_dir, "demo_stories.json"), 'r') as f:
+                for entry in json.load(f):
+                    if entry.get('original_story_id') and entry.get('demo_id'):
+                        manifest['ids'][entry['original_story_id']] = entry['demo_id']
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+    manifest.setdefault('ids', {})
+    manifest.setdefault('assets', {})
+    return manifest
+
+
+def save_manifest(manifest: Dict[str, Any], manifest_file: str):
+    """Write the manifest atomically"""
+    tmp_file = manifest_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_file, manifest_file)
+
+
+def assign_demo_ids(stories: List[Dict[str, Any]], manifest: Dict[str, Any]):
+    """Give each story its previous demo ID, or the next unused one"""
+    used = [int(demo_id.replace('demostory', '')) for demo_id in manifest['ids'].values()]
+    next_num = max(used, default=0) + 1
+    
+    for story in stories:
+        story_id = story['_computed_story_id']
+        if story_id not in manifest['ids']:
+            manifest['ids'][story_id] = f"demostory{next_num:03d}"
+            next_num += 1
+        story['_demo_id'] = manifest['ids'][story_id]
+
+
+def remove_stale_assets(manifest: Dict[str, Any], current_ids, demo_dir: str) -> int:
+    """Remove files of demo IDs that are no longer part of the demo (their blobs stay cached)"""
+    removed = 0
+    for demo_id in list(manifest['assets']):
+        if demo_id in current_ids:
+            continue
+        for pattern in (f"{demo_id}.*", f"{demo_id}-*"):
+            for path in glob.glob(os.path.join(demo_dir, pattern)):
+                if os.path.isdir(path):
+                    shutil.rmtree(path)  # HLS package
+                else:
+                    os.unlink(path)
+                removed += 1
+        del manifest['assets'][demo_id]
+    return removed
+
+
+def variant_file(demo_id: str, variant: str) -> str:
+    return f"{demo_id}-{IMAGE_VARIANTS[variant]['width']}w.webp"
+
+
+def sprite_file(demo_id: str) -> str:
+    return f"{demo_id}-sprite.webp"
+
+
+def rendition_file(demo_id: str) -> str:
+    return f"{demo_id}-{RENDITION['height']}p.mp4"
+
+
+def hls_dir(demo_id: str) -> str:
+    return f"{demo_id}-hls"
+
+
+def build_derived_assets(cache: AssetCache, requests: List[Dict[str, Any]]) -> int:
+    """
+    Link derived files from the cache, generating the missing ones in parallel
+    
+    Each request is a dict:
+        {'plan', 'asset', 'source', 'params', 'job', 'dest', 'tree'}
+    where asset names the entry in plan['assets'] (and the derived cache
+    kind), source is the SHA-256 of the input, and job is a media job
+    without its output (see media_jobs.py). Requests with 'tree' set
+    produce a directory (e.g. an HLS package) rather than a single file.
+    
+    Returns:
+        int: Number of files generated
+    """
+    missing = []
+    for request in requests:
+        asset, source, params = request['asset'], request['source'], request['params']
+        if request.get('tree'):
+            files = cache.lookup_derived_tree(asset, source, params)
+            if files is not None:
+                link_tree(files, request['dest'])
+                request['plan']['assets'][asset] = cache.lookup_derived(asset, source, params).name
+                continue
+            output = cache.new_temp_dir()
         else:
-            print(f"   ⚠️  ffmpeg error: {result.stderr}")
-            return False
-    except FileNotFoundError:
-        print("   ⚠️  ffmpeg not found. Install with: brew install ffmpeg")
-        return False
-    except Exception as e:
-        print(f"   ⚠️  Error generating thumbnail: {e}")
-        return False
+            blob = cache.lookup_derived(asset, source, params)
+            if blob is not None:
+                link_file(str(blob), request['dest'])
+                request['plan']['assets'][asset] = blob.name
+                continue
+            output = cache.new_temp_path(os.path.splitext(request['dest'])[1])
+        missing.append((request, dict(request['job'], output=output)))
+    
+    generated = 0
+    results = run_media_jobs([job for _, job in missing], force=True)
+    for (request, job), result in zip(missing, results):
+        asset, source, params = request['asset'], request['source'], request['params']
+        if not result['ok']:
+            if request.get('tree'):
+                shutil.rmtree(job['output'], ignore_errors=True)
+            else:
+                os.unlink(job['output'])
+        elif request.get('tree'):
+            link_tree(cache.add_derived_tree(job['output'], asset, source, params), request['dest'])
+            request['plan']['assets'][asset] = cache.lookup_derived(asset, source, params).name
+            generated += 1
+        else:
+            blob = cache.add_derived(job['output'], asset, source, params)
+            link_file(str(blob), request['dest'])
+            request['plan']['assets'][asset] = blob.name
+            generated += 1
+    return generated
 
 
-def prepare_demo_assets(demo_dir: str = "demo-assets"):
+def prepare_demo_assets(demo_dir: str = "demo-assets", favorites_file: str = "demo_favorites.json",
+                        stories_file: str = "all_video_stories_presigned.jsonl",
+                        workers: int = DEFAULT_WORKERS, cache_dir: str = DEFAULT_CACHE_DIR,
+                        faststart: bool = False, rendition: bool = False, hls: bool = False,
+                        resolve: str = 'store', db_path: str = DEFAULT_DB,
+                        config_path: str = 'resources.json'):
     """Main function to prepare demo assets"""
     print("🎬 GuardianGamer Demo Asset Preparation")
     print("=" * 70)
@@ -127,126 +261,331 @@ def prepare_demo_assets(demo_dir: str = "demo-assets"):
     
     # Load favorites
     print("\n📋 Loading favorites...")
-    favorite_ids = load_favorites()
+    favorite_ids = load_favorites(favorites_file)
     if not favorite_ids:
         print("❌ No favorites found!")
         return 1
     print(f"✅ Loaded {len(favorite_ids)} favorite story IDs")
     
-    # Load all stories
-    print("\n📚 Loading video stories...")
-    all_stories = load_video_stories()
-    if not all_stories:
-        print("❌ No stories found!")
+    # Load resources config for bucket info
+    try:
+        with open(config_path, 'r') as f:
+            resources = json.load(f)
+    except:
+        print(f"❌ Could not load {config_path}")
         return 1
-    print(f"✅ Loaded {len(all_stories)} video stories")
     
-    # Find matching stories
-    print("\n🔍 Matching favorites...")
-    demo_stories = find_stories_by_ids(all_stories, favorite_ids)
+    # Find matching stories: query DynamoDB for just the favorites, look them up
+    # in the story store, seek to each through the dataset index, or stream
+    # through the dataset. IDs one source misses are looked up in the next.
+    demo_stories = []
+    missing = list(dict.fromkeys(favorite_ids))
+    with phase('resolve'):
+        if resolve == 'dynamodb':
+            print(f"\n🔍 Fetching favorites from DynamoDB...")
+            demo_stories = fetch_stories_by_ids(missing, resources, workers=workers)
+            missing = unresolved_ids(missing, demo_stories)
+        store = StoryStore(db_path) if missing and resolve != 'dataset' and Path(db_path).exists() else None
+        if store is not None and store.count():
+            print(f"\n🔍 Looking up {len(missing)} favorites in {db_path} ({store.count()} stories)...")
+            demo_stories += find_stories_in_index(store, missing)
+            missing = unresolved_ids(missing, demo_stories)
+        index = StoryIndex.load(stories_file) if missing else None
+        if index is not None:
+            print(f"\n🔍 Looking up {len(missing)} favorites in {stories_file} index ({len(index)} stories)...")
+            demo_stories += find_stories_in_index(index, missing)
+            missing = unresolved_ids(missing, demo_stories)
+        elif missing and (Path(stories_file).exists() or (resolve != 'dynamodb' and not demo_stories)):
+            print(f"\n🔍 Scanning {stories_file} for {len(missing)} favorites (no up-to-date index)...")
+            try:
+                demo_stories += find_stories_by_ids(iter_stories(stories_file), missing)
+            except FileNotFoundError:
+                print(f"❌ File not found: {stories_file}")
+                return 1
+            except ValueError as e:
+                print(f"❌ Invalid dataset: {e}")
+                return 1
+            missing = unresolved_ids(missing, demo_stories)
+    if missing and demo_stories:
+        print(f"⚠️  {len(missing)} favorites not found: {', '.join(missing[:5])}{' ...' if len(missing) > 5 else ''}")
     if not demo_stories:
         print("❌ No matching stories found!")
         return 1
     print(f"✅ Found {len(demo_stories)} matching stories")
     
-    # Load resources config for bucket info
-    try:
-        with open('resources.json', 'r') as f:
-            resources = json.load(f)
-    except:
-        print("❌ Could not load resources.json")
-        return 1
+    # Assign stable demo IDs: stories keep the ID they were given in earlier runs
+    manifest_file = os.path.join(demo_dir, "demo_manifest.json")
+    manifest = load_manifest(manifest_file, demo_dir)
+    assign_demo_ids(demo_stories, manifest)
     
-    # Download videos and thumbnails
-    print(f"\n📥 Downloading assets...")
-    demo_metadata = []
+    # Plan downloads: collect S3 objects per story
+    print(f"\n📋 Planning downloads...")
+    planned = []
+    jobs = []
     
-    for idx, story in enumerate(demo_stories, 1):
-        demo_id = f"demostory{idx:03d}"
-        print(f"\n[{idx}/{len(demo_stories)}] Processing {demo_id}...")
+    for story in demo_stories:
+        demo_id = story['_demo_id']
         
         # Get S3 bucket and region
         stage = story.get('_stage', 'unknown')
         if stage not in resources['stages']:
-            print(f"   ⚠️  Unknown stage: {stage}")
+            print(f"   ⚠️  {demo_id}: Unknown stage: {stage}")
             continue
         
         stage_config = resources['stages'][stage]
         bucket = stage_config['s3_bucket']
         region = stage_config['region']
         
-        # Download video
         video_key = story.get('_video_url', story.get('video_url', ''))
-        if video_key and video_key != 'N/A':
-            video_local = os.path.join(demo_dir, f"{demo_id}.mp4")
-            print(f"   📹 Downloading video...")
-            
-            if download_from_s3(bucket, video_key, video_local, region):
-                print(f"   ✅ Video saved: {demo_id}.mp4")
-                story['_demo_video'] = f"{demo_id}.mp4"
-                
-                # Download or generate thumbnail
-                thumbnail_key = story.get('thumbnail_url', '')
-                thumbnail_local = os.path.join(demo_dir, f"{demo_id}.jpg")
-                
-                if thumbnail_key and thumbnail_key != 'N/A':
-                    print(f"   🖼️  Downloading thumbnail...")
-                    if download_from_s3(bucket, thumbnail_key, thumbnail_local, region):
-                        print(f"   ✅ Thumbnail saved: {demo_id}.jpg")
-                        story['_demo_thumbnail'] = f"{demo_id}.jpg"
-                    else:
-                        # Generate from video
-                        print(f"   🔧 Generating thumbnail from video...")
-                        if generate_thumbnail_from_video(video_local, thumbnail_local):
-                            print(f"   ✅ Thumbnail generated: {demo_id}.jpg")
-                            story['_demo_thumbnail'] = f"{demo_id}.jpg"
-                else:
-                    # No thumbnail exists, generate from video
-                    print(f"   🔧 Generating thumbnail from video...")
-                    if generate_thumbnail_from_video(video_local, thumbnail_local):
-                        print(f"   ✅ Thumbnail generated: {demo_id}.jpg")
-                        story['_demo_thumbnail'] = f"{demo_id}.jpg"
-                
-                # Add to metadata
-                demo_metadata.append({
-                    'demo_id': demo_id,
-                    'original_story_id': story.get('_computed_story_id'),
-                    'video_file': f"{demo_id}.mp4",
-                    'thumbnail_file': f"{demo_id}.jpg",
-                    'gamer': story.get('_gamer_extracted', 'N/A'),
-                    'stage': stage,
-                    'timestamp': story.get('_created', story.get('timestamp', 'N/A')),
-                    'description': story.get('_description', story.get('description', '')),
-                    'group': story.get('_group', story.get('group', '')),
-                    'participants': story.get('_participants', []),
-                    'gameserver': story.get('_gameserver', story.get('gameserver_id', '')),
-                    'game_start': story.get('_game_start', story.get('game_start', '')),
-                    'game_end': story.get('_game_end', story.get('game_end', '')),
+        if not video_key or video_key == 'N/A':
+            print(f"   ⚠️  {demo_id}: No video URL")
+            continue
+        
+        plan = {
+            'demo_id': demo_id,
+            'story': story,
+            'stage': stage,
+            'video_local': os.path.join(demo_dir, f"{demo_id}.mp4"),
+            'thumbnail_local': os.path.join(demo_dir, f"{demo_id}.jpg"),
+            'video_job': len(jobs),
+            'thumbnail_job': None,
+        }
+        jobs.append({'bucket': bucket, 'key': video_key, 'region': region,
+                     'local_path': plan['video_local'], 'label': f"{demo_id}.mp4"})
+        
+        thumbnail_key = story.get('thumbnail_url', '')
+        if thumbnail_key and thumbnail_key != 'N/A':
+            plan['thumbnail_job'] = len(jobs)
+            jobs.append({'bucket': bucket, 'key': thumbnail_key, 'region': region,
+                         'local_path': plan['thumbnail_local'], 'label': f"{demo_id}.jpg"})
+        planned.append(plan)
+    
+    # Download videos and thumbnails concurrently, skipping anything already cached
+    print(f"\n📥 Fetching {len(jobs)} assets with {workers} workers (cache: {cache_dir}/)...")
+    cache = AssetCache(cache_dir)
+    with phase('download'):
+        results = fetch_all_cached(jobs, cache, workers=workers)
+    
+    # Thumbnails come from S3 when the story has one, otherwise from the video
+    downloaded = []
+    thumbnail_requests = []
+    
+    for plan in planned:
+        demo_id = plan['demo_id']
+        video_result = results[plan['video_job']]
+        
+        if not video_result['ok']:
+            print(f"   ❌ {demo_id}: Failed to download video")
+            continue
+        downloaded.append(plan)
+        plan['assets'] = {'video': video_result['sha256']}
+        
+        thumbnail_job = plan['thumbnail_job']
+        if thumbnail_job is not None and results[thumbnail_job]['ok']:
+            plan['assets']['thumbnail'] = results[thumbnail_job]['sha256']
+            continue
+        
+        thumbnail_requests.append({
+            'plan': plan, 'asset': 'thumbnail', 'source': plan['assets']['video'], 'params': THUMBNAIL_PARAMS,
+            'job': {'kind': 'thumbnail', 'input': plan['video_local'], 'label': demo_id},
+            'dest': plan['thumbnail_local'],
+        })
+    
+    if thumbnail_requests:
+        print(f"\n🔧 Thumbnails for {len(thumbnail_requests)} videos without one...")
+    with phase('media/thumbnails'):
+        generated = build_derived_assets(cache, thumbnail_requests)
+    
+    # Previews: WebP thumbnail variants for srcset and a sprite sheet for hover scrubbing
+    preview_requests = []
+    for plan in downloaded:
+        demo_id = plan['demo_id']
+        if 'thumbnail' in plan['assets']:
+            for variant in IMAGE_VARIANTS:
+                preview_requests.append({
+                    'plan': plan, 'asset': f"thumbnail_{variant}", 'source': plan['assets']['thumbnail'],
+                    'params': variant_params(variant),
+                    'job': {'kind': 'variant', 'variant': variant, 'input': plan['thumbnail_local'], 'label': demo_id},
+                    'dest': os.path.join(demo_dir, variant_file(demo_id, variant)),
                 })
-            else:
-                print(f"   ❌ Failed to download video")
-        else:
-            print(f"   ⚠️  No video URL")
+        preview_requests.append({
+            'plan': plan, 'asset': 'sprite', 'source': plan['assets']['video'], 'params': SPRITE_PARAMS,
+            'job': {'kind': 'sprite', 'input': plan['video_local'], 'label': demo_id},
+            'dest': os.path.join(demo_dir, sprite_file(demo_id)),
+        })
+    
+    if preview_requests:
+        print(f"\n🖼️  Previews: {len(preview_requests)} WebP variants and sprite sheets...")
+    with phase('media/previews'):
+        previews = build_derived_assets(cache, preview_requests)
+    
+    # Playback: faststart remux (replaces the linked mp4), a lower-bitrate rendition and HLS
+    video_requests = []
+    for plan in downloaded:
+        demo_id = plan['demo_id']
+        plan['faststart'] = is_faststart(plan['video_local'])
+        if faststart and not plan['faststart']:
+            video_requests.append({
+                'plan': plan, 'asset': 'video_faststart', 'source': plan['assets']['video'],
+                'params': FASTSTART_PARAMS,
+                'job': {'kind': 'faststart', 'input': plan['video_local'], 'label': demo_id},
+                'dest': plan['video_local'],
+            })
+        if rendition:
+            video_requests.append({
+                'plan': plan, 'asset': 'rendition', 'source': plan['assets']['video'],
+                'params': RENDITION_PARAMS,
+                'job': {'kind': 'rendition', 'input': plan['video_local'], 'label': demo_id},
+                'dest': os.path.join(demo_dir, rendition_file(demo_id)),
+            })
+        if hls:
+            # Segment names change with the content, so browsers can cache them forever
+            segment_prefix = hashlib.sha256(f"{plan['assets']['video']}:{HLS_PARAMS}".encode()).hexdigest()[:12]
+            video_requests.append({
+                'plan': plan, 'asset': 'hls', 'source': plan['assets']['video'], 'params': HLS_PARAMS,
+                'job': {'kind': 'hls', 'input': plan['video_local'], 'segment_prefix': segment_prefix,
+                        'label': demo_id},
+                'dest': os.path.join(demo_dir, hls_dir(demo_id)), 'tree': True,
+            })
+    
+    if video_requests:
+        print(f"\n🎞️  Playback: {len(video_requests)} faststart remuxes, renditions and HLS packages...")
+    with phase('media/playback'):
+        processed = build_derived_assets(cache, video_requests)
+    for plan in downloaded:
+        if 'video_faststart' in plan['assets']:
+            plan['faststart'] = True
+    
+    # Build metadata
+    demo_metadata = []
+    
+    for plan in downloaded:
+        demo_id = plan['demo_id']
+        story = plan['story']
+        story['_demo_video'] = f"{demo_id}.mp4"
+        if 'thumbnail' in plan['assets']:
+            story['_demo_thumbnail'] = f"{demo_id}.jpg"
+        manifest['assets'][demo_id] = plan['assets']
+        
+        variants = [
+            {'file': variant_file(demo_id, variant), 'width': spec['width'], 'height': spec['height']}
+            for variant, spec in IMAGE_VARIANTS.items() if f"thumbnail_{variant}" in plan['assets']
+        ]
+        renditions = []
+        if 'rendition' in plan['assets']:
+            renditions.append({'file': rendition_file(demo_id), 'height': RENDITION['height'],
+                               'video_bitrate': RENDITION['video_bitrate']})
+        sprite = None
+        if 'sprite' in plan['assets']:
+            sprite = {'file': sprite_file(demo_id), 'frames': SPRITE_FRAMES,
+                      'frame_width': SPRITE_FRAME_WIDTH, 'frame_height': SPRITE_FRAME_HEIGHT}
+        
+        # Add to metadata
+        stage = plan['stage']
+        demo_metadata.append({
+            'demo_id': demo_id,
+            'original_story_id': story.get('_computed_story_id'),
+            'video_file': f"{demo_id}.mp4",
+            'faststart': plan['faststart'],
+            'renditions': renditions,
+            'hls': f"{hls_dir(demo_id)}/{HLS_MASTER_PLAYLIST}" if 'hls' in plan['assets'] else None,
+            'thumbnail_file': f"{demo_id}.jpg",
+            'thumbnail_variants': variants,
+            'sprite': sprite,
+            'gamer': story.get('_gamer_extracted', 'N/A'),
+            'stage': stage,
+            'timestamp': story.get('_created', story.get('timestamp', 'N/A')),
+            'description': story.get('_description', story.get('description', '')),
+            'group': story.get('_group', story.get('group', '')),
+            'participants': story.get('_participants', []),
+            'gameserver': story.get('_gameserver', story.get('gameserver_id', '')),
+            'game_start': story.get('_game_start', story.get('game_start', '')),
+            'game_end': story.get('_game_end', story.get('game_end', '')),
+        })
+    
+    cache.save()
+    removed = remove_stale_assets(manifest, {m['demo_id'] for m in demo_metadata}, demo_dir)
+    save_manifest(manifest, manifest_file)
     
     # Save demo metadata
     metadata_file = os.path.join(demo_dir, "demo_stories.json")
-    with open(metadata_file, 'w', encoding='utf-8') as f:
+    with phase('write'), open(metadata_file, 'w', encoding='utf-8') as f:
         json.dump(demo_metadata, f, indent=2, ensure_ascii=False)
     
+    gallery_file = os.path.join(demo_dir, "index.html")
+    with phase('render'):
+        generate_demo_gallery(demo_metadata, gallery_file)
+    
     print(f"\n{'=' * 70}")
     print(f"✅ Demo preparation complete!")
     print(f"\n📊 Summary:")
     print(f"   Total stories: {len(demo_metadata)}")
     print(f"   Video files: {len([m for m in demo_metadata if m.get('video_file')])}")
     print(f"   Thumbnail files: {len([m for m in demo_metadata if m.get('thumbnail_file')])}")
+    print(f"   Downloaded: {len([r for r in results if r['ok'] and not r['cached']])}, "
+          f"from cache: {len([r for r in results if r['cached']])}")
+    print(f"   Thumbnails generated: {generated}")
+    print(f"   Previews generated: {previews}")
+    if faststart or rendition or hls:
+        print(f"   Videos remuxed/transcoded/packaged: {processed}")
+    if removed:
+        print(f"   Removed stale assets: {removed}")
     print(f"\n📂 Output:")
     print(f"   Directory: {demo_dir}/")
     print(f"   Metadata: {demo_dir}/demo_stories.json")
-    print(f"   Videos: {demo_dir}/demostory001.mp4 ... demostory{len(demo_metadata):03d}.mp4")
+    print(f"   Manifest: {manifest_file}")
+    print(f"   Gallery: {gallery_file}")
     
     return 0
 
 
+def main():
+    parser = argparse.ArgumentParser(
+        description='Prepare demo assets from favorited video stories',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 prepare_demo_assets.py
+  python3 prepare_demo_assets.py --workers 16
+  python3 prepare_demo_assets.py --resolve dynamodb  # No full scrape needed
+  python3 prepare_demo_assets.py --resolve dataset --stories my_stories.jsonl.gz
+  python3 prepare_demo_assets.py --favorites my_favorites.json --demo-dir demo-assets
+  python3 prepare_demo_assets.py --faststart --rendition
+  python3 prepare_demo_assets.py --hls
+        """
+    )
+    parser.add_argument('--favorites', default='demo_favorites.json',
+                        help='Favorites export or list of story IDs (default: demo_favorites.json)')
+    parser.add_argument('--stories', default='all_video_stories_presigned.jsonl',
+                        help='Video stories dataset, .jsonl[.gz|.zst] or legacy .json '
+                             '(default: all_video_stories_presigned.jsonl)')
+    parser.add_argument('--demo-dir', default='demo-assets',
+                        help='Output directory for demo assets (default: demo-assets)')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Concurrent downloads (default: {DEFAULT_WORKERS})')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f'Content-addressed asset cache (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--resolve', choices=['store', 'dataset', 'dynamodb'], default='store',
+                        help='Look up favorites in the story store (falling back to the --stories '
+                             'dataset if it is empty), in the dataset, or fetch only them from '
+                             'DynamoDB with GSI1 queries + BatchGetItem (default: store)')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'Story database (default: {DEFAULT_DB})')
+    parser.add_argument('--config', default='resources.json',
+                        help='Path to resources configuration file (default: resources.json)')
+    parser.add_argument('--faststart', action='store_true',
+                        help='Remux videos with the moov atom first so playback starts immediately')
+    parser.add_argument('--rendition', action='store_true',
+                        help=f"Also transcode a {RENDITION['height']}p/{RENDITION['video_bitrate']} "
+                             f"rendition for slow connections")
+    parser.add_argument('--hls', action='store_true',
+                        help='Package videos as HLS (source + rendition) in demostoryXXX-hls/')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    
+    return prepare_demo_assets(args.demo_dir, args.favorites, args.stories, args.workers, args.cache_dir,
+                               args.faststart, args.rendition, args.hls, args.resolve, args.db, args.config)
+
+
 if __name__ == '__main__':
-    exit(prepare_demo_assets())
+    exit(run_main(main))
 
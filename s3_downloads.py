@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Concurrent S3 download engine for the demo asset scripts.
+
+Downloads a batch of objects with a bounded thread pool, shared clients (see
+aws_clients.py) and TransferConfig-tuned multipart downloads, so large mp4s
+are fetched as several ranged parts in parallel while small thumbnails don't
+wait behind them. Progress is aggregated across all workers.
+
+A download job is a dict:
+    {
+        'bucket': 'ggbucket-...',
+        'key': 'videos/....mp4',
+        'local_path': 'demo-assets/demostory001.mp4',
+        'region': 'us-west-2',
+        'profile': None,        # optional AWS profile, e.g. 'prod'
+        'label': 'demostory001.mp4',  # optional, for progress output
+    }
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from boto3.s3.transfer import TransferConfig
+
+from aws_clients import get_client
+
+DEFAULT_WORKERS = 8
+
+# Multipart only pays off for the videos; thumbnails are well under the threshold
+DEFAULT_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+    use_threads=True,
+)
+
+
+class DownloadProgress:
+    """Aggregated progress across concurrent downloads"""
+
+    def __init__(self, total_files: int, verbose: bool = True):
+        self.total_files = total_files
+        self.verbose = verbose
+        self.completed = 0
+        self.failed = 0
+        self.bytes_done = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def add_bytes(self, amount: int):
+        with self._lock:
+            self.bytes_done += amount
+
+    def file_done(self, job: Dict[str, Any], ok: bool, error: Optional[str] = None):
+        with self._lock:
+            self.completed += 1
+            if not ok:
+                self.failed += 1
+            elapsed = max(time.monotonic() - self.started, 1e-6)
+            line = (f"   [{self.completed}/{self.total_files}] "
+                    f"{'✅' if ok else '⚠️ '} {job.get('label', job['key'])} - "
+                    f"{self.bytes_done / (1024 * 1024):.1f} MB total, "
+                    f"{self.bytes_done / elapsed / (1024 * 1024):.1f} MB/s")
+            if error:
+                line += f"\n      ⚠️  Failed to download s3://{job['bucket']}/{job['key']}: {error}"
+            if self.verbose:
+                print(line)
+
+
+def download_one(job: Dict[str, Any], transfer_config: TransferConfig = DEFAULT_TRANSFER_CONFIG,
+                 progress: Optional[DownloadProgress] = None) -> Dict[str, Any]:
+    """
+    Download a single job
+
+    Returns:
+        dict: {'job', 'ok', 'bytes', 'seconds', 'error'}
+    """
+    start = time.monotonic()
+    transferred = [0]
+
+    def callback(amount):
+        transferred[0] += amount
+        if progress:
+            progress.add_bytes(amount)
+
+    try:
+        s3 = get_client('s3', job['region'], job.get('profile'))
+        local_dir = os.path.dirname(job['local_path'])
+        if local_dir:
+            os.makedirs(local_dir, exist_ok=True)
+        s3.download_file(job['bucket'], job['key'], job['local_path'],
+                         Config=transfer_config, Callback=callback)
+        result = {'job': job, 'ok': True, 'bytes': transferred[0],
+                  'seconds': time.monotonic() - start, 'error': None}
+    except Exception as e:
+        result = {'job': job, 'ok': False, 'bytes': transferred[0],
+                  'seconds': time.monotonic() - start, 'error': str(e)}
+
+    if progress:
+        progress.file_done(job, result['ok'], result['error'])
+    return result
+
+
+def download_all(jobs: List[Dict[str, Any]], workers: int = DEFAULT_WORKERS,
+                 transfer_config: TransferConfig = DEFAULT_TRANSFER_CONFIG,
+                 verbose: bool = True) -> List[Dict[str, Any]]:
+    """
+    Download jobs concurrently with a bounded worker pool
+
+    Args:
+        jobs: Download job dicts (see module docstring)
+        workers: Maximum number of files downloaded at once
+        transfer_config: boto3 TransferConfig used for each file
+        verbose: Print aggregated progress as files complete
+
+    Returns:
+        list: One result dict per job, in the same order as jobs
+    """
+    if not jobs:
+        return []
+
+    progress = DownloadProgress(len(jobs), verbose)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(download_one, job, transfer_config, progress): idx
+                   for idx, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    if verbose:
+        elapsed = max(time.monotonic() - progress.started, 1e-6)
+        print(f"   📦 {progress.completed - progress.failed}/{len(jobs)} files, "
+              f"{progress.bytes_done / (1024 * 1024):.1f} MB in {elapsed:.1f}s "
+              f"({progress.bytes_done / elapsed / (1024 * 1024):.1f} MB/s)")
+
+    return results
@@ -7,10 +7,11 @@ This script:
 2. Connects to each DynamoDB events table in each stage
 3. Scans for all items with SK starting with "V#" (video stories)
 4. Collects metadata and saves to a comprehensive output file
-5. Generates a browsable HTML report
+5. Upserts them into the story store (stories.db, see story_store.py)
+6. Generates a browsable HTML report
 
 Usage:
-    python3 scrape_video_stories.py [--stages dev test dev-old test-old prod-old] [--output video_stories.json]
+    python3 scrape_video_stories.py [--stages dev test dev-old test-old prod-old] [--output video_stories.jsonl]
     python3 scrape_video_stories.py --stage dev-old  # Scrape a single stage
     python3 scrape_video_stories.py --format html    # Generate HTML report
 """
@@ -21,9 +22,14 @@ import json
 import sys
 from datetime import datetime
 from decimal import Decimal
-from pathlib import Path
-from typing import List, Dict, Any
-from collections import defaultdict
+from typing import Iterable, Iterator, List, Dict, Any, Optional
+
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from story_io import StoryWriter, dataset_stem, iter_stories, write_stories
+from story_parquet import write_parquet
+from story_record import StoryRecord
+from story_stats import StoryStats, generate_stats, save_stats
+from story_store import DEFAULT_DB, StoryStore, story_key
 
 
 class DecimalEncoder(json.JSONEncoder):
@@ -57,6 +63,55 @@ def load_resources_config(config_path: str = "resources.json") -> Dict[str, Any]
         sys.exit(1)
 
 
+def iter_video_story_pages(stage_name: str, table_name: str, region: str) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Scan DynamoDB table for items with SK starting with "V#", one page at a time
+    
+    Each page's video stories are yielded as soon as the page arrives, as
+    StoryRecords tagged with their stage (see story_record.py). Errors are
+    raised to the caller.
+    
+    Args:
+        stage_name: Name of the stage (for logging)
+        table_name: DynamoDB table name
+        region: AWS region
+        
+    Yields:
+        list: Video story records of one scan page
+    """
+    # A session of its own, so stages can be scanned from parallel threads
+    dynamodb = boto3.session.Session().resource('dynamodb', region_name=region)
+    table = dynamodb.Table(table_name)
+    
+    # Scan with filter expression
+    scan_kwargs = {
+        'FilterExpression': 'begins_with(SK, :sk_prefix)',
+        'ExpressionAttributeValues': {
+            ':sk_prefix': 'V#'
+        }
+    }
+    
+    items_scanned = 0
+    found = 0
+    # Handle pagination
+    while True:
+        with phase(f'scan/{stage_name}'):
+            response = table.scan(**scan_kwargs)
+        # Compact records with the stage metadata; the raw page is dropped
+        items = [StoryRecord.from_item(item, stage_name, region, table_name) for item in response.get('Items', [])]
+        items_scanned += response.get('ScannedCount', 0)
+        found += len(items)
+        
+        print(f"   [{stage_name}] Scanned {items_scanned} items, found {found} video stories so far...")
+        yield items
+        
+        # Check if there are more items to scan
+        if 'LastEvaluatedKey' not in response:
+            break
+        
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
 def scan_video_stories_from_stage(stage_name: str, table_name: str, region: str) -> List[Dict[str, Any]]:
     """
     Scan DynamoDB table for all items with SK starting with "V#"
@@ -69,9 +124,6 @@ def scan_video_stories_from_stage(stage_name: str, table_name: str, region: str)
     Returns:
         list: List of video story items
     """
-    dynamodb = boto3.resource('dynamodb', region_name=region)
-    table = dynamodb.Table(table_name)
-    
     print(f"\n🔍 Scanning stage: {stage_name}")
     print(f"   Table: {table_name}")
     print(f"   Region: {region}")
@@ -79,39 +131,11 @@ def scan_video_stories_from_stage(stage_name: str, table_name: str, region: str)
     
     video_stories = []
     
-    # Scan with filter expression
-    scan_kwargs = {
-        'FilterExpression': 'begins_with(SK, :sk_prefix)',
-        'ExpressionAttributeValues': {
-            ':sk_prefix': 'V#'
-        }
-    }
-    
     try:
-        items_scanned = 0
-        # Handle pagination
-        while True:
-            response = table.scan(**scan_kwargs)
-            items = response.get('Items', [])
+        for items in iter_video_story_pages(stage_name, table_name, region):
             video_stories.extend(items)
-            items_scanned += response.get('ScannedCount', 0)
-            
-            print(f"   Scanned {items_scanned} items, found {len(video_stories)} video stories so far...")
-            
-            # Check if there are more items to scan
-            if 'LastEvaluatedKey' not in response:
-                break
-            
-            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
         
         print(f"✅ Stage {stage_name}: Found {len(video_stories)} video stories")
-        
-        # Add stage metadata to each video story
-        for story in video_stories:
-            story['_stage'] = stage_name
-            story['_region'] = region
-            story['_table'] = table_name
-        
         return video_stories
         
     except Exception as e:
@@ -119,156 +143,175 @@ def scan_video_stories_from_stage(stage_name: str, table_name: str, region: str)
         return []
 
 
-def enrich_video_stories(stories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def enrich_story(story: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add computed fields for easier browsing to a raw video story
+
+    The story is updated in place (raw fields are kept as they are) and
+    returned, so enriching never holds a second copy of the data. A
+    StoryRecord computes these fields when they are read, so it is returned
+    as it is.
+    """
+    if isinstance(story, StoryRecord):
+        return story
+    
+    # Parse SK to extract timestamp and gamer
+    # Format: V#<timestamp>#<gamer_id>
+    sk = story.get('SK', 'N/A')
+    if sk.startswith('V#'):
+        parts = sk.split('#')
+        if len(parts) >= 3:
+            story['_timestamp_extracted'] = parts[1]
+            story['_gamer_extracted'] = '#'.join(parts[2:])
+    
+    # Parse created/timestamp
+    story['_created'] = story.get('timestamp', story.get('created_at', 'N/A'))
+    
+    # Extract video info
+    story['_video_url'] = story.get('video_url', story.get('video_key', story.get('s3_key', 'N/A')))
+    
+    # Status and metadata
+    story['_viewed'] = story.get('viewed', 'False') == 'True'
+    story['_description'] = story.get('description', '')
+    story['_group'] = story.get('group', story.get('GSI1PK', 'N/A'))
+    
+    # Participants
+    participants_str = story.get('participants', '[]')
+    try:
+        if isinstance(participants_str, str):
+            story['_participants'] = json.loads(participants_str)
+        else:
+            story['_participants'] = participants_str
+    except:
+        story['_participants'] = []
+    
+    # Game metadata
+    if 'gameserver_id' in story:
+        story['_gameserver'] = story['gameserver_id']
+    if 'game_start' in story:
+        story['_game_start'] = story['game_start']
+    if 'game_end' in story:
+        story['_game_end'] = story['game_end']
+    
+    return story
+
+
+def iter_enriched_stories(stories: Iterable[Dict[str, Any]],
+                          stats: Optional[StoryStats] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Enrich stories as they stream past, adding each to stats
+
+    Enrichment and statistics take a single pass over the stories, and a
+    consumer (e.g. a StoryWriter) gets each story as soon as it is enriched.
+    
+    Args:
+        stories: Raw video story items (a list or a stream); enriched in place
+        stats: Optional StoryStats to update
+        
+    Yields:
+        dict: Enriched video story
+    """
+    for story in stories:
+        enrich_story(story)
+        if stats is not None:
+            stats.add(story)
+        yield story
+
+
+def enrich_video_stories(stories: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Enrich video stories with computed fields for easier browsing
     
     Args:
-        stories: List of raw video story items
+        stories: Raw video story items; enriched in place (see enrich_story)
         
     Returns:
         list: Enriched video stories
     """
-    enriched = []
-    
-    for story in stories:
-        enriched_story = dict(story)
-        
-        # Extract key fields
-        pk = story.get('PK', 'N/A')
-        sk = story.get('SK', 'N/A')
-        
-        # Parse SK to extract timestamp and gamer
-        # Format: V#<timestamp>#<gamer_id>
-        if sk.startswith('V#'):
-            parts = sk.split('#')
-            if len(parts) >= 3:
-                enriched_story['_timestamp_extracted'] = parts[1]
-                enriched_story['_gamer_extracted'] = '#'.join(parts[2:])
-        
-        # Parse created/timestamp
-        created = story.get('timestamp', story.get('created_at', 'N/A'))
-        enriched_story['_created'] = created
-        
-        # Extract video info
-        video_url = story.get('video_url', story.get('video_key', story.get('s3_key', 'N/A')))
-        enriched_story['_video_url'] = video_url
-        
-        # Status and metadata
-        enriched_story['_viewed'] = story.get('viewed', 'False') == 'True'
-        enriched_story['_description'] = story.get('description', '')
-        enriched_story['_group'] = story.get('group', story.get('GSI1PK', 'N/A'))
-        
-        # Participants
-        participants_str = story.get('participants', '[]')
-        try:
-            if isinstance(participants_str, str):
-                enriched_story['_participants'] = json.loads(participants_str)
-            else:
-                enriched_story['_participants'] = participants_str
-        except:
-            enriched_story['_participants'] = []
-        
-        # Game metadata
-        if 'gameserver_id' in story:
-            enriched_story['_gameserver'] = story['gameserver_id']
-        if 'game_start' in story:
-            enriched_story['_game_start'] = story['game_start']
-        if 'game_end' in story:
-            enriched_story['_game_end'] = story['game_end']
-        
-        enriched.append(enriched_story)
-    
-    return enriched
+    return list(iter_enriched_stories(stories))
 
 
-def generate_summary_stats(stories: List[Dict[str, Any]]) -> Dict[str, Any]:
+def generate_summary_stats(stories: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
     """
     Generate summary statistics for video stories
     
     Args:
-        stories: List of video stories
+        stories: Enriched video stories
         
     Returns:
-        dict: Summary statistics
+        dict: Summary statistics (unique_* counts are HyperLogLog estimates, see story_stats)
     """
-    stats = {
-        'total_stories': len(stories),
-        'by_stage': defaultdict(int),
-        'by_region': defaultdict(int),
-        'unique_parents': set(),
-        'unique_gamers': set(),
-        'unique_groups': set(),
-        'viewed_count': 0,
-        'unviewed_count': 0,
-        'with_description': 0,
-        'with_gameserver': 0,
-    }
-    
-    for story in stories:
-        # Count by stage and region
-        stage = story.get('_stage', 'unknown')
-        region = story.get('_region', 'unknown')
-        stats['by_stage'][stage] += 1
-        stats['by_region'][region] += 1
-        
-        # Unique entities
-        pk = story.get('PK', '')
-        if pk:
-            stats['unique_parents'].add(pk)
-        
-        gamer = story.get('GSI1PK', story.get('_gamer_extracted', ''))
-        if gamer:
-            stats['unique_gamers'].add(gamer)
-        
-        group = story.get('group', '')
-        if group:
-            stats['unique_groups'].add(group)
-        
-        # Counts
-        if story.get('_viewed', False):
-            stats['viewed_count'] += 1
-        else:
-            stats['unviewed_count'] += 1
-        
-        if story.get('_description'):
-            stats['with_description'] += 1
-        
-        if story.get('_gameserver'):
-            stats['with_gameserver'] += 1
-    
-    # Convert sets to counts
-    stats['unique_parents'] = len(stats['unique_parents'])
-    stats['unique_gamers'] = len(stats['unique_gamers'])
-    stats['unique_groups'] = len(stats['unique_groups'])
-    stats['by_stage'] = dict(stats['by_stage'])
-    stats['by_region'] = dict(stats['by_region'])
-    
-    return stats
+    return generate_stats(stories).to_dict()
 
 
 def save_to_json(stories: List[Dict[str, Any]], output_file: str):
     """
-    Save video stories to JSON file
+    Save video stories to a dataset file
+    
+    The suffix picks the format (.jsonl, .jsonl.gz, .jsonl.zst or the legacy
+    .json array, see story_io.py). Uncompressed files also get
+    <output_file>.idx.json (story ID -> offset, written by
+    story_io.StoryWriter).
     
     Args:
         stories: List of video stories
         output_file: Output file path
     """
     try:
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(stories, f, indent=2, cls=DecimalEncoder, ensure_ascii=False)
+        write_stories(stories, output_file, cls=DecimalEncoder)
         print(f"\n💾 Saved {len(stories)} video stories to: {output_file}")
     except Exception as e:
         print(f"\n❌ Error saving to file: {e}")
 
 
-def generate_html_report(stories: List[Dict[str, Any]], stats: Dict[str, Any], output_file: str):
+def save_to_store(stories: List[Dict[str, Any]], db_path: str, scraped_stages: List[str]):
+    """
+    Upsert scraped stories into the story store
+
+    Presigned URLs already in the store are kept. Stories of the scraped
+    stages that no longer exist in DynamoDB are removed.
+
+    Args:
+        stories: Enriched video stories
+        db_path: Story database path
+        scraped_stages: Stages that were scraped in full
+    """
+    try:
+        store = StoryStore(db_path)
+        written = store.upsert_many(stories)
+        removed = 0
+        for stage in scraped_stages:
+            removed += store.delete_missing(stage, map(story_key, stories))
+        print(f"\n📚 Upserted {written} video stories into: {db_path}"
+              + (f" (removed {removed} deleted stories)" if removed else ""))
+    except Exception as e:
+        print(f"\n❌ Error saving to story store: {e}")
+
+
+def save_to_parquet(stories: List[Dict[str, Any]], output_dir: str):
+    """
+    Export video stories to a Parquet dataset partitioned by stage and month
+
+    Only the partitions of the scraped stories are replaced (see
+    story_parquet.write_parquet).
+
+    Args:
+        stories: Enriched video stories
+        output_dir: Parquet dataset directory
+    """
+    try:
+        written = write_parquet(stories, output_dir)
+        print(f"\n📊 Exported {written} video stories to Parquet: {output_dir}")
+    except Exception as e:
+        print(f"\n❌ Error exporting to Parquet: {e}")
+
+
+def generate_html_report(stories: Iterable[Dict[str, Any]], stats: Dict[str, Any], output_file: str):
     """
     Generate an HTML report for browsing video stories
     
     Args:
-        stories: List of video stories
+        stories: Video stories (a list or a stream, read once)
         stats: Summary statistics
         output_file: Output HTML file path
     """
@@ -473,43 +516,7 @@ def generate_html_report(stories: List[Dict[str, Any]], stats: Dict[str, Any], o
     <div class="story-grid" id="storyGrid">
 """
     
-    for story in stories:
-        pk = story.get('PK', 'N/A')
-        sk = story.get('SK', 'N/A')
-        stage = story.get('_stage', 'unknown')
-        region = story.get('_region', 'unknown')
-        video_url = story.get('_video_url', '#')
-        description = story.get('_description', 'No description')
-        timestamp = story.get('_created', 'N/A')
-        viewed = story.get('_viewed', False)
-        gamer = story.get('_gamer_extracted', 'N/A')
-        group = story.get('_group', 'N/A')
-        participants = story.get('_participants', [])
-        
-        viewed_tag = 'viewed' if viewed else 'unviewed'
-        viewed_text = '✓ Viewed' if viewed else '○ Unviewed'
-        
-        # Truncate description if too long
-        display_desc = description if len(description) <= 200 else description[:197] + '...'
-        
-        html += f"""
-        <div class="story-card" data-stage="{stage}" data-viewed="{viewed_tag}" data-search="{pk.lower()} {gamer.lower()} {description.lower()} {group.lower()}">
-            <div class="story-header">
-                <div class="story-title">{gamer}</div>
-                <div class="story-meta">{timestamp}</div>
-            </div>
-            <div class="story-description">{display_desc}</div>
-            <div class="story-tags">
-                <span class="tag stage">{stage}</span>
-                <span class="tag">{region}</span>
-                <span class="tag {viewed_tag}">{viewed_text}</span>
-                <span class="tag">Group: {group[:20]}...</span>
-            </div>
-            <a href="{video_url}" class="video-link" target="_blank">View Video</a>
-        </div>
-"""
-    
-    html += """
+    footer = """
     </div>
     
     <script>
@@ -545,9 +552,45 @@ def generate_html_report(stories: List[Dict[str, Any]], stats: Dict[str, Any], o
 </html>
 """
     
+    # Cards are written as they are rendered: the report is several times the
+    # size of the stories, so it is never held in memory as a whole
     try:
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(html)
+            for story in stories:
+                pk = story.get('PK', 'N/A')
+                stage = story.get('_stage', 'unknown')
+                region = story.get('_region', 'unknown')
+                video_url = story.get('_video_url', '#')
+                description = story.get('_description', 'No description')
+                timestamp = story.get('_created', 'N/A')
+                viewed = story.get('_viewed', False)
+                gamer = story.get('_gamer_extracted', 'N/A')
+                group = story.get('_group', 'N/A')
+                
+                viewed_tag = 'viewed' if viewed else 'unviewed'
+                viewed_text = '✓ Viewed' if viewed else '○ Unviewed'
+                
+                # Truncate description if too long
+                display_desc = description if len(description) <= 200 else description[:197] + '...'
+                
+                f.write(f"""
+        <div class="story-card" data-stage="{stage}" data-viewed="{viewed_tag}" data-search="{pk.lower()} {gamer.lower()} {description.lower()} {group.lower()}">
+            <div class="story-header">
+                <div class="story-title">{gamer}</div>
+                <div class="story-meta">{timestamp}</div>
+            </div>
+            <div class="story-description">{display_desc}</div>
+            <div class="story-tags">
+                <span class="tag stage">{stage}</span>
+                <span class="tag">{region}</span>
+                <span class="tag {viewed_tag}">{viewed_text}</span>
+                <span class="tag">Group: {group[:20]}...</span>
+            </div>
+            <a href="{video_url}" class="video-link" target="_blank">View Video</a>
+        </div>
+""")
+            f.write(footer)
         print(f"📄 Generated HTML report: {output_file}")
     except Exception as e:
         print(f"❌ Error generating HTML report: {e}")
@@ -562,8 +605,10 @@ Examples:
   python3 scrape_video_stories.py
   python3 scrape_video_stories.py --stages dev test
   python3 scrape_video_stories.py --stage dev-old
-  python3 scrape_video_stories.py --output my_stories.json --format html
+  python3 scrape_video_stories.py --output my_stories.jsonl --format html
   python3 scrape_video_stories.py --format json  # JSON output only
+  python3 scrape_video_stories.py --no-db         # Don't update stories.db
+  python3 scrape_video_stories.py --parquet stories.parquet  # Also export for analytics
         """
     )
     
@@ -587,8 +632,8 @@ Examples:
     parser.add_argument(
         '--output',
         '-o',
-        default='all_video_stories.json',
-        help='Output JSON file path (default: all_video_stories.json)'
+        default='all_video_stories.jsonl',
+        help='Output dataset path; .jsonl, .jsonl.gz, .jsonl.zst or legacy .json (default: all_video_stories.jsonl)'
     )
     
     parser.add_argument(
@@ -598,6 +643,31 @@ Examples:
         help='Output format (default: both)'
     )
     
+    parser.add_argument(
+        '--db',
+        default=DEFAULT_DB,
+        help=f'Story database to upsert into (default: {DEFAULT_DB})'
+    )
+    
+    parser.add_argument(
+        '--no-db',
+        action='store_true',
+        help='Only write the JSON/HTML outputs, not the story database'
+    )
+    
+    parser.add_argument(
+        '--parquet',
+        metavar='DIR',
+        help='Also export the stories to a Parquet dataset partitioned by stage and month (needs pyarrow)'
+    )
+    
+    parser.add_argument(
+        '--stats',
+        metavar='FILE',
+        help='Also save the summary statistics, to merge or update with story_stats.py'
+    )
+    
+    add_instrumentation_arguments(parser)
     args = parser.parse_args()
     
     print("🚀 GuardianGamer Video Stories Scraper")
@@ -616,8 +686,20 @@ Examples:
     
     print(f"\n📋 Stages to scrape: {', '.join(stages_to_scrape)}")
     
-    # Scrape all stages
-    all_stories = []
+    # Scrape all stages. Each stage's stories are enriched, counted and
+    # written to the dataset in one pass, then saved to the store and the
+    # Parquet export; no list of every stage's stories is kept
+    scraped_stages = []
+    total = 0
+    stats = StoryStats()
+    writer = None
+    if args.format in ['json', 'both']:
+        try:
+            writer = StoryWriter(args.output, cls=DecimalEncoder)
+        except Exception as e:
+            print(f"\n❌ Error saving to file: {e}")
+    # Without a dataset to stream the HTML report from, its stories are kept
+    report_stories = [] if writer is None and args.format in ['html', 'both'] else None
     
     for stage_name in stages_to_scrape:
         if stage_name not in config['stages']:
@@ -629,18 +711,51 @@ Examples:
         region = stage_config['region']
         
         stories = scan_video_stories_from_stage(stage_name, table_name, region)
-        all_stories.extend(stories)
+        enriched = iter_enriched_stories(stories, stats)
+        while True:
+            # Timed per story, so enriching and writing are told apart in the same pass
+            with phase('enrich'):
+                story = next(enriched, None)
+            if story is None:
+                break
+            if writer is not None:
+                with phase('write/dataset'):
+                    try:
+                        writer.write(story)
+                    except Exception as e:
+                        print(f"\n❌ Error saving to file: {e}")
+                        writer.abort()
+                        writer = None
+            if report_stories is not None:
+                report_stories.append(story)
+        total += len(stories)
+        if stories:
+            # A failed scan also returns nothing; never prune a stage on that
+            scraped_stages.append(stage_name)
+            if not args.no_db:
+                with phase('write/store'):
+                    save_to_store(stories, args.db, [stage_name])
+            if args.parquet:
+                # Partitions are per stage, so each stage's export leaves the others alone
+                with phase('write/parquet'):
+                    save_to_parquet(stories, args.parquet)
     
     print(f"\n{'=' * 60}")
-    print(f"✅ Total video stories collected: {len(all_stories)}")
-    
-    # Enrich stories
-    print("\n🔧 Enriching video stories with metadata...")
-    enriched_stories = enrich_video_stories(all_stories)
-    
-    # Generate statistics
-    print("📊 Generating statistics...")
-    stats = generate_summary_stats(enriched_stories)
+    print(f"✅ Total video stories collected: {total}")
+    
+    if writer is not None:
+        with phase('write/dataset'):
+            try:
+                writer.close()
+                print(f"\n💾 Saved {writer.count} video stories to: {args.output}")
+            except Exception as e:
+                print(f"\n❌ Error saving to file: {e}")
+                writer = None
+    
+    if args.stats:
+        save_stats(stats, args.stats)
+        print(f"\n💾 Saved summary statistics to: {args.stats}")
+    stats = stats.to_dict()
     
     print("\n📈 Summary Statistics:")
     print(f"   Total stories: {stats['total_stories']}")
@@ -653,13 +768,15 @@ Examples:
     for stage, count in stats['by_stage'].items():
         print(f"     - {stage}: {count}")
     
-    # Save outputs
-    if args.format in ['json', 'both']:
-        save_to_json(enriched_stories, args.output)
-    
     if args.format in ['html', 'both']:
-        html_output = args.output.replace('.json', '.html')
-        generate_html_report(enriched_stories, stats, html_output)
+        html_output = dataset_stem(args.output) + '.html'
+        if report_stories is None and writer is None:
+            print("\n⚠️  Skipping the HTML report: the dataset it is rendered from wasn't saved")
+        else:
+            # Streamed back from the dataset just written
+            with phase('render'):
+                generate_html_report(report_stories if report_stories is not None else iter_stories(args.output),
+                                     stats, html_output)
     
     print(f"\n{'=' * 60}")
     print("✅ Video story scraping complete!")
@@ -668,5 +785,5 @@ Examples:
 
 
 if __name__ == '__main__':
-    exit(main())
+    exit(run_main(main))
 
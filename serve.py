@@ -1,38 +1,559 @@
 #!/usr/bin/env python3
 """
 Simple web server that serves the video stories HTML at the root URL
+
+Optionally proxies videos from S3 through a local on-disk LRU cache, so repeat
+plays are served from local disk instead of S3:
+
+    python3 serve.py --proxy
+    # Videos are then available at /video/<stage>/<s3-key>
+
+HLS packages written by prepare_demo_assets.py --hls are served with caching
+headers: playlists are revalidated on every load (cheap 304s), while segments,
+whose names embed a content hash, are cached by the browser indefinitely.
+
+With --db, stories are also served from the story store (see story_store.py):
+
+    GET /api/stories?stage=dev&gamer=G%23...&since=2025-11-24&available=1&limit=50
+    GET /api/stories/<story_id>
+    GET /api/demo-stories
+    GET /api/search?q=fixed+the+login+issue&stage=prod&limit=20
 """
 
+import argparse
 import http.server
+import json
+import mimetypes
+import os
 import socketserver
+import time
+import urllib.parse
 from pathlib import Path
+from typing import Any, Callable, Dict
+
+from instrumentation import add_instrumentation_arguments, run_main
+from local_aws import parse_range_header
+from metrics import Registry
+from story_store import StoryStore
+from video_cache import CachedObject, FillError, VideoCache
 
 PORT = 8000
 HTML_FILE = "all_video_stories_presigned.html"
 
+HLS_CONTENT_TYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.ts': 'video/mp2t',
+}
+HLS_PLAYLIST_CACHE_CONTROL = 'no-cache'
+HLS_SEGMENT_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Bytes per sendfile() call; a proxied miss sends each chunk as soon as it's cached
+SEND_CHUNK_BYTES = 1024 * 1024
+
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 1000
+SEARCH_DEFAULT_LIMIT = 20
+
+# Metrics exposed at /metrics
+METRICS = Registry()
+REQUESTS = METRICS.counter('serve_http_requests_total', 'HTTP requests by route, method and status',
+                           ('route', 'method', 'status'))
+REQUEST_LATENCY = METRICS.histogram('serve_http_request_duration_seconds',
+                                    'Time to handle a request, including sending the body', ('route',))
+BYTES_SENT = METRICS.counter('serve_http_response_bytes_total', 'Response body bytes sent', ('route',))
+IN_FLIGHT = METRICS.gauge('serve_http_requests_in_flight', 'Requests currently being handled')
+STORE_LATENCY = METRICS.histogram('serve_story_store_duration_seconds',
+                                  'Time spent in story store calls made by /api requests', ('operation',))
+API_RESULTS = METRICS.counter('serve_api_results_total', 'Stories returned by /api requests', ('operation',))
+
+
+def route_for(path: str) -> str:
+    """Bounded-cardinality route label for a request path"""
+    path = urllib.parse.urlsplit(path).path
+    if path == '/metrics':
+        return 'metrics'
+    if path.startswith('/api/'):
+        return 'api'
+    if path.startswith('/video/'):
+        return 'video_proxy'
+    if path.endswith('.mp4'):
+        return 'video'
+    if os.path.splitext(path)[1] in HLS_CONTENT_TYPES:
+        return 'hls'
+    if path.endswith('.html'):
+        return 'page'
+    return 'static'
+
+
+def register_video_cache_metrics(cache: VideoCache):
+    """Expose the proxy cache counters through /metrics"""
+    METRICS.callback(
+        'serve_video_cache_lookups_total', 'Video proxy cache lookups by result',
+        lambda: {(result,): cache.stats()[result] for result in ('hits', 'misses', 'coalesced')},
+        labelnames=('result',), type_name='counter')
+    METRICS.callback(
+        'serve_video_cache_hit_ratio', 'Fraction of video proxy lookups served from disk',
+        lambda: {(): _hit_ratio(cache.stats())})
+    METRICS.callback(
+        'serve_video_cache_bytes', 'Bytes currently held in the video proxy cache',
+        lambda: {(): cache.stats()['total_bytes']})
+    METRICS.callback(
+        'serve_video_cache_max_bytes', 'Video proxy cache size limit',
+        lambda: {(): cache.max_bytes})
+    METRICS.callback(
+        'serve_video_cache_entries', 'Objects currently held in the video proxy cache',
+        lambda: {(): cache.stats()['entries']})
+    METRICS.callback(
+        'serve_video_cache_evictions_total', 'Objects evicted from the video proxy cache',
+        lambda: {(): cache.stats()['evictions']}, type_name='counter')
+
+
+def register_story_store_metrics(store: StoryStore):
+    """Expose the story store's index build time through /metrics"""
+    METRICS.callback(
+        'serve_story_store_search_index_build_seconds',
+        'Time the story store took to build its full-text index at startup (0 if it was up to date)',
+        lambda: {(): store.search_index_build_seconds or 0.0})
+
+
+def _hit_ratio(stats) -> float:
+    # Coalesced lookups waited on another request's fetch, so they count as misses
+    lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+    return stats['hits'] / lookups if lookups else 0.0
+
+
+class VideoProxy:
+    """
+    Streams S3 video objects through a VideoCache
+
+    Args:
+        config: Resources configuration (stage -> bucket/region)
+        cache: Cache to store fetched objects in
+        endpoint_url: Optional S3 endpoint override (e.g. a local S3 stand-in)
+    """
+
+    def __init__(self, config, cache: VideoCache, endpoint_url: str = None):
+        self.config = config
+        self.cache = cache
+        self.endpoint_url = endpoint_url
+
+    def _client(self, region: str):
+        # Imported lazily so serve.py works without boto3 unless --proxy is used
+        from aws_clients import get_client
+        return get_client('s3', region, endpoint_url=self.endpoint_url)
+
+    def resolve(self, path: str):
+        """Map /video/<stage>/<key> to (bucket, key, region), or None"""
+        rest = urllib.parse.unquote(urllib.parse.urlsplit(path).path)[len('/video/'):]
+        stage, _, key = rest.partition('/')
+        stage_config = self.config.get('stages', {}).get(stage)
+        if not stage_config or not key:
+            return None
+        return stage_config['s3_bucket'], key, stage_config['region']
+
+    def open(self, bucket: str, key: str, region: str):
+        """Open the cached object, fetching it from S3 on a miss"""
+        def fetch():
+            response = self._client(region).get_object(Bucket=bucket, Key=key)
+            return response['ContentLength'], response['Body'].iter_chunks(chunk_size=1024 * 1024)
+
+        return self.cache.open(bucket, key, fetch)
+
+
+def api_query(query: str) -> Dict[str, Any]:
+    """
+    Parse /api/stories query parameters into StoryStore.query() arguments
+
+    Raises:
+        ValueError: On an unknown parameter or an invalid value
+    """
+    params = urllib.parse.parse_qs(query)
+    args = {'limit': API_DEFAULT_LIMIT, 'offset': 0}
+    for name, values in params.items():
+        value = values[-1]
+        if name in ('limit', 'offset'):
+            args[name] = int(value)
+            if args[name] < 0:
+                raise ValueError(f"{name} must not be negative")
+        elif name == 'available':
+            args[name] = value.lower() in ('1', 'true', 'yes')
+        elif name == 'expiring_before':
+            args[name] = int(value)
+        elif name in ('stage', 'gamer', 'group', 'pk', 'sk', 'since', 'until'):
+            args[name] = value
+        else:
+            raise ValueError(f"Unknown parameter: {name}")
+    args['limit'] = min(args['limit'], API_MAX_LIMIT)
+    return args
+
+
+class _CountingWriter:
+    """A handler's wfile that counts what is written to it as response body bytes"""
+
+    def __init__(self, wfile, handler: 'CustomHandler'):
+        self._wfile = wfile
+        self._handler = handler
+
+    def write(self, data: bytes):
+        written = self._wfile.write(data)
+        self._handler._body_bytes += len(data)
+        return written
+
+    def __getattr__(self, name: str):
+        return getattr(self._wfile, name)
+
+
 class CustomHandler(http.server.SimpleHTTPRequestHandler):
+    html_file = HTML_FILE
+    video_proxy = None
+    story_store = None
+    # Errors can be sent before a request is routed (e.g. a malformed request line)
+    _body_bytes = 0
+    _sending_error = False
+
+    def send_response(self, code, message=None):
+        self._status = code
+        super().send_response(code, message)
+
+    def write_body(self, body: bytes):
+        """Write (part of) the response body, counting it for the metrics"""
+        self.wfile.write(body)
+        self._body_bytes += len(body)
+
+    def send_error(self, code, message=None, explain=None):
+        # The base class writes the error page to wfile itself, right after the headers
+        wfile = self.wfile
+        self._sending_error = True
+        try:
+            super().send_error(code, message, explain)
+        finally:
+            self._sending_error = False
+            self.wfile = wfile
+
+    def end_headers(self):
+        super().end_headers()
+        if self._sending_error:
+            self.wfile = _CountingWriter(self.wfile, self)
+
+    def copyfile(self, source, outputfile):
+        # SimpleHTTPRequestHandler's static files, counted as they are written
+        for chunk in iter(lambda: source.read(SEND_CHUNK_BYTES), b''):
+            outputfile.write(chunk)
+            self._body_bytes += len(chunk)
+
+    def instrumented(self, handler):
+        """Run a request handler, recording its route, status, latency and body bytes actually sent"""
+        self._status = 0
+        self._body_bytes = 0
+        start = time.perf_counter()
+        IN_FLIGHT.inc()
+        try:
+            handler()
+        finally:
+            IN_FLIGHT.dec()
+            route = route_for(self.path)
+            REQUESTS.inc(route=route, method=self.command, status=self._status)
+            REQUEST_LATENCY.observe(time.perf_counter() - start, route=route)
+            BYTES_SENT.inc(self._body_bytes, route=route)
+
     def do_GET(self):
+        self.instrumented(self.route_get)
+
+    def do_HEAD(self):
+        self.instrumented(self.route_head)
+
+    def route_head(self):
+        self.redirect_root()
+        if os.path.splitext(urllib.parse.urlsplit(self.path).path)[1] in HLS_CONTENT_TYPES:
+            return self.serve_hls()
+        return super().do_HEAD()
+
+    def redirect_root(self):
         # Redirect root to the HTML file
         if self.path == '/' or self.path == '':
-            self.path = '/' + HTML_FILE
+            self.path = '/' + self.html_file
+
+    def route_get(self):
+        self.redirect_root()
+        path = urllib.parse.urlsplit(self.path).path
+        if path == '/metrics':
+            return self.serve_metrics()
+        if self.video_proxy and path.startswith('/video/'):
+            return self.serve_proxied_video()
+        if self.story_store and path.startswith('/api/'):
+            return self.serve_api()
+        if path.endswith('.mp4'):
+            return self.serve_local_video()
+        if os.path.splitext(path)[1] in HLS_CONTENT_TYPES:
+            return self.serve_hls()
         return super().do_GET()
 
+    def serve_metrics(self):
+        body = METRICS.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.write_body(body)
+
+    def send_json(self, data, status: int = 200):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.write_body(body)
+
+    def serve_api(self):
+        try:
+            self.route_api()
+        finally:
+            # ThreadingServer runs each request on a new thread; hand its store
+            # connection to the next one
+            self.story_store.release()
+
+    def store_call(self, operation: str, call: Callable, *args, **kwargs):
+        """Call a story store method, recording its time (and stories returned) under operation"""
+        start = time.perf_counter()
+        try:
+            result = call(*args, **kwargs)
+        finally:
+            STORE_LATENCY.observe(time.perf_counter() - start, operation=operation)
+        if isinstance(result, list):
+            API_RESULTS.inc(len(result), operation=operation)
+        elif isinstance(result, dict):
+            API_RESULTS.inc(operation=operation)
+        return result
+
+    def route_api(self):
+        url = urllib.parse.urlsplit(self.path)
+        path = url.path.rstrip('/')
+        if path == '/api/stories':
+            try:
+                args = api_query(url.query)
+            except ValueError as e:
+                self.send_json({'error': str(e)}, 400)
+                return
+            limit, offset = args.pop('limit'), args.pop('offset')
+            self.send_json({
+                'total': self.store_call('count', self.story_store.count, **args),
+                'limit': limit,
+                'offset': offset,
+                'stories': self.store_call('query', self.story_store.query, limit=limit, offset=offset, **args),
+            })
+        elif path.startswith('/api/stories/'):
+            story = self.store_call('get', self.story_store.get, urllib.parse.unquote(path[len('/api/stories/'):]))
+            if story is None:
+                self.send_json({'error': 'Story not found'}, 404)
+                return
+            self.send_json(story)
+        elif path == '/api/demo-stories':
+            self.send_json(self.store_call('demo_stories', self.story_store.demo_stories))
+        elif path == '/api/search':
+            params = urllib.parse.parse_qs(url.query)
+            text = params.get('q', [''])[-1]
+            try:
+                limit = max(1, min(int(params.get('limit', [SEARCH_DEFAULT_LIMIT])[-1]), API_MAX_LIMIT))
+            except ValueError:
+                self.send_json({'error': 'limit must be a number'}, 400)
+                return
+            if not text.strip():
+                self.send_json({'error': 'Missing q'}, 400)
+                return
+            start = time.perf_counter()
+            results = self.store_call('search', self.story_store.search, text, limit=limit,
+                                      stage=params.get('stage', [None])[-1])
+            self.send_json({'query': text, 'took_ms': round((time.perf_counter() - start) * 1000, 2),
+                            'results': results})
+        else:
+            self.send_json({'error': 'Not found'}, 404)
+
+    def serve_proxied_video(self):
+        target = self.video_proxy.resolve(self.path)
+        if target is None:
+            self.send_error(404, "Unknown stage or empty key")
+            return
+        bucket, key, region = target
+        try:
+            f = self.video_proxy.open(bucket, key, region)
+        except Exception as e:
+            error_code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if error_code in ('NoSuchKey', '404'):
+                self.send_error(404, "Video not found in S3")
+                return
+            print(f"   ⚠️  Failed to fetch s3://{bucket}/{key}: {e}")
+            self.send_error(502, "Failed to fetch video from S3")
+            return
+        with f:
+            self.send_file_range(f, mimetypes.guess_type(key)[0] or 'video/mp4')
+
+    def serve_local_video(self):
+        # SimpleHTTPRequestHandler ignores Range, which breaks seeking in <video>
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404, "File not found")
+            return
+        with open(path, 'rb') as f:
+            self.send_file_range(f, 'video/mp4')
+
+    def serve_hls(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404, "File not found")
+            return
+        extension = os.path.splitext(path)[1]
+        with open(path, 'rb') as f:
+            if extension != '.m3u8':
+                self.send_file_range(f, HLS_CONTENT_TYPES[extension],
+                                     {'Cache-Control': HLS_SEGMENT_CACHE_CONTROL})
+                return
+            stat = os.fstat(f.fileno())
+            etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+            headers = {'Cache-Control': HLS_PLAYLIST_CACHE_CONTROL, 'ETag': etag}
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                for keyword, value in headers.items():
+                    self.send_header(keyword, value)
+                self.end_headers()
+                return
+            self.send_file_range(f, HLS_CONTENT_TYPES[extension], headers)
+
+    def send_file_range(self, f, content_type: str, headers=None):
+        """
+        Send an open file, honoring a single-range Range header
+
+        f is a plain file or a video_cache.CachedObject, which may still be
+        filling: each chunk is sent once the cache has written it.
+        """
+        cached = isinstance(f, CachedObject)
+        size = f.size if cached else os.fstat(f.fileno()).st_size
+        start, end = 0, size - 1
+        status = 200
+
+        range_header = self.headers.get('Range')
+        if range_header and size > 0:
+            byte_range = parse_range_header(range_header, size)
+            if byte_range is None:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start, end = byte_range
+            status = 206
+
+        length = end - start + 1 if size > 0 else 0
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        for keyword, value in (headers or {}).items():
+            self.send_header(keyword, value)
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.end_headers()
+
+        if length and self.command != 'HEAD':
+            source = f.file if cached else f
+            offset, stop = start, end + 1
+            try:
+                while offset < stop:
+                    chunk_end = min(offset + SEND_CHUNK_BYTES, stop)
+                    if cached:
+                        chunk_end = min(chunk_end, f.readable(chunk_end))
+                    # Zero-copy from the page cache straight to the socket
+                    sent = self.connection.sendfile(source, offset, chunk_end - offset)
+                    if not sent:
+                        break
+                    offset += sent
+                    self._body_bytes += sent
+            except (BrokenPipeError, ConnectionResetError):
+                # Browsers routinely abort video requests while seeking
+                pass
+            except FillError as e:
+                # Headers are out; cutting the response short is all that's left
+                print(f"   ⚠️  {e}")
+                self.close_connection = True
+
+
+class ThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
 def main():
+    parser = argparse.ArgumentParser(
+        description='Serve the video stories HTML report',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 serve.py
+  python3 serve.py --port 8080 --threaded
+  python3 serve.py --proxy --cache-size-mb 20480
+  python3 serve.py --proxy --s3-endpoint-url http://127.0.0.1:9000  # local S3 stand-in
+  python3 serve.py --html demo-assets/index.html  # demo gallery (with HLS if packaged)
+  python3 serve.py --threaded --db stories.db      # plus /api/stories from the story store
+        """
+    )
+    parser.add_argument('--port', type=int, default=PORT, help=f'Port to listen on (default: {PORT})')
+    parser.add_argument('--html', default=HTML_FILE, help=f'HTML file served at / (default: {HTML_FILE})')
+    parser.add_argument('--threaded', action='store_true',
+                        help='Handle requests concurrently (implied by --proxy)')
+    parser.add_argument('--proxy', action='store_true',
+                        help='Serve /video/<stage>/<key> from S3 through a local disk cache')
+    parser.add_argument('--cache-dir', default='.video-cache',
+                        help='Video proxy cache directory (default: .video-cache)')
+    parser.add_argument('--cache-size-mb', type=int, default=5120,
+                        help='Video proxy cache size limit in MB (default: 5120)')
+    parser.add_argument('--config', default='resources.json',
+                        help='Path to resources configuration file (default: resources.json)')
+    parser.add_argument('--s3-endpoint-url',
+                        help='Override the S3 endpoint, e.g. a local S3 stand-in (see local_aws.py)')
+    parser.add_argument('--db', help='Serve /api/stories from this story database (see story_store.py)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
     # Check if HTML file exists
-    if not Path(HTML_FILE).exists():
-        print(f"❌ Error: {HTML_FILE} not found!")
+    if not Path(args.html).exists():
+        print(f"❌ Error: {args.html} not found!")
         print(f"   Run: python3 generate_presigned_urls.py")
         return 1
-    
-    Handler = CustomHandler
-    
-    with socketserver.TCPServer(("", PORT), Handler) as httpd:
+
+    Handler = type('Handler', (CustomHandler,), {'html_file': args.html})
+
+    if args.proxy:
+        try:
+            with open(args.config, 'r') as f:
+                config = json.load(f)
+        except FileNotFoundError:
+            print(f"❌ Configuration file not found: {args.config}")
+            return 1
+        cache = VideoCache(args.cache_dir, args.cache_size_mb * 1024 * 1024)
+        Handler.video_proxy = VideoProxy(config, cache, args.s3_endpoint_url)
+        register_video_cache_metrics(cache)
+
+    if args.db:
+        if not Path(args.db).exists():
+            print(f"❌ Story database not found: {args.db}")
+            print(f"   Run: python3 scrape_video_stories.py")
+            return 1
+        Handler.story_store = StoryStore(args.db)
+        register_story_store_metrics(Handler.story_store)
+
+    server_class = ThreadingServer if (args.threaded or args.proxy) else socketserver.TCPServer
+
+    with server_class(("", args.port), Handler) as httpd:
         print("🌐 GuardianGamer Video Stories Server")
         print("=" * 50)
-        print(f"📺 Open in your browser: http://localhost:{PORT}")
+        print(f"📺 Open in your browser: http://localhost:{args.port}")
+        if args.proxy:
+            print(f"📦 Video proxy: /video/<stage>/<key> (cache: {args.cache_dir}, {args.cache_size_mb} MB)")
+        if args.db:
+            print(f"📚 Story API: http://localhost:{args.port}/api/stories ({args.db})")
+        print(f"📈 Metrics: http://localhost:{args.port}/metrics")
         print("=" * 50)
         print("\nPress Ctrl+C to stop the server\n")
-        
+
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
@@ -40,5 +561,4 @@ def main():
             return 0
 
 if __name__ == "__main__":
-    exit(main())
-
+    exit(run_main(main))
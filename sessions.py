@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Group video stories into play sessions.
+
+Each story covers an interval: its game/session start and end when known,
+otherwise the instant it was recorded. Sessions are built with a single
+sort-and-sweep: every timestamp is parsed once (memoized, since stories of
+a session share start/end strings), intervals are sorted by start, and a
+story joins the current session when it starts no later than the session's
+end plus the allowed gap. The result doesn't depend on input order.
+Timestamps without a UTC offset are taken as UTC.
+Run time is dominated by parsing distinct timestamps; a few hundred
+thousand stories take a couple of seconds.
+
+Stories can be partitioned first (e.g. by stage and gamer) so the full
+multi-stage dataset is sessionized in one call:
+
+    python3 sessions.py --input all_video_stories.jsonl --gap-minutes 10
+"""
+
+import argparse
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from story_io import load_stories
+
+DEFAULT_GAP_SECONDS = 600
+
+
+_INTERVAL_KEYS = (('_session_start', '_session_end'), ('_game_start', '_game_end'),
+                  ('game_start', 'game_end'), ('start', 'end'))
+
+
+def story_time(story: Dict[str, Any]) -> str:
+    """When a story was recorded, from production or scraped fields"""
+    return (story.get('_timestamp') or story.get('_created') or story.get('timestamp')
+            or story.get('start', ''))
+
+
+def _story_times(story: Dict[str, Any]) -> Tuple[str, str, str]:
+    # (start, end, recorded) with as few dict lookups as possible; at this
+    # scale they dominate the run time
+    recorded = story_time(story)
+    for start_key, end_key in _INTERVAL_KEYS:
+        start = story.get(start_key)
+        if start:
+            end = story.get(end_key)
+            if end:
+                return start, end, recorded
+    return recorded, recorded, recorded
+
+
+def story_interval(story: Dict[str, Any]) -> Tuple[str, str]:
+    """(start, end) timestamps of a story: its session/game when known, else when it was recorded"""
+    return _story_times(story)[:2]
+
+
+def story_partition(story: Dict[str, Any]) -> Tuple[str, str]:
+    """Default partition for multi-stage datasets: sessions never span stages or gamers"""
+    gamer = story.get('_gamer') or story.get('GSI1PK') or story.get('_gamer_extracted', '')
+    return story.get('_stage', ''), gamer
+
+
+# Cached for timestamps that don't parse, so each is only tried once
+_UNPARSEABLE = object()
+
+
+def _parse_timestamp(value: str) -> Any:
+    """ISO 8601 -> epoch seconds (UTC when no offset is given), or _UNPARSEABLE"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            # Python < 3.11 doesn't accept a 'Z' suffix
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return _UNPARSEABLE
+    except TypeError:
+        return _UNPARSEABLE
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def sessionize(stories: List[Dict[str, Any]], gap_seconds: float = DEFAULT_GAP_SECONDS,
+               partition: Optional[Callable[[Dict[str, Any]], Hashable]] = None,
+               interval: Callable[[Dict[str, Any]], Tuple[str, str]] = story_interval) -> List[Dict[str, Any]]:
+    """
+    Group stories into sessions of overlapping or nearby intervals
+
+    Args:
+        stories: Video stories
+        gap_seconds: Largest gap between a session's end and the next story's start
+        partition: Optional key function; stories with different keys never share
+            a session (e.g. story_partition for a multi-stage dataset)
+        interval: Returns a story's (start, end) timestamps
+
+    Returns:
+        list: Sessions {'key', 'start', 'end', 'stories'} ordered by partition
+        key then start. Within a session, stories are ordered by start, then by
+        recording time. Stories without a parseable timestamp each get a
+        session of their own at the end.
+    """
+    # Epoch seconds (or _UNPARSEABLE) of each distinct timestamp; most repeat
+    parsed: Dict[str, Any] = {}
+    partitions = defaultdict(list)
+    undated = []
+
+    for idx, story in enumerate(stories):
+        if interval is story_interval:
+            start, end, recorded = _story_times(story)
+        else:
+            (start, end), recorded = interval(story), story_time(story)
+        start_ts = parsed.get(start)
+        if start_ts is None:
+            start_ts = parsed[start] = _parse_timestamp(start)
+        if end == start:
+            end_ts = start_ts
+        else:
+            end_ts = parsed.get(end)
+            if end_ts is None:
+                end_ts = parsed[end] = _parse_timestamp(end)
+        if start_ts is _UNPARSEABLE or end_ts is _UNPARSEABLE:
+            undated.append({'key': partition(story) if partition else None,
+                            'start': start, 'end': end, 'stories': [story]})
+            continue
+        if end_ts < start_ts:
+            start, end, start_ts, end_ts = end, start, end_ts, start_ts
+        key = partition(story) if partition else None
+        # idx breaks ties and finds the story again; tuples of plain values
+        # are untracked by the garbage collector, so they don't slow it down
+        partitions[key].append((start_ts, end_ts, recorded, idx, start, end))
+
+    sessions = []
+    for key in sorted(partitions, key=repr):
+        items = partitions[key]
+        items.sort()
+
+        current = None
+        current_end_ts = 0.0
+        for start_ts, end_ts, _, idx, start, end in items:
+            story = stories[idx]
+            if current is not None and start_ts <= current_end_ts + gap_seconds:
+                current['stories'].append(story)
+                if end_ts > current_end_ts:
+                    current_end_ts = end_ts
+                    current['end'] = end
+                continue
+            current = {'key': key, 'start': start, 'end': end, 'stories': [story]}
+            current_end_ts = end_ts
+            sessions.append(current)
+
+    return sessions + undated
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Group video stories into sessions',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 sessions.py --input all_video_stories.jsonl
+  python3 sessions.py --input all_video_stories.jsonl.gz --gap-minutes 30 --output sessions.json
+        """
+    )
+    parser.add_argument('--input', '-i', default='all_video_stories.jsonl',
+                        help='Video stories dataset, .jsonl[.gz|.zst] or legacy .json '
+                             '(default: all_video_stories.jsonl)')
+    parser.add_argument('--gap-minutes', type=float, default=DEFAULT_GAP_SECONDS / 60,
+                        help=f'Largest gap within a session (default: {DEFAULT_GAP_SECONDS // 60})')
+    parser.add_argument('--output', '-o',
+                        help='Write sessions (stage, gamer, start, end, story count) to a JSON file')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        with phase('load'):
+            stories = load_stories(args.input)
+    except FileNotFoundError:
+        print(f"❌ File not found: {args.input}")
+        return 1
+    except ValueError as e:
+        print(f"❌ Invalid dataset: {e}")
+        return 1
+
+    start = time.perf_counter()
+    with phase('sessionize'):
+        sessions = sessionize(stories, args.gap_minutes * 60, partition=story_partition)
+    elapsed = time.perf_counter() - start
+
+    print(f"✅ {len(stories)} stories → {len(sessions)} sessions in {elapsed:.2f}s")
+    sizes = sorted(len(session['stories']) for session in sessions)
+    if sizes:
+        print(f"   Stories per session: median {sizes[len(sizes) // 2]}, max {sizes[-1]}")
+
+    if args.output:
+        summary = [{
+            'stage': session['key'][0] if session['key'] else '',
+            'gamer': session['key'][1] if session['key'] else '',
+            'start': session['start'],
+            'end': session['end'],
+            'stories': len(session['stories']),
+        } for session in sessions]
+        with phase('write'), open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"💾 Saved to: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
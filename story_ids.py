@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Story IDs and the story ID index.
+
+A story ID identifies a video story across the tools (favorites exported
+from the HTML report, demo_stories.json, production sessions):
+
+    <stage>_<gamer>_<timestamp>   with '#', ':' and '.' replaced by '_'
+    e.g. dev_G_1234abcd-..._2025-11-24T18_03_11_123Z
+
+Uncompressed datasets are written with <dataset>.idx.json (see
+story_io.StoryWriter), mapping each story ID to the byte offset and length
+of that story in the dataset. StoryIndex uses it to read individual stories
+with a seek, without parsing the whole dataset.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+INDEX_VERSION = 1
+
+
+def make_story_id(stage: str, gamer: str, timestamp: str) -> str:
+    """Story ID from its parts"""
+    return f"{stage}_{gamer}_{timestamp}".replace('#', '_').replace(':', '_').replace('.', '_')
+
+
+def parse_story_id(sid: str, stages: Iterable[str]) -> Optional[Dict[str, str]]:
+    """
+    Recover what a story ID still says about its story
+
+    The formula is lossy (':' and '.' in the timestamp become '_'), but the
+    stage, gamer and date survive, which is enough to find the story again
+    with a GSI1 query (GSI1PK = gamer, GSI1SK begins with V#<date>).
+
+    Args:
+        sid: Story ID
+        stages: Known stage names (they may contain '-' but not '_')
+
+    Returns:
+        dict: {'stage', 'gamer', 'date'}, or None if the ID doesn't parse
+    """
+    for stage in sorted(stages, key=len, reverse=True):
+        if not sid.startswith(f"{stage}_"):
+            continue
+        parts = sid[len(stage) + 1:].split('_', 2)
+        if len(parts) == 3 and len(parts[2]) >= 10:
+            # Gamer IDs are "G#<uuid>"; uuids contain no '_'
+            return {'stage': stage, 'gamer': f"{parts[0]}#{parts[1]}", 'date': parts[2][:10]}
+    return None
+
+
+def story_id(story: Dict[str, Any]) -> str:
+    """Story ID of an enriched video story"""
+    return make_story_id(
+        story.get('_stage', 'unknown'),
+        story.get('_gamer_extracted', 'N/A'),
+        story.get('_created', story.get('timestamp', 'N/A')),
+    )
+
+
+def index_path(data_file: str) -> str:
+    return f"{data_file}.idx.json"
+
+
+class StoryIndex:
+    """
+    Random access to a dataset's stories by story ID
+
+    Use StoryIndex.load(), which returns None when the dataset has no index
+    or was modified after the index was written.
+    """
+
+    def __init__(self, data_file: str, ids: Dict[str, List[int]]):
+        self.data_file = data_file
+        self.ids = ids
+
+    @classmethod
+    def load(cls, data_file: str) -> Optional['StoryIndex']:
+        try:
+            with open(index_path(data_file), 'r') as f:
+                index = json.load(f)
+            stat = os.stat(data_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if (index.get('version') != INDEX_VERSION or index.get('data_size') != stat.st_size
+                or index.get('data_mtime_ns') != stat.st_mtime_ns):
+            return None
+        return cls(data_file, index['ids'])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, sid: str) -> bool:
+        return sid in self.ids
+
+    def get_many(self, story_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Stories for the IDs that exist, in dataset order (like a scan would find them)"""
+        wanted = sorted({sid for sid in story_ids if sid in self.ids}, key=lambda sid: self.ids[sid][0])
+        stories = []
+        with open(self.data_file, 'rb') as f:
+            for sid in wanted:
+                offset, length = self.ids[sid]
+                f.seek(offset)
+                stories.append(json.loads(f.read(length)))
+        return stories
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        stories = self.get_many([sid])
+        return stories[0] if stories else None
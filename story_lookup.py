@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Fetch specific video stories from DynamoDB by story ID.
+
+Resolving ~50 favorites shouldn't need a full scrape of every stage. Each
+story ID is mapped back to its stage, gamer and day (see story_ids.py), and:
+
+1. One paginated GSI1 query per (stage, gamer, day) finds the matching
+   video story keys (GSI1PK = gamer, GSI1SK begins with V#<day>)
+2. BatchGetItem fetches the full items by (PK, SK), 100 keys per request,
+   retrying UnprocessedKeys with exponential backoff
+
+Queries and batches run in parallel across a thread pool with shared
+clients (aws_clients.py). Items are enriched exactly like the scraper's, so
+they can be used wherever stories from all_video_stories*.json are.
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer
+
+from aws_clients import get_client
+from scrape_video_stories import enrich_story, enrich_video_stories
+from story_ids import parse_story_id, story_id as compute_story_id
+
+DEFAULT_WORKERS = 8
+BATCH_GET_LIMIT = 100  # DynamoDB's maximum keys per BatchGetItem
+MAX_RETRIES = 8
+
+_deserializer = TypeDeserializer()
+
+
+def _deserialize(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: _deserializer.deserialize(value) for key, value in item.items()}
+
+
+def _backoff(attempt: int, base: float = 0.05, cap: float = 2.0):
+    # Full jitter, so parallel workers don't retry in lockstep
+    time.sleep(random.uniform(0, min(cap, base * 2 ** attempt)))
+
+
+def query_gamer_day(client, table: str, gamer: str, date: str) -> List[Dict[str, Any]]:
+    """All GSI1 items of a gamer's video stories on one day (all pages)"""
+    kwargs = {
+        'TableName': table,
+        'IndexName': 'GSI1',
+        'KeyConditionExpression': 'GSI1PK = :gamer AND begins_with(GSI1SK, :day)',
+        'ExpressionAttributeValues': {':gamer': {'S': gamer}, ':day': {'S': f"V#{date}"}},
+    }
+    items = []
+    while True:
+        response = client.query(**kwargs)
+        items.extend(_deserialize(item) for item in response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def batch_get_items(client, table: str, keys: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Get items by (PK, SK) with BatchGetItem, retrying unprocessed keys
+
+    Raises:
+        RuntimeError: If keys are still unprocessed after MAX_RETRIES attempts
+    """
+    items = []
+    for start in range(0, len(keys), BATCH_GET_LIMIT):
+        pending = {table: {'Keys': [{'PK': {'S': key['PK']}, 'SK': {'S': key['SK']}}
+                                    for key in keys[start:start + BATCH_GET_LIMIT]]}}
+        attempt = 0
+        while pending:
+            response = client.batch_get_item(RequestItems=pending)
+            items.extend(_deserialize(item) for item in response.get('Responses', {}).get(table, []))
+            pending = response.get('UnprocessedKeys') or {}
+            if pending:
+                if attempt >= MAX_RETRIES:
+                    raise RuntimeError(f"{len(pending[table]['Keys'])} keys still unprocessed in {table}")
+                _backoff(attempt)
+                attempt += 1
+    return items
+
+
+def fetch_stories_by_ids(story_ids: List[str], config: Dict[str, Any], workers: int = DEFAULT_WORKERS,
+                         endpoint_url: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch and enrich the video stories for a list of story IDs
+
+    Args:
+        story_ids: Story IDs (e.g. exported favorites)
+        config: resources.json contents
+        workers: Concurrent DynamoDB requests
+        endpoint_url: Optional DynamoDB endpoint override (e.g. a local stand-in)
+
+    Returns:
+        list: Enriched stories with '_computed_story_id', one per found ID,
+        in the order of story_ids. IDs that weren't found are left out, for
+        the caller to look up elsewhere (e.g. the story store).
+    """
+    stages = config['stages']
+    wanted = {}
+    groups = {}
+    for sid in dict.fromkeys(story_ids):
+        parsed = parse_story_id(sid, stages)
+        if parsed is None:
+            print(f"   ⚠️  Cannot parse story ID: {sid}")
+            continue
+        wanted[sid] = parsed
+        groups.setdefault((parsed['stage'], parsed['gamer'], parsed['date']), []).append(sid)
+
+    def client_for(stage):
+        return get_client('dynamodb', stages[stage]['region'], endpoint_url=endpoint_url)
+
+    def query(group: Tuple[str, str, str]):
+        stage, gamer, date = group
+        try:
+            return group, query_gamer_day(client_for(stage), stages[stage]['dynamodb_table'], gamer, date)
+        except Exception as e:
+            print(f"   ⚠️  {stage}: GSI1 query for {gamer} on {date} failed: {e}")
+            return group, []
+
+    print(f"   🔎 {len(wanted)} IDs → {len(groups)} GSI1 queries")
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        query_results = list(executor.map(query, groups))
+
+    # Match query results back to IDs; the same video exists once per parent (PK),
+    # so keep the lowest PK for a deterministic pick
+    keys_by_id = {}
+    for (stage, _, _), items in query_results:
+        for item in items:
+            # The ID as the scraper computes it: gamer from the SK, _created from timestamp/created_at
+            sid = compute_story_id(enrich_story(dict(item, _stage=stage)))
+            if sid in wanted and (sid not in keys_by_id or item['PK'] < keys_by_id[sid]['PK']):
+                keys_by_id[sid] = {'PK': item['PK'], 'SK': item['SK']}
+
+    # Full items with BatchGetItem (GSI1 may not project every attribute)
+    batches = []
+    for stage in stages:
+        keys = [key for sid, key in keys_by_id.items() if wanted[sid]['stage'] == stage]
+        for start in range(0, len(keys), BATCH_GET_LIMIT):
+            batches.append((stage, keys[start:start + BATCH_GET_LIMIT]))
+
+    def get_batch(batch):
+        stage, keys = batch
+        try:
+            items = batch_get_items(client_for(stage), stages[stage]['dynamodb_table'], keys)
+        except Exception as e:
+            print(f"   ⚠️  {stage}: BatchGetItem failed: {e}")
+            return []
+        for item in items:
+            item['_stage'] = stage
+            item['_region'] = stages[stage]['region']
+            item['_table'] = stages[stage]['dynamodb_table']
+        return items
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        items = [item for batch_items in executor.map(get_batch, batches) for item in batch_items]
+
+    by_id = {}
+    for story in enrich_video_stories(items):
+        story['_computed_story_id'] = compute_story_id(story)
+        by_id.setdefault(story['_computed_story_id'], story)
+
+    missing = [sid for sid in wanted if sid not in by_id]
+    if missing:
+        print(f"   ⚠️  {len(missing)} IDs not found in DynamoDB")
+    return [by_id[sid] for sid in wanted if sid in by_id]
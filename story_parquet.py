@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Columnar Parquet exports of video stories, for analytics.
+
+Stories are written as a Parquet dataset with a typed schema, partitioned
+by stage and month (hive layout, so any Parquet reader understands it):
+
+    stories.parquet/stage=dev/month=2025-11/part-0.parquet
+
+Timestamps are real UTC timestamps, participants a list of strings, and
+viewed/available booleans. Queries read only the columns they name, and
+stage/month filters skip whole directories:
+
+    python3 story_parquet.py --input all_video_stories_presigned.jsonl --output stories.parquet
+    python3 story_parquet.py --summary stories.parquet --stage prod
+
+Needs pyarrow (pip install pyarrow); the scripts that write Parquet only
+import it when asked to.
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from story_ids import story_id
+from story_io import iter_stories
+from story_store import story_availability, presign_expiry
+
+DEFAULT_PARQUET_DIR = 'stories.parquet'
+PARQUET_BATCH_SIZE = 50000
+PARTITION_COLUMNS = ('stage', 'month')
+UNKNOWN_MONTH = 'unknown'
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+    except ImportError:
+        raise RuntimeError("Parquet exports need the pyarrow package: pip install pyarrow")
+    return pyarrow
+
+
+def parquet_schema():
+    """Schema of the story dataset; stage and month are the partition columns"""
+    pa = _pyarrow()
+    timestamp = pa.timestamp('ms', tz='UTC')
+    return pa.schema([
+        ('story_id', pa.string()),
+        ('stage', pa.string()),
+        ('month', pa.string()),
+        ('region', pa.string()),
+        ('pk', pa.string()),
+        ('sk', pa.string()),
+        ('gamer', pa.string()),
+        ('group', pa.string()),
+        ('timestamp', timestamp),
+        ('game_start', timestamp),
+        ('game_end', timestamp),
+        ('gameserver', pa.string()),
+        ('participants', pa.list_(pa.string())),
+        ('viewed', pa.bool_()),
+        ('description', pa.string()),
+        ('video_url', pa.string()),
+        ('thumbnail_url', pa.string()),
+        ('available', pa.bool_()),
+        ('presigned_error', pa.string()),
+        ('presign_expires', timestamp),
+    ])
+
+
+@lru_cache(maxsize=65536)
+def parse_timestamp_ms(value: str) -> Optional[int]:
+    """ISO 8601 -> epoch milliseconds (UTC when no offset is given), None if unparseable"""
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (ValueError, AttributeError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() * 1000)
+
+
+def _text(value) -> Optional[str]:
+    if value is None or value == 'N/A':
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def _participants(story: Dict[str, Any]) -> List[str]:
+    participants = story.get('_participants')
+    if participants is None:
+        try:
+            participants = json.loads(story.get('participants') or '[]')
+        except (TypeError, ValueError):
+            participants = []
+    if not isinstance(participants, list):
+        return []
+    return [str(participant) for participant in participants]
+
+
+def story_columns(story: Dict[str, Any]) -> tuple:
+    """Column values for a story, in parquet_schema() order"""
+    created = story.get('_created') or story.get('timestamp') or story.get('_timestamp_extracted')
+    created_ms = parse_timestamp_ms(created) if isinstance(created, str) else None
+    if created_ms is None:
+        month = UNKNOWN_MONTH
+    else:
+        month = datetime.fromtimestamp(created_ms / 1000, timezone.utc).strftime('%Y-%m')
+    game_start = story.get('_game_start') or story.get('game_start')
+    game_end = story.get('_game_end') or story.get('game_end')
+    viewed = story.get('_viewed')
+    available = story_availability(story)
+    expires = presign_expiry(story.get('_presigned_url'))
+    return (
+        story_id(story),
+        story.get('_stage') or 'unknown',
+        month,
+        _text(story.get('_region')),
+        _text(story.get('PK')),
+        _text(story.get('SK')),
+        _text(story.get('_gamer_extracted') or story.get('GSI1PK') or story.get('_gamer')),
+        _text(story.get('_group') or story.get('group')),
+        created_ms,
+        parse_timestamp_ms(game_start) if isinstance(game_start, str) else None,
+        parse_timestamp_ms(game_end) if isinstance(game_end, str) else None,
+        _text(story.get('_gameserver') or story.get('gameserver_id')),
+        _participants(story),
+        viewed if viewed is not None else story.get('viewed') == 'True',
+        _text(story.get('_description') or story.get('description')),
+        _text(story.get('_video_url') or story.get('video_url')),
+        _text(story.get('thumbnail_url')),
+        None if available is None else bool(available),
+        _text(story.get('_presigned_error')),
+        expires * 1000 if expires is not None else None,
+    )
+
+
+def _record_batches(stories: Iterable[Dict[str, Any]], schema, batch_size: int, counter: List[int]):
+    pa = _pyarrow()
+    rows = []
+    for story in stories:
+        rows.append(story_columns(story))
+        if len(rows) >= batch_size:
+            counter[0] += len(rows)
+            yield pa.RecordBatch.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)], schema=schema)
+            rows = []
+    if rows:
+        counter[0] += len(rows)
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(zip(*rows), schema)], schema=schema)
+
+
+def write_parquet(stories: Iterable[Dict[str, Any]], output_dir: str = DEFAULT_PARQUET_DIR,
+                  batch_size: int = PARQUET_BATCH_SIZE) -> int:
+    """
+    Write stories to a Parquet dataset partitioned by stage and month
+
+    Stories are converted in batches as they arrive, so a stream (e.g.
+    story_io.iter_stories) is never held in memory at once. Partitions that
+    receive stories are replaced; other partitions already in output_dir are
+    kept, so exporting a single stage leaves the others alone.
+
+    Returns:
+        int: Number of stories written
+    """
+    pa = _pyarrow()
+    schema = parquet_schema()
+    counter = [0]
+    partitioning = pa.dataset.partitioning(
+        pa.schema([schema.field(name) for name in PARTITION_COLUMNS]), flavor='hive')
+    pa.dataset.write_dataset(
+        _record_batches(stories, schema, batch_size, counter), output_dir,
+        schema=schema, format='parquet', partitioning=partitioning,
+        basename_template='part-{i}.parquet', existing_data_behavior='delete_matching')
+    return counter[0]
+
+
+def read_parquet(path: str = DEFAULT_PARQUET_DIR, columns: Optional[List[str]] = None,
+                 stage: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+    """
+    Read a pyarrow Table of the given columns (default: all)
+
+    stage and since/until months ('YYYY-MM', inclusive) prune partitions,
+    so only the matching files are opened.
+    """
+    pa = _pyarrow()
+    dataset = pa.dataset.dataset(path, format='parquet', partitioning='hive')
+    conditions = []
+    if stage:
+        conditions.append(pa.dataset.field('stage') == stage)
+    if since:
+        conditions.append(pa.dataset.field('month') >= since)
+    if until:
+        conditions.append(pa.dataset.field('month') <= until)
+    condition = None
+    for expression in conditions:
+        condition = expression if condition is None else condition & expression
+    return dataset.to_table(columns=columns, filter=condition)
+
+
+def stories_per_gamer_per_day(path: str = DEFAULT_PARQUET_DIR, **filters):
+    """Table of (gamer, day, stories), reading only the gamer and timestamp columns"""
+    pa = _pyarrow()
+    table = read_parquet(path, ['gamer', 'timestamp'], **filters)
+    table = table.append_column('day', pa.compute.cast(table['timestamp'], pa.date32()))
+    return table.group_by(['gamer', 'day']).aggregate([('timestamp', 'count')]) \
+        .rename_columns(['gamer', 'day', 'stories']).sort_by([('gamer', 'ascending'), ('day', 'ascending')])
+
+
+def missing_video_rates(path: str = DEFAULT_PARQUET_DIR, **filters):
+    """Table of (stage, presigned, missing, missing_rate), reading only the available column"""
+    pa = _pyarrow()
+    table = read_parquet(path, ['stage', 'available'], **filters)
+    table = table.append_column('missing', pa.compute.invert(table['available']))
+    counts = table.group_by('stage').aggregate([('available', 'count'), ('missing', 'sum')])
+    presigned = counts['available_count']
+    missing = pa.compute.coalesce(counts['missing_sum'], 0)
+    rate = pa.compute.divide(pa.compute.cast(missing, pa.float64()),
+                             pa.compute.max_element_wise(pa.compute.cast(presigned, pa.float64()), 1.0))
+    return pa.table({'stage': counts['stage'], 'presigned': presigned, 'missing': missing,
+                     'missing_rate': rate}).sort_by('stage')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Export video stories to Parquet and run quick analytics on the export',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 story_parquet.py --input all_video_stories_presigned.jsonl
+  python3 story_parquet.py --input all_video_stories.jsonl.gz --output /data/stories.parquet
+  python3 story_parquet.py --summary stories.parquet
+  python3 story_parquet.py --summary stories.parquet --stage prod --since 2025-10
+
+Scrape and presign straight to Parquet with --parquet:
+  python3 scrape_video_stories.py --parquet stories.parquet
+  python3 generate_presigned_urls.py --parquet stories.parquet
+        """
+    )
+    parser.add_argument('--input', '-i', help='Dataset to export (.jsonl[.gz|.zst] or legacy .json)')
+    parser.add_argument('--output', '-o', default=DEFAULT_PARQUET_DIR,
+                        help=f'Parquet dataset directory (default: {DEFAULT_PARQUET_DIR})')
+    parser.add_argument('--summary', metavar='PARQUET_DIR',
+                        help='Print stories per gamer per day and missing-video rates per stage')
+    parser.add_argument('--stage', help='Only summarize this stage')
+    parser.add_argument('--since', help='Only summarize from this month on (YYYY-MM)')
+    parser.add_argument('--until', help='Only summarize up to this month (YYYY-MM)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.input and not args.summary:
+        parser.error('give --input to export and/or --summary to analyze')
+
+    try:
+        if args.input:
+            start = time.perf_counter()
+            try:
+                with phase('export'):
+                    count = write_parquet(iter_stories(args.input), args.output)
+            except FileNotFoundError:
+                print(f"❌ File not found: {args.input}")
+                return 1
+            print(f"💾 Exported {count} stories to: {args.output} in {time.perf_counter() - start:.1f}s")
+
+        if args.summary:
+            filters = {'stage': args.stage, 'since': args.since, 'until': args.until}
+            with phase('summary/per_gamer_day'):
+                per_day = stories_per_gamer_per_day(args.summary, **filters)
+            print(f"\n📊 Stories per gamer per day ({per_day.num_rows} gamer-days):")
+            for row in per_day.slice(0, 20).to_pylist():
+                print(f"   {row['gamer']}  {row['day']}  {row['stories']}")
+            if per_day.num_rows > 20:
+                print(f"   ... {per_day.num_rows - 20} more")
+
+            print(f"\n📊 Missing videos per stage:")
+            with phase('summary/missing_videos'):
+                missing = missing_video_rates(args.summary, **filters)
+            for row in missing.to_pylist():
+                print(f"   {row['stage']}: {row['missing']}/{row['presigned']} missing "
+                      f"({row['missing_rate'] * 100:.1f}%)")
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
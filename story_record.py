@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory video stories.
+
+A scanned story used to be a dict of its DynamoDB attributes plus a dozen
+enriched copies of them (_description, _video_url, _participants, ...), at
+a few KB per story. StoryRecord keeps only:
+
+- the raw attributes, as a tuple of values plus a key layout shared by all
+  stories with the same attributes
+- stage, region and table, interned, as are the attributes with few
+  distinct values (parent, gamer, group, ...)
+- fields set later (e.g. _presigned_url), in a dict created on first use
+
+Enriched fields are computed when they are read, with the same values
+scrape_video_stories.enrich_story() stores. A record reads like the legacy
+dict (get, [], in, items) and is converted to one only where stories leave
+the process (story_dict(), used by StoryWriter and the story store):
+
+    story = StoryRecord.from_item(item, 'dev', 'us-east-1', 'GGEventsTable-dev')
+    story.get('_gamer_extracted')       # computed from SK
+    story['_presigned_url'] = url       # stored
+    json.dumps(story_dict(story))       # legacy shape, same key order
+
+Exports keep the enriched fields, duplicates and all (about 40% of a
+dataset's bytes, compressed or not): they are the format every reader of
+datasets and the story store relies on. Story IDs and favorites are
+computed from _created and _gamer_extracted, and the presigner, reports,
+sessions and demo tools read the _fields directly. Parsed SK parts and
+participants are cached per record once read.
+"""
+
+import json
+import sys
+from collections.abc import MutableMapping
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+# String attributes with few distinct values across stories, shared via sys.intern
+INTERNED_ATTRIBUTES = frozenset(['PK', 'GSI1PK', 'GSI2PK', 'type', 'group', 'viewed', 'gameserver_id'])
+META_FIELDS = ('_stage', '_region', '_table')
+
+_layouts: Dict[Tuple[str, ...], '_Layout'] = {}
+
+
+class _Layout:
+    """Attribute names of a raw item and their positions, shared by records of the same shape"""
+
+    __slots__ = ('names', 'index', 'shadows')
+
+    def __init__(self, names: Tuple[str, ...]):
+        self.names = names
+        self.index = {name: position for position, name in enumerate(names)}
+        # Raw attributes named like computed fields (e.g. an item that already has _stage)
+        self.shadows = not _COMPUTED.keys().isdisjoint(names)
+
+
+def _layout(names: Tuple[str, ...]) -> _Layout:
+    layout = _layouts.get(names)
+    if layout is None:
+        layout = _layouts[names] = _Layout(tuple(sys.intern(name) for name in names))
+    return layout
+
+
+_MISSING = object()
+_NO_EXTRA: Dict[str, Any] = {}
+# Not computed yet, in the parsed-value slots
+_UNSET = object()
+
+
+def _sk_parts(record: 'StoryRecord') -> Any:
+    # SK format: V#<timestamp>#<gamer_id>; parsed once, gamer interned
+    parts = record._sk_parts
+    if parts is _UNSET:
+        parts = _MISSING
+        sk = record._raw('SK', 'N/A')
+        if isinstance(sk, str) and sk.startswith('V#'):
+            split = sk.split('#')
+            if len(split) >= 3:
+                parts = (split[1], sys.intern('#'.join(split[2:])))
+        record._sk_parts = parts
+    return parts
+
+
+def _timestamp_extracted(record: 'StoryRecord'):
+    parts = _sk_parts(record)
+    return _MISSING if parts is _MISSING else parts[0]
+
+
+def _gamer_extracted(record: 'StoryRecord'):
+    parts = _sk_parts(record)
+    return _MISSING if parts is _MISSING else parts[1]
+
+
+def _participants(record: 'StoryRecord'):
+    participants = record._participants
+    if participants is _UNSET:
+        participants = record._raw('participants', '[]')
+        try:
+            participants = json.loads(participants) if isinstance(participants, str) else participants
+        except ValueError:
+            participants = []
+        record._participants = participants
+    return participants
+
+
+# Enriched fields in the order enrich_story() adds them. Each returns the
+# field's value, or _MISSING if the story doesn't get that field
+_ENRICHED: Dict[str, Callable[['StoryRecord'], Any]] = {
+    '_timestamp_extracted': _timestamp_extracted,
+    '_gamer_extracted': _gamer_extracted,
+    '_created': lambda r: r._raw('timestamp', r._raw('created_at', 'N/A')),
+    '_video_url': lambda r: r._raw('video_url', r._raw('video_key', r._raw('s3_key', 'N/A'))),
+    '_viewed': lambda r: r._raw('viewed', 'False') == 'True',
+    '_description': lambda r: r._raw('description', ''),
+    '_group': lambda r: r._raw('group', r._raw('GSI1PK', 'N/A')),
+    '_participants': _participants,
+    '_gameserver': lambda r: r._raw('gameserver_id', _MISSING),
+    '_game_start': lambda r: r._raw('game_start', _MISSING),
+    '_game_end': lambda r: r._raw('game_end', _MISSING),
+}
+
+# Everything a record computes rather than stores: scan metadata, then enriched fields
+_COMPUTED: Dict[str, Callable[['StoryRecord'], Any]] = {
+    '_stage': lambda r: _MISSING if r._stage is None else r._stage,
+    '_region': lambda r: _MISSING if r._region is None else r._region,
+    '_table': lambda r: _MISSING if r._table is None else r._table,
+    **_ENRICHED,
+}
+# Raw attributes the parsed-value slots are computed from
+_PARSED_FROM = {'SK': '_sk_parts', 'participants': '_participants'}
+
+
+class StoryRecord(MutableMapping):
+    """
+    A scanned video story, enriched on read
+
+    Raw attributes and enriched fields can be overwritten; fields that were
+    set can be deleted again (raw and computed ones can't).
+    """
+
+    __slots__ = ('_layout', '_values', '_stage', '_region', '_table', '_extra', '_sk_parts', '_participants')
+
+    def __init__(self, item: Dict[str, Any], stage: Optional[str] = None, region: Optional[str] = None,
+                 table: Optional[str] = None):
+        self._layout = _layout(tuple(item))
+        self._values = tuple(sys.intern(value) if name in INTERNED_ATTRIBUTES and isinstance(value, str)
+                             else value for name, value in item.items())
+        self._stage = sys.intern(stage) if stage is not None else None
+        self._region = sys.intern(region) if region is not None else None
+        self._table = sys.intern(table) if table is not None else None
+        self._extra: Optional[Dict[str, Any]] = None
+        self._sk_parts = _UNSET
+        self._participants = _UNSET
+
+    @classmethod
+    def from_item(cls, item: Dict[str, Any], stage: str, region: str, table: str) -> 'StoryRecord':
+        """Record of a raw DynamoDB item, tagged with where it was scanned"""
+        return cls(item, stage, region, table)
+
+    @classmethod
+    def from_dict(cls, story: Dict[str, Any]) -> 'StoryRecord':
+        """
+        Record of a story dict in the legacy shape (e.g. read from a dataset)
+
+        Enriched fields that match what would be computed are dropped; the
+        others, and any other _fields, are kept as set fields.
+        """
+        record = cls({key: value for key, value in story.items() if not key.startswith('_')},
+                     story.get('_stage'), story.get('_region'), story.get('_table'))
+        for key, value in story.items():
+            if key.startswith('_') and key not in META_FIELDS:
+                compute = _ENRICHED.get(key)
+                if compute is None or compute(record) != value:
+                    record[key] = value
+        return record
+
+    def _raw(self, name: str, default: Any = None) -> Any:
+        position = self._layout.index.get(name)
+        return default if position is None else self._values[position]
+
+    def _lookup(self, key: str) -> Any:
+        extra = self._extra
+        if extra is not None and key in extra:
+            return extra[key]
+        position = self._layout.index.get(key)
+        if position is not None:
+            return self._values[position] if not self._layout.shadows else self._shadowed(key, position)
+        compute = _COMPUTED.get(key)
+        return _MISSING if compute is None else compute(self)
+
+    def _shadowed(self, key: str, position: int) -> Any:
+        # Computed fields replace raw attributes of the same name, as enrich_story() overwrites them
+        compute = _COMPUTED.get(key)
+        value = _MISSING if compute is None else compute(self)
+        return self._values[position] if value is _MISSING else value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # _lookup() inlined: stats and reports call this a dozen times per story
+        extra = self._extra
+        if extra is not None and key in extra:
+            return extra[key]
+        position = self._layout.index.get(key)
+        if position is not None:
+            return self._values[position] if not self._layout.shadows else self._shadowed(key, position)
+        compute = _COMPUTED.get(key)
+        if compute is None:
+            return default
+        value = compute(self)
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._lookup(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self._lookup(key) is not _MISSING
+
+    def __setitem__(self, key: str, value: Any):
+        position = self._layout.index.get(key)
+        if position is not None and self._layout.shadows and key in _COMPUTED:
+            # A raw attribute shadowed by a computed field: the write goes where lookups look first
+            position = None
+        if position is not None:
+            self._values = self._values[:position] + (value,) + self._values[position + 1:]
+            if key in _PARSED_FROM:
+                setattr(self, _PARSED_FROM[key], _UNSET)
+        elif key in META_FIELDS and isinstance(value, str):
+            setattr(self, key, sys.intern(value))
+            if self._extra:
+                self._extra.pop(key, None)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str):
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        del self._extra[key]
+
+    def _items(self) -> Iterator[Tuple[str, Any]]:
+        """
+        The story's fields, enriched ones filled in
+
+        In the order the dict pipeline adds them: raw attributes, scan
+        metadata, enriched fields, then fields set afterwards.
+        """
+        if self._layout.shadows:
+            # Computed values replace raw attributes of the same name, in their place
+            story = dict(zip(self._layout.names, self._values))
+            story.update(self._computed_items())
+            yield from story.items()
+        else:
+            yield from zip(self._layout.names, self._values)
+            yield from self._computed_items()
+
+    def _computed_items(self) -> Iterator[Tuple[str, Any]]:
+        extra = self._extra or _NO_EXTRA
+        for key, compute in _COMPUTED.items():
+            if key in extra:
+                value = extra[key]
+                # Metadata set to a non-string goes with the fields set afterwards
+                if value is None and key in META_FIELDS:
+                    continue
+            else:
+                value = compute(self)
+            if value is not _MISSING:
+                yield key, value
+        for key, value in extra.items():
+            if key not in _COMPUTED or (value is None and key in META_FIELDS):
+                yield key, value
+
+    def __iter__(self) -> Iterator[str]:
+        for key, _ in self._items():
+            yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._items())
+
+    def items(self):
+        return list(self._items())
+
+    def copy(self) -> 'StoryRecord':
+        """A record with the same fields, whose set fields can change independently"""
+        record = StoryRecord.__new__(StoryRecord)
+        for name in self.__slots__:
+            setattr(record, name, getattr(self, name))
+        if self._extra is not None:
+            record._extra = dict(self._extra)
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The story as a legacy dict, with the enriched fields filled in (see _items)"""
+        return dict(self._items())
+
+    def __repr__(self) -> str:
+        return f"StoryRecord({self._stage!r}, {self._raw('SK')!r})"
+
+
+def story_dict(story) -> Dict[str, Any]:
+    """A story as a plain dict, for export (records are converted, dicts returned as they are)"""
+    return story.to_dict() if isinstance(story, StoryRecord) else story
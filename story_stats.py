@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Mergeable summary statistics of video stories.
+
+StoryStats is updated one story at a time and keeps, in constant memory
+whatever the number of stories:
+
+- Counts per stage and region, viewed, with description, with game server
+- Distinct parents, gamers and groups, as HyperLogLog sketches (exact up
+  to 1024 values, then about 1% error, 16 KB each)
+- Per stage and day: stories, viewed, presigned and missing videos, for
+  viewed ratios and missing-video rates over time
+
+Stats of different stages, shards or runs merge into the stats of all of
+them (sketches merge without double-counting), and can be saved and loaded
+to update them incrementally:
+
+    stats = StoryStats()
+    for story in stories:
+        stats.add(story)
+    stats.merge(other_stats)
+    save_stats(stats, 'stats.json')
+
+From the command line, files are counted in parallel and merged:
+
+    python3 story_stats.py --input all_video_stories_presigned.jsonl
+    python3 story_stats.py --input shard-*.jsonl.gz --workers 4 --save stats.json
+    python3 story_stats.py --load stats.json --input new_stories.jsonl --save stats.json
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import math
+import os
+import re
+import zlib
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from story_io import iter_stories
+from story_store import story_availability
+
+STATS_VERSION = 1
+DEFAULT_PRECISION = 14
+DEFAULT_DAYS_SHOWN = 14
+UNKNOWN_DAY = 'unknown'
+SKETCHES = ('parents', 'gamers', 'groups')
+
+_DATE = re.compile(r'^\d{4}-\d{2}-\d{2}')
+_UTC_OFFSET = re.compile(r'[+-]\d{2}:?\d{2}$')
+
+
+@lru_cache(maxsize=65536)
+def _hash64(value: str) -> int:
+    # Parents, gamers and groups repeat across stories, so most hashes are cache hits
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """
+    Distinct-count sketch: 2^precision one-byte registers, standard error 1.04 / sqrt(2^precision)
+
+    Up to 2^precision / 16 values the sketch keeps their hashes instead, so
+    small counts (the usual number of parents, gamers or groups) are exact.
+    Adding a value twice, or merging sketches that saw the same values,
+    doesn't change the count.
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be 4-18, got {precision}")
+        self.precision = precision
+        self.sparse_limit = (1 << precision) // 16
+        self.hashes: Optional[set] = set()
+        self.registers: Optional[bytearray] = None
+
+    def _add_hash(self, x: int):
+        index = x >> (64 - self.precision)
+        rest = x & ((1 << (64 - self.precision)) - 1)
+        rank = 64 - self.precision - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def _densify(self):
+        self.registers = bytearray(1 << self.precision)
+        for x in self.hashes:
+            self._add_hash(x)
+        self.hashes = None
+
+    def add(self, value: str):
+        x = _hash64(value)
+        if self.hashes is None:
+            self._add_hash(x)
+            return
+        self.hashes.add(x)
+        if len(self.hashes) > self.sparse_limit:
+            self._densify()
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError(f"Can't merge sketches of precision {self.precision} and {other.precision}")
+        if other.hashes is not None:
+            for x in other.hashes:
+                if self.hashes is None:
+                    self._add_hash(x)
+                else:
+                    self.hashes.add(x)
+            if self.hashes is not None and len(self.hashes) > self.sparse_limit:
+                self._densify()
+            return
+        if self.hashes is not None:
+            self._densify()
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        if self.hashes is not None:
+            return len(self.hashes)
+        m = len(self.registers)
+        histogram = defaultdict(int)
+        for register in self.registers:
+            histogram[register] += 1
+        estimate = (0.7213 / (1 + 1.079 / m)) * m * m / sum(n * 2.0 ** -rank for rank, n in histogram.items())
+        zeros = histogram.get(0, 0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_state(self) -> Dict[str, str]:
+        """The hashes or registers, compressed and base64-encoded"""
+        if self.hashes is not None:
+            data = b''.join(x.to_bytes(8, 'big') for x in sorted(self.hashes))
+            return {'hashes': base64.b64encode(zlib.compress(data)).decode('ascii')}
+        return {'registers': base64.b64encode(zlib.compress(bytes(self.registers))).decode('ascii')}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, str], precision: int) -> 'HyperLogLog':
+        sketch = cls(precision)
+        if 'hashes' in state:
+            data = zlib.decompress(base64.b64decode(state['hashes']))
+            sketch.hashes = {int.from_bytes(data[i:i + 8], 'big') for i in range(0, len(data), 8)}
+            return sketch
+        registers = zlib.decompress(base64.b64decode(state['registers']))
+        if len(registers) != 1 << precision:
+            raise ValueError(f"Sketch has {len(registers)} registers, expected {1 << precision}")
+        sketch.hashes = None
+        sketch.registers = bytearray(registers)
+        return sketch
+
+
+def story_day(story: Dict[str, Any]) -> str:
+    """UTC day (YYYY-MM-DD) a story was recorded, or 'unknown'"""
+    for field in ('_created', 'timestamp', 'created_at', '_timestamp_extracted'):
+        value = story.get(field)
+        if isinstance(value, str) and _DATE.match(value):
+            break
+    else:
+        return UNKNOWN_DAY
+    if not _UTC_OFFSET.search(value, 10):
+        # A date, or a UTC or naive timestamp
+        return value[:10]
+    try:
+        return datetime.fromisoformat(value).astimezone(timezone.utc).strftime('%Y-%m-%d')
+    except ValueError:
+        return value[:10]
+
+
+class StoryStats:
+    """
+    Summary statistics of video stories, updated one story at a time and mergeable
+
+    Usage:
+        stats = StoryStats()
+        for story in stories:
+            stats.add(story)
+        stats.to_dict()['unique_gamers']
+        stats.daily(stage='prod')
+    """
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        self.precision = precision
+        self.total_stories = 0
+        self.by_stage = defaultdict(int)
+        self.by_region = defaultdict(int)
+        self.viewed_count = 0
+        self.with_description = 0
+        self.with_gameserver = 0
+        self.sketches = {name: HyperLogLog(precision) for name in SKETCHES}
+        # (stage, day) -> [stories, viewed, presigned, missing]
+        self.days: Dict[tuple, List[int]] = {}
+
+    def add(self, story: Dict[str, Any]):
+        self.total_stories += 1
+
+        # Count by stage and region
+        stage = story.get('_stage', 'unknown')
+        self.by_stage[stage] += 1
+        self.by_region[story.get('_region', 'unknown')] += 1
+
+        # Distinct entities
+        pk = story.get('PK', '')
+        if pk:
+            self.sketches['parents'].add(pk)
+        gamer = story.get('GSI1PK', story.get('_gamer_extracted', ''))
+        if gamer:
+            self.sketches['gamers'].add(gamer)
+        group = story.get('group', '')
+        if group:
+            self.sketches['groups'].add(group)
+
+        # Counts (raw stories, e.g. from a dataset that wasn't enriched, fall back to their attributes)
+        viewed = story.get('_viewed')
+        if viewed is None:
+            viewed = story.get('viewed') == 'True'
+        if viewed:
+            self.viewed_count += 1
+        if story.get('_description', story.get('description')):
+            self.with_description += 1
+        if story.get('_gameserver', story.get('gameserver_id')):
+            self.with_gameserver += 1
+
+        # Per stage and day
+        key = (stage, story_day(story))
+        bucket = self.days.get(key)
+        if bucket is None:
+            bucket = self.days[key] = [0, 0, 0, 0]
+        bucket[0] += 1
+        if viewed:
+            bucket[1] += 1
+        available = story_availability(story)
+        if available is not None:
+            bucket[2] += 1
+            if not available:
+                bucket[3] += 1
+
+    def add_many(self, stories: Iterable[Dict[str, Any]]) -> 'StoryStats':
+        for story in stories:
+            self.add(story)
+        return self
+
+    def merge(self, other: 'StoryStats') -> 'StoryStats':
+        """Add another StoryStats' stories (e.g. of another stage or shard) to these"""
+        self.total_stories += other.total_stories
+        for stage, count in other.by_stage.items():
+            self.by_stage[stage] += count
+        for region, count in other.by_region.items():
+            self.by_region[region] += count
+        self.viewed_count += other.viewed_count
+        self.with_description += other.with_description
+        self.with_gameserver += other.with_gameserver
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+        for key, counts in other.days.items():
+            bucket = self.days.setdefault(key, [0, 0, 0, 0])
+            for i, count in enumerate(counts):
+                bucket[i] += count
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The statistics in generate_summary_stats() form (unique_* are estimates)"""
+        return {
+            'total_stories': self.total_stories,
+            'by_stage': dict(self.by_stage),
+            'by_region': dict(self.by_region),
+            'unique_parents': self.sketches['parents'].count(),
+            'unique_gamers': self.sketches['gamers'].count(),
+            'unique_groups': self.sketches['groups'].count(),
+            'viewed_count': self.viewed_count,
+            'unviewed_count': self.total_stories - self.viewed_count,
+            'with_description': self.with_description,
+            'with_gameserver': self.with_gameserver,
+        }
+
+    def daily(self, stage: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Per-day histogram rows, ordered by stage then day
+
+        Returns:
+            list: {'stage', 'day', 'stories', 'viewed', 'viewed_ratio',
+            'presigned', 'missing', 'missing_rate'} (missing_rate is None
+            until stories of that day were presigned)
+        """
+        rows = []
+        for (row_stage, day), (stories, viewed, presigned, missing) in sorted(self.days.items()):
+            if stage is not None and row_stage != stage:
+                continue
+            rows.append({
+                'stage': row_stage,
+                'day': day,
+                'stories': stories,
+                'viewed': viewed,
+                'viewed_ratio': viewed / stories if stories else 0.0,
+                'presigned': presigned,
+                'missing': missing,
+                'missing_rate': missing / presigned if presigned else None,
+            })
+        return rows
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serializable state, see from_state()"""
+        return {
+            'version': STATS_VERSION,
+            'precision': self.precision,
+            'total_stories': self.total_stories,
+            'by_stage': dict(self.by_stage),
+            'by_region': dict(self.by_region),
+            'viewed_count': self.viewed_count,
+            'with_description': self.with_description,
+            'with_gameserver': self.with_gameserver,
+            'sketches': {name: sketch.to_state() for name, sketch in self.sketches.items()},
+            'days': [[stage, day, *counts] for (stage, day), counts in sorted(self.days.items())],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'StoryStats':
+        """
+        StoryStats from to_state() output
+
+        Raises:
+            ValueError: If the state is of another version or malformed
+        """
+        if state.get('version') != STATS_VERSION:
+            raise ValueError(f"Unsupported stats version: {state.get('version')}")
+        try:
+            stats = cls(state['precision'])
+            stats.total_stories = state['total_stories']
+            stats.by_stage.update(state['by_stage'])
+            stats.by_region.update(state['by_region'])
+            stats.viewed_count = state['viewed_count']
+            stats.with_description = state['with_description']
+            stats.with_gameserver = state['with_gameserver']
+            for name in SKETCHES:
+                stats.sketches[name] = HyperLogLog.from_state(state['sketches'][name], stats.precision)
+            for stage, day, *counts in state['days']:
+                stats.days[(stage, day)] = list(counts)
+        except (KeyError, TypeError, zlib.error) as e:
+            raise ValueError(f"Malformed stats state: {e}")
+        return stats
+
+
+def generate_stats(stories: Iterable[Dict[str, Any]], precision: int = DEFAULT_PRECISION) -> StoryStats:
+    return StoryStats(precision).add_many(stories)
+
+
+def save_stats(stats: StoryStats, output_file: str):
+    """Write stats state to a JSON file (atomically)"""
+    tmp_file = output_file + '.tmp'
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(stats.to_state(), f, separators=(',', ':'))
+    os.replace(tmp_file, output_file)
+
+
+def load_stats(input_file: str) -> StoryStats:
+    """
+    Read stats saved with save_stats()
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+        ValueError: If it isn't a stats state
+    """
+    with open(input_file, 'r', encoding='utf-8') as f:
+        return StoryStats.from_state(json.load(f))
+
+
+def _dataset_stats(path: str, precision: int) -> StoryStats:
+    return generate_stats(iter_stories(path), precision)
+
+
+def compute_stats(paths: List[str], workers: int = 1, precision: int = DEFAULT_PRECISION) -> StoryStats:
+    """
+    Stats of several datasets (e.g. shards or stages), counted in parallel processes and merged
+
+    Raises:
+        FileNotFoundError / ValueError: As iter_stories() for an unreadable dataset
+    """
+    stats = StoryStats(precision)
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            stats.merge(_dataset_stats(path, precision))
+        return stats
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        for shard in executor.map(_dataset_stats, paths, [precision] * len(paths)):
+            stats.merge(shard)
+    return stats
+
+
+def print_stats(stats: StoryStats, stage: Optional[str] = None, days: int = DEFAULT_DAYS_SHOWN):
+    summary = stats.to_dict()
+    print(f"\n📈 Summary Statistics:")
+    print(f"   Total stories: {summary['total_stories']}")
+    print(f"   Unique parents: ~{summary['unique_parents']}")
+    print(f"   Unique gamers: ~{summary['unique_gamers']}")
+    print(f"   Unique groups: ~{summary['unique_groups']}")
+    print(f"   Viewed: {summary['viewed_count']}")
+    print(f"   Unviewed: {summary['unviewed_count']}")
+    print(f"\n   By stage:")
+    for stage_name, count in summary['by_stage'].items():
+        print(f"     - {stage_name}: {count}")
+
+    rows = stats.daily(stage)
+    by_stage = defaultdict(list)
+    for row in rows:
+        by_stage[row['stage']].append(row)
+    for stage_name, stage_rows in by_stage.items():
+        shown = stage_rows[-days:]
+        print(f"\n📅 {stage_name}: last {len(shown)} of {len(stage_rows)} days")
+        for row in shown:
+            missing = f"{row['missing_rate'] * 100:5.1f}% missing" if row['missing_rate'] is not None \
+                else 'not presigned'
+            print(f"   {row['day']}  {row['stories']:>7} stories  {row['viewed_ratio'] * 100:5.1f}% viewed  {missing}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Summary statistics and daily histograms of video story datasets',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 story_stats.py --input all_video_stories_presigned.jsonl
+  python3 story_stats.py --input shard-*.jsonl.gz --workers 4 --save stats.json
+  python3 story_stats.py --load stats.json --input new_stories.jsonl --save stats.json
+  python3 story_stats.py --load dev-stats.json prod-stats.json --stage prod --days 30
+
+Only add stories that the loaded stats haven't seen: distinct counts can't
+double-count, but the other counts would.
+        """
+    )
+    parser.add_argument('--input', '-i', nargs='+', default=[],
+                        help='Datasets to count (.jsonl[.gz|.zst] or legacy .json)')
+    parser.add_argument('--load', nargs='+', default=[], metavar='STATS',
+                        help='Saved stats to merge in (from --save or a scraper run with --stats)')
+    parser.add_argument('--save', metavar='STATS', help='Save the merged stats, to update or merge later')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Datasets counted in parallel (default: CPU count)')
+    parser.add_argument('--precision', type=int, default=DEFAULT_PRECISION,
+                        help=f'HyperLogLog precision for new stats (default: {DEFAULT_PRECISION})')
+    parser.add_argument('--stage', help='Only show the daily histogram of this stage')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS_SHOWN,
+                        help=f'Days shown per stage (default: {DEFAULT_DAYS_SHOWN})')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    if not args.input and not args.load:
+        parser.error('give --input datasets and/or --load saved stats')
+
+    try:
+        stats = None
+        with phase('load'):
+            for path in args.load:
+                loaded = load_stats(path)
+                stats = loaded if stats is None else stats.merge(loaded)
+        with phase('count'):
+            if args.input:
+                counted = compute_stats(args.input, args.workers,
+                                        stats.precision if stats is not None else args.precision)
+                stats = counted if stats is None else stats.merge(counted)
+    except FileNotFoundError as e:
+        print(f"❌ File not found: {e.filename}")
+        return 1
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+
+    print_stats(stats, args.stage, args.days)
+    if args.save:
+        save_stats(stats, args.save)
+        print(f"\n💾 Saved stats to: {args.save}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
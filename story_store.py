@@ -0,0 +1,586 @@
+#!/usr/bin/env python3
+"""
+SQLite story store shared by the tool scripts.
+
+The scraper, presigner, demo tools and serve.py used to exchange stories
+through one big JSON array that every step reloaded and rewrote. They now
+read and write stories.db instead:
+
+- One row per DynamoDB item, keyed by stage, PK and SK, with the full
+  story as JSON plus indexed columns for lookups by story ID (see
+  story_ids.py) and the common filters: stage, PK/SK, gamer, group,
+  timestamp, availability and presigned URL expiry. A video shared by
+  several parents has one row per parent, all with the same story ID
+- Upserts are batched in transactions and merge into the stored story, so
+  the presigner's fields survive a re-scrape and vice versa
+- WAL mode, so serve.py's readers never block on a writer
+- A full-text index (FTS5) over story descriptions, updated incrementally
+  as stories are upserted, for ranked search with prefix matching and
+  highlighted snippets (search())
+
+Dataset files stay the exchange format (any format story_io.py reads and
+writes, streamed in both directions):
+
+    python3 story_store.py --import all_video_stories_presigned.jsonl
+    python3 story_store.py --export all_video_stories_presigned.jsonl.gz
+    python3 story_store.py --search "fixed the login issue"
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from calendar import timegm
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from story_ids import story_id
+from story_io import iter_stories, write_stories
+from story_record import story_dict
+
+DEFAULT_DB = 'stories.db'
+DEFAULT_BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stories (
+    stage TEXT NOT NULL,
+    pk TEXT NOT NULL,
+    sk TEXT NOT NULL,           -- story ID for stories without DynamoDB keys
+    story_id TEXT,
+    gamer TEXT,
+    grp TEXT,
+    timestamp TEXT,
+    available INTEGER,          -- 1 = presigned URL, 0 = missing in S3, NULL = unknown
+    presign_expires INTEGER,    -- epoch seconds the presigned URL stops working
+    data TEXT NOT NULL,
+    PRIMARY KEY (stage, pk, sk)
+);
+CREATE INDEX IF NOT EXISTS stories_story_id ON stories (story_id);
+CREATE INDEX IF NOT EXISTS stories_stage ON stories (stage, timestamp);
+CREATE INDEX IF NOT EXISTS stories_key ON stories (pk, sk);
+CREATE INDEX IF NOT EXISTS stories_gamer ON stories (gamer, timestamp);
+CREATE INDEX IF NOT EXISTS stories_group ON stories (grp, timestamp);
+CREATE INDEX IF NOT EXISTS stories_timestamp ON stories (timestamp);
+CREATE INDEX IF NOT EXISTS stories_available ON stories (available);
+CREATE INDEX IF NOT EXISTS stories_presign_expires ON stories (presign_expires);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS story_search USING fts5(
+    description,
+    tokenize = 'porter unicode61'
+);
+-- story_search rowids are stories rowids. upsert_many() reindexes changed
+-- descriptions in bulk (much faster than per-row triggers)
+CREATE TRIGGER IF NOT EXISTS stories_search_delete AFTER DELETE ON stories BEGIN
+    DELETE FROM story_search WHERE rowid = old.rowid;
+END;
+
+CREATE TABLE IF NOT EXISTS demo_stories (
+    demo_id TEXT PRIMARY KEY,
+    story_id TEXT,
+    data TEXT NOT NULL
+);
+"""
+
+# Merge into the stored story (JSON merge patch): keys of the new version win,
+# keys it doesn't have are kept, and keys it sets to null are removed
+UPSERT_SQL = """
+INSERT INTO stories (stage, pk, sk, story_id, gamer, grp, timestamp, available, presign_expires, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (stage, pk, sk) DO UPDATE SET
+    story_id = excluded.story_id,
+    gamer = excluded.gamer,
+    grp = excluded.grp,
+    timestamp = excluded.timestamp,
+    available = COALESCE(excluded.available, stories.available),
+    presign_expires = COALESCE(excluded.presign_expires, stories.presign_expires),
+    data = json_patch(stories.data, excluded.data)
+"""
+
+# Query filters: name -> SQL condition
+FILTERS = {
+    'stage': 'stage = ?',
+    'pk': 'pk = ?',
+    'sk': 'sk = ?',
+    'gamer': 'gamer = ?',
+    'group': 'grp = ?',
+    'since': 'timestamp >= ?',
+    'until': 'timestamp < ?',
+    'available': 'available = ?',
+    'expiring_before': 'presign_expires < ?',
+}
+
+
+SEARCH_SQL = """
+SELECT s.story_id, s.stage, s.timestamp, bm25(story_search) AS score,
+       snippet(story_search, 0, ?, ?, '…', ?) AS snippet, s.data
+FROM story_search JOIN stories s ON s.rowid = story_search.rowid
+WHERE story_search MATCH ?{stage_filter}
+ORDER BY score
+LIMIT ?
+"""
+SNIPPET_TOKENS = 16
+
+# Words that say nothing about a clip; matching them only slows queries down
+STOPWORDS = frozenset("""
+a an and are as at be but by clip clips for from had has have he her his i in is it its of on or our
+she so that the their them then there these they this those to video was we were what when where
+which who with you
+""".split())
+
+
+def fts_query(text: str, prefix: bool = True, any_term: bool = False) -> str:
+    """
+    FTS5 query for free text: every word except stopwords (quoted, so
+    punctuation and keywords like AND/NEAR can't break the syntax),
+    optionally as a prefix
+
+    Args:
+        text: Search text, e.g. 'the clip where they fixed the login issue'
+        prefix: Match words that start with each term ('log' matches 'login')
+        any_term: Match stories with any of the words instead of all of them
+    """
+    words = re.findall(r'\w+', text.lower())
+    terms = [word for word in words if word not in STOPWORDS] or words
+    return (' OR ' if any_term else ' ').join(f'"{term}"' + ('*' if prefix else '') for term in terms)
+
+
+def _json_default(obj):
+    # DynamoDB numbers come back as Decimal
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def presign_expiry(url: Optional[str]) -> Optional[int]:
+    """Epoch seconds a presigned URL expires at (SigV4 or SigV2), or None"""
+    if not url or '?' not in url:
+        return None
+    query = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+    try:
+        if 'X-Amz-Date' in query and 'X-Amz-Expires' in query:
+            signed = time.strptime(query['X-Amz-Date'][0], '%Y%m%dT%H%M%SZ')
+            return timegm(signed) + int(query['X-Amz-Expires'][0])
+        if 'Expires' in query:
+            return int(query['Expires'][0])
+    except ValueError:
+        pass
+    return None
+
+
+def story_availability(story: Dict[str, Any]) -> Optional[int]:
+    """1 if the story has a usable presigned URL, 0 if it failed, None if not presigned yet"""
+    url = story.get('_presigned_url')
+    if url and not url.startswith('ERROR:'):
+        return 1
+    if story.get('_presigned_error') or (url and url.startswith('ERROR:')):
+        return 0
+    return None
+
+
+def story_description(story: Dict[str, Any]) -> Optional[str]:
+    """The text indexed for search, or None if the story doesn't carry a description"""
+    if '_description' in story:
+        return story['_description'] or ''
+    if 'description' in story:
+        return story['description'] or ''
+    return None
+
+
+def story_key(story: Dict[str, Any]) -> Tuple[str, str, str]:
+    """The story's row key: stage, PK and SK (the story ID stands in for a missing SK)"""
+    return (story.get('_stage') or '', story.get('PK') or '', story.get('SK') or story_id(story))
+
+
+def story_row(story: Dict[str, Any]) -> tuple:
+    """Row values for a story, in UPSERT_SQL order"""
+    return (
+        *story_key(story),
+        story_id(story),
+        story.get('_gamer_extracted') or story.get('GSI1PK') or story.get('_gamer'),
+        story.get('_group') or story.get('group'),
+        story.get('_created') or story.get('timestamp'),
+        story_availability(story),
+        presign_expiry(story.get('_presigned_url')),
+        json.dumps(story_dict(story), default=_json_default, ensure_ascii=False, separators=(',', ':')),
+    )
+
+
+class StoryStore:
+    """
+    Stories in a SQLite database
+
+    Safe to share between threads: each thread gets its own connection.
+    Threads that only live for one request (serve.py) release() theirs
+    afterwards, so the next thread reuses it with its page cache still warm.
+
+    Args:
+        path: Database file (created with the schema if missing)
+    """
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._idle: List[sqlite3.Connection] = []
+        # Seconds the last full-text index rebuild took (None if none ran since opening)
+        self.search_index_build_seconds: Optional[float] = None
+        with self.connection() as conn:
+            had_search = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'story_search'").fetchone() is not None
+            migrated = self._migrate_story_id_key(conn)
+            conn.executescript(SCHEMA)
+            if migrated:
+                self._copy_migrated_stories(conn)
+        if not had_search or migrated:
+            # Databases from before the search index existed, or with new rowids
+            self.rebuild_search_index()
+
+    @staticmethod
+    def _migrate_story_id_key(conn: sqlite3.Connection) -> bool:
+        # Databases keyed by story ID kept one row per video, not one per item:
+        # move the table aside (without its indexes and trigger) to copy it over
+        columns = {name: pk for _, name, _, _, _, pk in conn.execute('PRAGMA table_info(stories)')}
+        if columns.get('story_id') != 1:
+            return False
+        for kind, name in conn.execute(
+                "SELECT type, name FROM sqlite_master WHERE tbl_name = 'stories' "
+                "AND type IN ('index', 'trigger') AND sql IS NOT NULL").fetchall():
+            conn.execute(f'DROP {kind.upper()} "{name}"')
+        conn.execute('ALTER TABLE stories RENAME TO stories_by_story_id')
+        return True
+
+    @staticmethod
+    def _copy_migrated_stories(conn: sqlite3.Connection):
+        conn.execute(
+            "INSERT OR IGNORE INTO stories "
+            "(stage, pk, sk, story_id, gamer, grp, timestamp, available, presign_expires, data) "
+            "SELECT COALESCE(stage, ''), COALESCE(pk, ''), COALESCE(sk, story_id), story_id, gamer, grp, "
+            "timestamp, available, presign_expires, data FROM stories_by_story_id ORDER BY rowid")
+        conn.execute('DROP TABLE stories_by_story_id')
+        conn.commit()
+
+    def connection(self) -> sqlite3.Connection:
+        """This thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                # Released connections move between threads, one thread at a time
+                conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                conn.execute('PRAGMA journal_mode=WAL')
+                # WAL + NORMAL only risks the last transactions on power loss, never corruption
+                conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def release(self):
+        """Hand this thread's connection back for reuse by another thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._idle.append(conn)
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def upsert_many(self, stories: Iterable[Dict[str, Any]], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+        """
+        Insert or update stories, one transaction per batch
+
+        Fields of an existing story that the new version doesn't have are kept.
+
+        Returns:
+            int: Number of stories written
+        """
+        conn = self.connection()
+        written = 0
+        batch = []
+        for story in stories:
+            batch.append(story)
+            if len(batch) >= batch_size:
+                self._upsert_batch(conn, batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            self._upsert_batch(conn, batch)
+            written += len(batch)
+        return written
+
+    def _upsert_batch(self, conn: sqlite3.Connection, stories: List[Dict[str, Any]]):
+        rows = [story_row(story) for story in stories]
+        descriptions = {row[:3]: description for row, description in zip(rows, map(story_description, stories))
+                        if description is not None}
+        with conn:
+            conn.executemany(UPSERT_SQL, rows)
+            # Reindex only descriptions that are new or changed (the presigner
+            # rewrites stories without touching them)
+            changed = []
+            for key, description in descriptions.items():
+                rowid, indexed = conn.execute(
+                    'SELECT s.rowid, f.description FROM stories s LEFT JOIN story_search f ON f.rowid = s.rowid '
+                    'WHERE s.stage = ? AND s.pk = ? AND s.sk = ?', key).fetchone()
+                if indexed != description:
+                    changed.append((rowid, description, indexed is not None))
+            conn.executemany('DELETE FROM story_search WHERE rowid = ?',
+                             [(rowid,) for rowid, _, existed in changed if existed])
+            conn.executemany('INSERT INTO story_search (rowid, description) VALUES (?, ?)',
+                             [(rowid, description) for rowid, description, _ in changed])
+
+    def delete_missing(self, stage: str, keep_keys: Iterable[Tuple[str, str, str]]) -> int:
+        """
+        Delete a stage's stories whose key isn't in keep_keys (e.g. after a full scrape)
+
+        Args:
+            stage: Stage to delete from
+            keep_keys: story_key() of every story to keep (other stages' keys are ignored)
+
+        Returns:
+            int: Number of stories deleted
+        """
+        conn = self.connection()
+        with conn:
+            conn.execute('CREATE TEMP TABLE IF NOT EXISTS keep_keys (pk TEXT, sk TEXT, PRIMARY KEY (pk, sk))')
+            conn.execute('DELETE FROM keep_keys')
+            conn.executemany('INSERT OR IGNORE INTO keep_keys VALUES (?, ?)',
+                             ((pk, sk) for key_stage, pk, sk in keep_keys if key_stage == stage))
+            cursor = conn.execute(
+                'DELETE FROM stories WHERE stage = ? AND NOT EXISTS '
+                '(SELECT 1 FROM keep_keys k WHERE k.pk = stories.pk AND k.sk = stories.sk)',
+                (stage,))
+            conn.execute('DELETE FROM keep_keys')
+        return cursor.rowcount
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        """The first stored story with this ID (a video shared by several parents has one per parent)"""
+        row = self.connection().execute(
+            'SELECT data FROM stories WHERE story_id = ? ORDER BY rowid LIMIT 1', (sid,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, story_ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """Stories for the IDs that exist, one per parent, in insertion order (like a scan of the export)"""
+        ids = list(dict.fromkeys(story_ids))
+        stories = []
+        conn = self.connection()
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = conn.execute(
+                f"SELECT rowid, data FROM stories WHERE story_id IN ({','.join('?' * len(chunk))})", chunk)
+            stories.extend(rows)
+        return [json.loads(data) for _, data in sorted(stories)]
+
+    def _where(self, filters: Dict[str, Any]) -> Tuple[str, list]:
+        conditions, params = [], []
+        for name, value in filters.items():
+            if value is None:
+                continue
+            if name not in FILTERS:
+                raise ValueError(f"Unknown filter: {name}")
+            conditions.append(FILTERS[name])
+            params.append(int(value) if name == 'available' else value)
+        return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+    def query(self, limit: Optional[int] = None, offset: int = 0, **filters) -> List[Dict[str, Any]]:
+        """
+        Stories matching all given filters, in insertion order
+
+        Args:
+            limit: Maximum number of stories (None = all)
+            offset: Stories to skip
+            **filters: Any of FILTERS, e.g. stage='dev', gamer='G#...',
+                since='2025-11-24', available=True
+
+        Returns:
+            list: Stories
+        """
+        where, params = self._where(filters)
+        sql = f"SELECT data FROM stories{where} ORDER BY rowid"
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params += [-1 if limit is None else limit, offset]
+        return [json.loads(data) for (data,) in self.connection().execute(sql, params)]
+
+    def count(self, **filters) -> int:
+        where, params = self._where(filters)
+        return self.connection().execute(f"SELECT COUNT(*) FROM stories{where}", params).fetchone()[0]
+
+    def iter_stories(self) -> Iterator[Dict[str, Any]]:
+        """All stories in insertion order, without holding them all in memory"""
+        for (data,) in self.connection().execute('SELECT data FROM stories ORDER BY rowid'):
+            yield json.loads(data)
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self.connection()
+        return {
+            'stories': self.count(),
+            'by_stage': dict(conn.execute('SELECT stage, COUNT(*) FROM stories GROUP BY stage ORDER BY stage')),
+            'available': self.count(available=True),
+            'missing': self.count(available=False),
+            'demo_stories': conn.execute('SELECT COUNT(*) FROM demo_stories').fetchone()[0],
+        }
+
+    def import_json(self, input_file: str) -> int:
+        """Upsert the stories of a dataset file (e.g. all_video_stories_presigned.jsonl), streamed"""
+        return self.upsert_many(iter_stories(input_file))
+
+    def export_json(self, output_file: str) -> int:
+        """Write all stories to a dataset file, format by suffix (see story_io.StoryWriter)"""
+        return write_stories(self.iter_stories(), output_file)
+
+    def rebuild_search_index(self):
+        """Rebuild the full-text index from the stored stories"""
+        start = time.perf_counter()
+        conn = self.connection()
+        with conn:
+            conn.execute('DELETE FROM story_search')
+            conn.execute(
+                "INSERT INTO story_search (rowid, description) SELECT rowid, "
+                "COALESCE(json_extract(data, '$._description'), json_extract(data, '$.description'), '') "
+                "FROM stories")
+        self.search_index_build_seconds = time.perf_counter() - start
+
+    def search(self, text: str, limit: int = 20, stage: Optional[str] = None, prefix: bool = True,
+               highlight: tuple = ('<mark>', '</mark>')) -> List[Dict[str, Any]]:
+        """
+        Ranked full-text search over story descriptions
+
+        Stories matching all words come first; if none do, stories matching
+        any of them are returned, still ranked by BM25.
+
+        Args:
+            text: Free text, e.g. 'the clip where they fixed the login issue'
+            limit: Maximum number of results
+            stage: Only search this stage
+            prefix: Treat each word as a prefix
+            highlight: Markers placed around matched words in the snippets
+
+        Returns:
+            list: {'story_id', 'stage', 'timestamp', 'score', 'snippet', 'story'},
+            best match first (lower score is better)
+        """
+        sql = SEARCH_SQL.format(stage_filter=' AND s.stage = ?' if stage else '')
+        conn = self.connection()
+        rows = []
+        for any_term in (False, True):
+            query = fts_query(text, prefix, any_term)
+            if not query:
+                return []
+            params = [highlight[0], highlight[1], SNIPPET_TOKENS, query] + ([stage] if stage else []) + [limit]
+            rows = conn.execute(sql, params).fetchall()
+            if rows:
+                break
+        return [{'story_id': sid, 'stage': row_stage, 'timestamp': timestamp, 'score': score,
+                 'snippet': snippet, 'story': json.loads(data)}
+                for sid, row_stage, timestamp, score, snippet, data in rows]
+
+    def upsert_demo_stories(self, demo_stories: Iterable[Dict[str, Any]]) -> int:
+        """Insert or replace demo stories (demo_stories.json records) by demo_id"""
+        rows = [(story['demo_id'], story.get('original_story_id'),
+                 json.dumps(story, default=_json_default, ensure_ascii=False, separators=(',', ':')))
+                for story in demo_stories]
+        conn = self.connection()
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO demo_stories (demo_id, story_id, data) VALUES (?, ?, ?)',
+                             rows)
+        return len(rows)
+
+    def demo_stories(self) -> List[Dict[str, Any]]:
+        # demostory<n>, in numeric order (as text, demostory1000 would sort before demostory101)
+        rows = self.connection().execute(
+            "SELECT data FROM demo_stories ORDER BY CAST(ltrim(demo_id, 'demostory') AS INTEGER), demo_id")
+        return [json.loads(data) for (data,) in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Inspect, import and export the story store',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 story_store.py                                   # Show counts
+  python3 story_store.py --import all_video_stories_presigned.jsonl
+  python3 story_store.py --import-demo demo_stories.json
+  python3 story_store.py --export all_video_stories_presigned.jsonl.gz
+  python3 story_store.py --export all_video_stories_presigned.json   # Legacy JSON array
+  python3 story_store.py --get dev_G_1234abcd-..._2025-11-24T18_03_11_123Z
+  python3 story_store.py --search "fixed the login issue" --stage prod --limit 5
+        """
+    )
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'Story database (default: {DEFAULT_DB})')
+    parser.add_argument('--import', dest='import_file', help='Upsert stories from a dataset file (.jsonl[.gz|.zst] or .json)')
+    parser.add_argument('--import-demo', help='Upsert demo stories from demo_stories.json')
+    parser.add_argument('--export', help='Export all stories to a dataset file; the suffix picks the format')
+    parser.add_argument('--get', help='Print one story by story ID')
+    parser.add_argument('--search', help='Full-text search over story descriptions')
+    parser.add_argument('--stage', help='Only search this stage')
+    parser.add_argument('--limit', type=int, default=10, help='Search results to show (default: 10)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    store = StoryStore(args.db)
+
+    if args.import_file:
+        start = time.perf_counter()
+        try:
+            with phase('import'):
+                count = store.import_json(args.import_file)
+        except FileNotFoundError:
+            print(f"❌ File not found: {args.import_file}")
+            return 1
+        except ValueError as e:
+            print(f"❌ Invalid dataset: {e}")
+            return 1
+        print(f"✅ Imported {count} stories from {args.import_file} in {time.perf_counter() - start:.1f}s")
+
+    if args.import_demo:
+        try:
+            with open(args.import_demo, 'r') as f:
+                count = store.upsert_demo_stories(json.load(f))
+        except FileNotFoundError:
+            print(f"❌ File not found: {args.import_demo}")
+            return 1
+        print(f"✅ Imported {count} demo stories from {args.import_demo}")
+
+    if args.export:
+        with phase('export'):
+            count = store.export_json(args.export)
+        print(f"💾 Exported {count} stories to: {args.export}")
+
+    if args.get:
+        story = store.get(args.get)
+        if story is None:
+            print(f"❌ Story not found: {args.get}")
+            return 1
+        print(json.dumps(story, indent=2, ensure_ascii=False))
+        return 0
+
+    if args.search:
+        start = time.perf_counter()
+        with phase('search'):
+            results = store.search(args.search, limit=args.limit, stage=args.stage, highlight=('[', ']'))
+        elapsed = time.perf_counter() - start
+        print(f"🔎 {len(results)} results for \"{args.search}\" in {elapsed * 1000:.1f} ms")
+        for rank, result in enumerate(results, 1):
+            print(f"\n{rank:>3}. {result['story_id']}  (score {result['score']:.2f})")
+            print(f"     {' '.join(result['snippet'].split())}")
+        return 0
+
+    stats = store.stats()
+    print(f"📚 {args.db}: {stats['stories']} stories ({stats['available']} available, "
+          f"{stats['missing']} missing), {stats['demo_stories']} demo stories")
+    for stage, count in stats['by_stage'].items():
+        print(f"   - {stage}: {count}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
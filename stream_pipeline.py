@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Scrape, enrich, dedupe and presign video stories in one streaming pass.
+
+Running scrape_video_stories.py and then generate_presigned_urls.py waits
+for every phase to finish before the next starts. Here each phase is a
+pool of worker threads connected to the next by a bounded queue:
+
+    scan (one worker per stage, page by page)
+      -> enrich (per page; presigned URLs already in the store are reused)
+      -> dedupe (by stage, PK and SK; also writes the scraped dataset)
+      -> presign (concurrent S3 HEAD + signing)
+      -> write (presigned dataset, story store in batches)
+
+A page starts enriching while the next page is being scanned, and signing
+starts with the first story. When a phase falls behind, its queue fills up
+and the phases feeding it block (backpressure), so memory stays bounded by
+the queue sizes plus the keys of the stories seen. Stats are counted as
+stories go by; the HTML report and Parquet export stream the presigned
+dataset back from disk. End to end, a run takes about as long as its
+slowest phase.
+
+Usage:
+    python3 stream_pipeline.py
+    python3 stream_pipeline.py --stages dev test --presign-workers 32
+"""
+
+import argparse
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from generate_presigned_urls import (DecimalEncoder, PRESIGN_FIELDS, generate_html_with_presigned_urls,
+                                     is_presigned_url, presign_story)
+from instrumentation import add_instrumentation_arguments, phase, run_main
+from scrape_video_stories import enrich_video_stories, iter_video_story_pages, load_resources_config
+from story_ids import story_id
+from story_io import StoryWriter, dataset_stem, dataset_suffix, iter_stories
+from story_parquet import write_parquet
+from story_stats import StoryStats, save_stats
+from story_store import DEFAULT_BATCH_SIZE, DEFAULT_DB, StoryStore, story_key
+
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_PRESIGN_WORKERS = 16
+DEFAULT_EXPIRATION = 2592000  # 30 days
+
+_DONE = object()
+
+
+class StreamPipeline:
+    """
+    Stages of worker threads connected by bounded queues
+
+    Usage:
+        pipeline = StreamPipeline()
+        pipeline.add_stage('scan', scan_pages, workers=4)
+        pipeline.add_stage('enrich', enrich_page)
+        for story in pipeline.run(stage_names):
+            ...
+
+    Each stage function takes one item and returns an iterable of items for
+    the next stage (empty to drop it, several to split it). The first error
+    stops the pipeline and is raised from run().
+
+    Args:
+        queue_size: Items each queue holds before its producers block
+    """
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.stages: List[Dict[str, Any]] = []
+        self._cancelled = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def add_stage(self, name: str, func: Callable[[Any], Iterable[Any]], workers: int = 1,
+                  queue_size: Optional[int] = None):
+        self.stages.append({'name': name, 'func': func, 'workers': workers,
+                            'queue_size': queue_size or self.queue_size,
+                            'items_in': 0, 'items_out': 0, 'busy_seconds': 0.0, 'blocked_seconds': 0.0})
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker(self, stage: Dict[str, Any], inbox: queue.Queue, outbox: queue.Queue, remaining: List[int],
+                lock: threading.Lock):
+        func = stage['func']
+        busy = blocked = 0.0
+        items_in = items_out = 0
+        try:
+            while not self._cancelled.is_set():
+                try:
+                    item = inbox.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    inbox.put(item)  # For the stage's other workers
+                    break
+                items_in += 1
+                start = time.perf_counter()
+                for result in func(item):
+                    produced = time.perf_counter()
+                    busy += produced - start
+                    if not self._put(outbox, result):
+                        return
+                    start = time.perf_counter()
+                    blocked += start - produced
+                    items_out += 1
+                busy += time.perf_counter() - start
+        except BaseException as e:
+            self._errors.append(e)
+            self._cancelled.set()
+        finally:
+            with lock:
+                stage['items_in'] += items_in
+                stage['items_out'] += items_out
+                stage['busy_seconds'] += busy
+                stage['blocked_seconds'] += blocked
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._put(outbox, _DONE)
+
+    def run(self, items: Iterable[Any]) -> Iterator[Any]:
+        """Feed items to the first stage and yield what the last stage produces"""
+        queues = [queue.Queue(maxsize=stage['queue_size']) for stage in self.stages]
+        queues.append(queue.Queue(maxsize=self.queue_size))
+        threads = []
+
+        def feed():
+            try:
+                for item in items:
+                    if not self._put(queues[0], item):
+                        return
+                self._put(queues[0], _DONE)
+            except BaseException as e:
+                self._errors.append(e)
+                self._cancelled.set()
+
+        threads.append(threading.Thread(target=feed, name='pipeline-feed', daemon=True))
+        for index, stage in enumerate(self.stages):
+            remaining, lock = [stage['workers']], threading.Lock()
+            for n in range(stage['workers']):
+                threads.append(threading.Thread(
+                    target=self._worker, args=(stage, queues[index], queues[index + 1], remaining, lock),
+                    name=f"pipeline-{stage['name']}-{n}", daemon=True))
+        for thread in threads:
+            thread.start()
+
+        output = queues[-1]
+        finished = False
+        try:
+            while not self._cancelled.is_set():
+                try:
+                    item = output.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    finished = True
+                    break
+                yield item
+        finally:
+            if not finished:
+                # Failed, or the consumer stopped early: unblock and stop every worker
+                self._cancelled.set()
+            for thread in threads:
+                thread.join()
+        if self._errors:
+            raise self._errors[0]
+
+    def report(self) -> List[Dict[str, Any]]:
+        """Per-stage item counts, and seconds (summed over workers) spent working / blocked downstream"""
+        return [{key: stage[key] for key in ('name', 'workers', 'items_in', 'items_out',
+                                              'busy_seconds', 'blocked_seconds')}
+                for stage in self.stages]
+
+
+def stream_presigned_stories(stages: List[str], config: Dict[str, Any], scraped_stages: List[str],
+                             expiration: int = DEFAULT_EXPIRATION, skip_missing: bool = True,
+                             presign_workers: int = DEFAULT_PRESIGN_WORKERS,
+                             store: Optional[StoryStore] = None, scrape_writer: Optional[StoryWriter] = None,
+                             queue_size: int = DEFAULT_QUEUE_SIZE, pipeline: Optional[StreamPipeline] = None,
+                             seen_keys: Optional[Set[Tuple[str, str, str]]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield enriched, deduplicated and presigned stories of the given stages as they are ready
+
+    Stories are deduplicated by DynamoDB item (stage, PK and SK), like the
+    batch scraper: a video shared by several parents is kept once per parent.
+
+    Args:
+        stages: Stages to scan (names from config)
+        config: Resources configuration
+        scraped_stages: Filled with the stages whose scan returned stories
+            (only those are safe to prune in the store)
+        expiration: URL expiration time in seconds
+        skip_missing: Record missing videos as an error instead of keeping the error URL
+        presign_workers: Concurrent presign workers
+        store: Optional story store; valid presigned URLs already in it are reused
+        scrape_writer: Optional writer that gets each unique story before presigning
+        queue_size: Pages/stories each queue holds before upstream stages block
+        pipeline: Optional StreamPipeline to use (e.g. to read its report() afterwards)
+        seen_keys: Optional set, filled with the story_key() of every story yielded
+    """
+    pipeline = pipeline or StreamPipeline(queue_size)
+    seen = set() if seen_keys is None else seen_keys
+
+    def scan(stage_name):
+        stage_config = config['stages'][stage_name]
+        found = 0
+        try:
+            for page in iter_video_story_pages(stage_name, stage_config['dynamodb_table'], stage_config['region']):
+                found += len(page)
+                yield page
+        except Exception as e:
+            # Like the batch scraper: report it and carry on with the other stages
+            print(f"❌ Error scanning table {stage_config['dynamodb_table']}: {e}")
+            return
+        print(f"✅ Stage {stage_name}: Found {found} video stories")
+        if found:
+            scraped_stages.append(stage_name)
+
+    def enrich(page):
+        with phase('enrich'):
+            stories = enrich_video_stories(page)
+        if store is not None and stories:
+            with phase('reuse'):
+                existing = {story_key(story): story for story in store.get_many(story_id(s) for s in stories)}
+                for story in stories:
+                    previous = existing.get(story_key(story))
+                    if previous is not None and is_presigned_url(previous.get('_presigned_url')):
+                        for field in PRESIGN_FIELDS:
+                            if field in previous:
+                                story[field] = previous[field]
+        yield stories
+
+    def dedupe(stories):
+        for story in stories:
+            key = story_key(story)
+            if key not in seen:
+                seen.add(key)
+                if scrape_writer is not None:
+                    scrape_writer.write({k: v for k, v in story.items() if k not in PRESIGN_FIELDS})
+                yield story
+
+    def presign(story):
+        with phase('presign'):
+            presign_story(story, config, expiration, skip_missing)
+        yield story
+
+    pipeline.add_stage('scan', scan, workers=max(1, len(stages)))
+    pipeline.add_stage('enrich', enrich)
+    pipeline.add_stage('dedupe', dedupe)
+    pipeline.add_stage('presign', presign, workers=presign_workers, queue_size=queue_size * 4)
+    return pipeline.run(stages)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Scrape and presign video stories in one streaming pass',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 stream_pipeline.py
+  python3 stream_pipeline.py --stages dev test
+  python3 stream_pipeline.py --presign-workers 32 --queue-size 128
+  python3 stream_pipeline.py --output all_video_stories.jsonl.gz --no-db
+
+Writes the same files as scrape_video_stories.py followed by
+generate_presigned_urls.py: <output>, <output>_presigned and its HTML report.
+        """
+    )
+    parser.add_argument('--stages', nargs='+', help='Stages to scrape (default: all in the config)')
+    parser.add_argument('--config', default='resources.json',
+                        help='Path to resources configuration file (default: resources.json)')
+    parser.add_argument('--output', '-o', default='all_video_stories.jsonl',
+                        help='Scraped dataset path; the presigned dataset is named after it '
+                             '(default: all_video_stories.jsonl)')
+    parser.add_argument('--expiration', type=int, default=DEFAULT_EXPIRATION,
+                        help=f'URL expiration time in seconds (default: {DEFAULT_EXPIRATION} = 30 days)')
+    parser.add_argument('--presign-workers', type=int, default=DEFAULT_PRESIGN_WORKERS,
+                        help=f'Concurrent presign workers (default: {DEFAULT_PRESIGN_WORKERS})')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f'Pages/stories buffered between phases (default: {DEFAULT_QUEUE_SIZE})')
+    parser.add_argument('--video-proxy', action='store_true',
+                        help='Play videos through serve.py --proxy in the HTML report')
+    parser.add_argument('--db', default=DEFAULT_DB, help=f'Story database to update (default: {DEFAULT_DB})')
+    parser.add_argument('--no-db', action='store_true', help="Don't read or update the story database")
+    parser.add_argument('--parquet', metavar='DIR',
+                        help='Also export the stories to a Parquet dataset (needs pyarrow)')
+    parser.add_argument('--stats', metavar='FILE',
+                        help='Also save the summary statistics, to merge or update with story_stats.py')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    print("🚀 GuardianGamer Video Stories Streaming Pipeline")
+    print("=" * 70)
+
+    config = load_resources_config(args.config)
+    stages = args.stages or list(config['stages'].keys())
+    unknown = [stage for stage in stages if stage not in config['stages']]
+    if unknown:
+        print(f"❌ Unknown stages: {', '.join(unknown)}")
+        return 1
+    print(f"📋 Stages: {', '.join(stages)}")
+
+    presigned_output = dataset_stem(Path(args.output).name) + '_presigned' + dataset_suffix(args.output)
+    presigned_output = str(Path(args.output).parent / presigned_output)
+    html_output = dataset_stem(presigned_output) + '.html'
+    store = None if args.no_db else StoryStore(args.db)
+    scraped_stages: List[str] = []
+    seen_keys: Set[Tuple[str, str, str]] = set()
+    count = available = 0
+    stats = StoryStats()
+    batch = []
+    pipeline = StreamPipeline(args.queue_size)
+
+    start = time.perf_counter()
+    first_story = None
+    with StoryWriter(args.output, cls=DecimalEncoder) as scrape_writer, \
+            StoryWriter(presigned_output, cls=DecimalEncoder) as presigned_writer:
+        for story in stream_presigned_stories(stages, config, scraped_stages, args.expiration,
+                                              presign_workers=args.presign_workers, store=store,
+                                              scrape_writer=scrape_writer, queue_size=args.queue_size,
+                                              pipeline=pipeline, seen_keys=seen_keys):
+            if first_story is None:
+                first_story = time.perf_counter() - start
+            with phase('write/dataset'):
+                presigned_writer.write(story)
+            count += 1
+            available += is_presigned_url(story.get('_presigned_url'))
+            stats.add(story)
+            if store is not None:
+                batch.append(story)
+                if len(batch) >= DEFAULT_BATCH_SIZE:
+                    with phase('write/store'):
+                        store.upsert_many(batch)
+                    batch = []
+            if count % 1000 == 0:
+                print(f"   Progress: {count} stories presigned ({time.perf_counter() - start:.1f}s)")
+    if store is not None:
+        with phase('write/store'):
+            store.upsert_many(batch)
+            removed = sum(store.delete_missing(stage, seen_keys) for stage in scraped_stages)
+        print(f"📚 Upserted {count} stories into: {args.db}"
+              + (f" (removed {removed} deleted stories)" if removed else ""))
+    elapsed = time.perf_counter() - start
+
+    if args.stats:
+        save_stats(stats, args.stats)
+        print(f"💾 Saved summary statistics to: {args.stats}")
+    stats = stats.to_dict()
+    print(f"\n{'=' * 70}")
+    print(f"✅ {stats['total_stories']} stories ({stats['unique_gamers']} gamers, "
+          f"{stats['unique_groups']} groups), {available} playable, in {elapsed:.1f}s"
+          + (f" (first story after {first_story:.2f}s)" if first_story is not None else ""))
+    for stage in pipeline.report():
+        print(f"   {stage['name']:<8} x{stage['workers']:<3} {stage['items_in']:>7} in  "
+              f"{stage['items_out']:>7} out  busy {stage['busy_seconds']:.1f}s  "
+              f"blocked {stage['blocked_seconds']:.1f}s")
+
+    # Streamed back from the presigned dataset rather than kept in memory
+    source = lambda: iter_stories(presigned_output)
+    if args.parquet:
+        with phase('write/parquet'):
+            written = write_parquet(source(), args.parquet)
+        print(f"📊 Exported {written} stories to Parquet: {args.parquet}")
+    with phase('render'):
+        generate_html_with_presigned_urls(source, html_output, video_proxy=args.video_proxy)
+
+    print(f"\n📂 Output files:")
+    print(f"   Scraped:   {args.output}")
+    print(f"   Presigned: {presigned_output}")
+    print(f"   HTML:      {html_output}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic video stories that match the real DynamoDB schema.
+
+Used by the load-testing harness (and anything else that needs realistic data
+without AWS access). Items look like raw scan results from the events table:
+
+- PK: P#<uuid> (parent)
+- SK: V#<timestamp>#<gamer_id>
+- GSI1PK: G#<uuid> (gamer), GSI1SK: V#<timestamp>
+- GSI2PK: VideoStory
+- participants: JSON-encoded list string, viewed: 'True'/'False'
+- Long AI-style descriptions
+
+Usage:
+    python3 synthetic_data.py --count 1000 --output synthetic_stories.jsonl
+"""
+
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from instrumentation import add_instrumentation_arguments, run_main
+from story_io import write_stories
+
+DEFAULT_STAGES = ['dev', 'test', 'dev-old', 'test-old', 'prod-old']
+
+_TOPICS = [
+    'building a castle', 'fixing the login issue', 'exploring a cave system', 'trading resources',
+    'planning a redstone circuit', 'defending the village', 'racing minecarts', 'organizing storage chests',
+    'negotiating team roles', 'recovering lost items', 'farming wheat', 'mapping the nether',
+]
+_SKILLS = [
+    'problem solving', 'teamwork', 'communication', 'persistence', 'creativity',
+    'leadership', 'conflict resolution', 'planning', 'patience', 'humor',
+]
+
+
+def _description(rng: random.Random) -> str:
+    """A long multi-sentence summary in the style of the generated descriptions"""
+    topic = rng.choice(_TOPICS)
+    skill_a, skill_b = rng.sample(_SKILLS, 2)
+    sentences = [
+        f" **{skill_a.title()}:** The players spent most of the session {topic}.",
+        f"They showed {skill_a} and {skill_b} while working through setbacks together.",
+        f"At one point they disagreed about {rng.choice(_TOPICS)}, then settled on a shared plan.",
+        "There were moments of light-hearted banter that kept the mood positive.",
+        f"Overall this highlights their {skill_b} and willingness to keep trying.",
+    ]
+    return ' '.join(sentences[:rng.randint(3, len(sentences))]) + '\n'
+
+
+def iter_synthetic_stories(count: int, stages: Optional[List[str]] = None, gamers: int = 30,
+                           parents: int = 25, groups: int = 40, seed: int = 42,
+                           start: Optional[datetime] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield raw video story items shaped like DynamoDB scan results
+
+    Args:
+        count: Number of stories to generate
+        stages: Stage names to spread stories across (tagged as _stage)
+        gamers: Number of distinct gamers
+        parents: Number of distinct parents
+        groups: Number of distinct groups
+        seed: Random seed, so runs are reproducible
+        start: Timestamp of the first story (default: 2025-01-01 UTC)
+
+    Yields:
+        dict: One video story item
+    """
+    rng = random.Random(seed)
+    stages = stages or DEFAULT_STAGES
+    id_rng = random.Random(seed + 1)
+
+    def make_ids(prefix, n):
+        return [f"{prefix}#{uuid.UUID(int=id_rng.getrandbits(128), version=4)}" for _ in range(n)]
+
+    gamer_ids = make_ids('G', gamers)
+    parent_ids = make_ids('P', parents)
+    group_ids = make_ids('F', groups)
+
+    current = start or datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    for i in range(count):
+        # Stories come in bursts (sessions) separated by longer gaps
+        current += timedelta(seconds=rng.randint(60, 400) if rng.random() < 0.9 else rng.randint(3600, 86400))
+        timestamp = current.strftime('%Y-%m-%dT%H:%M:%S.') + f"{current.microsecond // 1000:03d}Z"
+        gamer = rng.choice(gamer_ids)
+        group = rng.choice(group_ids)
+        participants = [gamer] + rng.sample(gamer_ids, rng.randint(0, 3))
+        gamer_uuid = gamer[2:]
+
+        story = {
+            'PK': rng.choice(parent_ids),
+            'SK': f"V#{timestamp}#{gamer}",
+            'GSI1PK': gamer,
+            'GSI1SK': f"V#{timestamp}",
+            'GSI2PK': 'VideoStory',
+            'type': 'VideoStory',
+            'timestamp': timestamp,
+            'video_url': f"videos/{gamer_uuid}/{timestamp.replace(':', '-')}.mp4",
+            'description': _description(rng),
+            'group': group,
+            'participants': json.dumps(list(dict.fromkeys(participants))),
+            'viewed': 'True' if rng.random() < 0.4 else 'False',
+            '_stage': stages[i % len(stages)],
+        }
+        if rng.random() < 0.7:
+            story['thumbnail_url'] = f"thumbnails/{gamer_uuid}/{timestamp.replace(':', '-')}.jpg"
+        if rng.random() < 0.5:
+            game_end = current + timedelta(seconds=rng.randint(120, 900))
+            story['gameserver_id'] = f"gs-{rng.randint(1, 20):03d}"
+            story['game_start'] = current.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+            story['game_end'] = game_end.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        yield story
+
+
+def generate_synthetic_stories(count: int, **kwargs) -> List[Dict[str, Any]]:
+    """List form of iter_synthetic_stories()"""
+    return list(iter_synthetic_stories(count, **kwargs))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generate synthetic video stories matching the DynamoDB schema',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python3 synthetic_data.py --count 1000
+  python3 synthetic_data.py --count 100000 --output big.jsonl.gz --seed 7
+        """
+    )
+    parser.add_argument('--count', type=int, default=1000, help='Number of stories (default: 1000)')
+    parser.add_argument('--stages', nargs='+', help='Stages to spread stories across')
+    parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--output', '-o', default='synthetic_stories.jsonl',
+                        help='Output dataset; .jsonl, .jsonl.gz, .jsonl.zst or legacy .json '
+                             '(default: synthetic_stories.jsonl)')
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+
+    stories = iter_synthetic_stories(args.count, stages=args.stages, seed=args.seed)
+    count = write_stories(stories, args.output)
+    print(f"💾 Saved {count} synthetic video stories to: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(run_main(main))
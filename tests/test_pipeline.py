@@ -0,0 +1,195 @@
+"""Stage staleness rules of pipeline.py, with small scripts standing in for the tools"""
+
+import argparse
+import json
+import os
+
+import pytest
+
+import pipeline
+from local_aws import LocalS3Server
+from scrape_video_stories import enrich_story
+from story_ids import story_id
+from story_io import iter_stories, write_stories
+from synthetic_data import generate_synthetic_stories
+
+# Copies its input to its output (upper-cased with --upper) and logs the run
+COPY_SCRIPT = '''
+import sys
+from helper import log_run
+
+args = sys.argv[1:]
+upper = '--upper' in args
+if '--fail' in args:
+    sys.exit(3)
+source, target = [arg for arg in args if not arg.startswith('--')]
+with open(source) as f:
+    text = f.read()
+with open(target, 'w') as f:
+    f.write(text.upper() if upper else text)
+log_run(sys.argv[0])
+'''
+HELPER = '''
+import os
+
+def log_run(script):
+    with open('runs.log', 'a') as f:
+        f.write(os.path.basename(script) + '\\n')
+'''
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """A repo of two copy scripts, run from tmp_path: in.txt -> mid.txt -> out.txt"""
+    code = tmp_path / 'code'
+    code.mkdir()
+    (code / 'first.py').write_text(COPY_SCRIPT)
+    (code / 'second.py').write_text(COPY_SCRIPT)
+    (code / 'helper.py').write_text(HELPER)
+    monkeypatch.setattr(pipeline, 'REPO_DIR', str(code))
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'in.txt').write_text('hello')
+    return tmp_path
+
+
+def stages(first_args=(), max_age=None):
+    return [
+        {'name': 'first', 'script': 'first.py', 'args': ['in.txt', 'mid.txt', *first_args],
+         'inputs': ['in.txt'], 'outputs': ['mid.txt'], 'after': [], 'max_age': max_age},
+        {'name': 'second', 'script': 'second.py', 'args': ['mid.txt', 'out.txt', '--upper'],
+         'inputs': ['mid.txt'], 'outputs': ['out.txt'], 'after': ['first'], 'max_age': None},
+    ]
+
+
+def run(**kwargs):
+    """Run the pipeline, returning (exit code, scripts that ran)"""
+    before = runs()
+    code = pipeline.run_pipeline(kwargs.pop('stages', None) or stages(), 'second', kwargs.pop('force', []),
+                                 **kwargs)
+    return code, runs()[len(before):]
+
+
+def runs():
+    return open('runs.log').read().split() if os.path.exists('runs.log') else []
+
+
+def test_runs_once_then_up_to_date(repo):
+    assert run() == (0, ['first.py', 'second.py'])
+    assert (repo / 'out.txt').read_text() == 'HELLO'
+    assert run() == (0, [])
+
+
+def test_changed_input_reruns_only_what_it_changes(repo):
+    run()
+    (repo / 'in.txt').write_text('world')
+    assert run() == (0, ['first.py', 'second.py'])
+    assert (repo / 'out.txt').read_text() == 'WORLD'
+
+    # Same content, new mtime: rehashed, still up to date
+    (repo / 'in.txt').write_text('world')
+    os.utime(repo / 'in.txt', (1, 1))
+    assert run() == (0, [])
+
+
+def test_identical_upstream_output_keeps_downstream(repo):
+    run()
+    assert run(force=['first']) == (0, ['first.py'])
+
+
+def test_modified_or_missing_output_reruns(repo):
+    run()
+    (repo / 'out.txt').write_text('tampered')
+    assert run() == (0, ['second.py'])
+    os.unlink(repo / 'mid.txt')
+    assert run() == (0, ['first.py'])
+
+
+def test_code_and_option_changes(repo):
+    run()
+    with open(repo / 'code' / 'helper.py', 'a') as f:
+        f.write('\n# changed\n')
+    assert run() == (0, ['first.py', 'second.py'])
+
+    changed = stages(first_args=['--upper'])
+    assert run(stages=changed) == (0, ['first.py', 'second.py'])
+    assert (repo / 'mid.txt').read_text() == 'HELLO'
+
+
+def test_stale_reasons(repo):
+    hasher = pipeline.FileHasher()
+    first = stages(max_age=60)[0]
+    assert pipeline.stale_reason(first, pipeline.stage_fingerprint(first, hasher), None, hasher, 0) == 'never run'
+
+    run(stages=stages(max_age=60))
+    state = pipeline.load_state()
+    previous = state['stages']['first']
+    fingerprint = pipeline.stage_fingerprint(first, hasher)
+    finished = previous['finished']
+    assert pipeline.stale_reason(first, fingerprint, previous, hasher, finished + 30) is None
+    assert pipeline.stale_reason(first, fingerprint, previous, hasher, finished + 90) == 'last run 90s ago'
+
+    (repo / 'code' / 'first.py').write_text(COPY_SCRIPT + '\n')
+    assert (pipeline.stale_reason(first, pipeline.stage_fingerprint(first, hasher), previous, hasher, finished)
+            == 'code changed (first.py)')
+    os.unlink(repo / 'in.txt')
+    assert (pipeline.stale_reason(first, pipeline.stage_fingerprint(first, hasher), previous, hasher, finished)
+            == 'in.txt missing')
+
+
+def test_dry_run_marks_dependents(repo, capsys):
+    run()
+    (repo / 'in.txt').write_text('changed')
+    capsys.readouterr()
+    assert run(dry_run=True) == (0, [])
+    output = capsys.readouterr().out
+    assert 'first: would run (in.txt changed)' in output
+    assert 'second: would run (after first)' in output
+
+    run()
+    capsys.readouterr()
+    run(dry_run=True)
+    assert 'would run' not in capsys.readouterr().out
+
+
+def test_failed_stage_stops_and_is_retried(repo):
+    failing = stages(first_args=['--fail'])
+    assert run(stages=failing) == (3, [])
+    assert 'first' not in pipeline.load_state()['stages']
+    assert run() == (0, ['first.py', 'second.py'])
+
+
+def test_presign_stage_signs_new_stories(tmp_path, monkeypatch):
+    """The real presign stage, rerun after the dataset gains a story, against the local S3 stand-in"""
+    bucket = tmp_path / 's3' / 'bucket-dev'
+    bucket.mkdir(parents=True)
+    server = LocalS3Server(str(tmp_path / 's3'))
+    server.start_in_background()
+    monkeypatch.setenv('AWS_ENDPOINT_URL', server.endpoint_url)
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'resources.json').write_text(json.dumps({'stages': {
+        'dev': {'region': 'us-east-1', 'dynamodb_table': 'GGEventsTable-dev', 's3_bucket': 'bucket-dev'}}}))
+
+    stories = [enrich_story(story) for story in generate_synthetic_stories(3, stages=['dev'])]
+    for story in stories:
+        path = bucket / story['_video_url']
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'video')
+
+    args = argparse.Namespace(config='resources.json', output='all_video_stories.jsonl', stages=None,
+                              expiration=pipeline.DEFAULT_EXPIRATION, scrape_max_age=60,
+                              favorites='demo_favorites.json', demo_dir='demo-assets')
+    presign = [dict(stage, after=[]) for stage in pipeline.define_stages(args) if stage['name'] == 'presign']
+    try:
+        write_stories(stories[:2], 'all_video_stories.jsonl')
+        assert pipeline.run_pipeline(presign, 'presign', []) == 0
+        write_stories(stories, 'all_video_stories.jsonl')
+        assert pipeline.run_pipeline(presign, 'presign', []) == 0
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    signed = list(iter_stories('all_video_stories_presigned.jsonl'))
+    assert [story_id(story) for story in signed] == [story_id(story) for story in stories]
+    assert all(story['_presigned_url'].startswith(server.endpoint_url) for story in signed)
@@ -0,0 +1,126 @@
+"""serve.py's story API and its metrics, against a small story store"""
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import serve
+from scrape_video_stories import enrich_story
+from story_ids import story_id
+from story_store import StoryStore
+from synthetic_data import generate_synthetic_stories
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    store = StoryStore(str(tmp_path_factory.mktemp('store') / 'stories.db'))
+    store.upsert_many(enrich_story(story) for story in generate_synthetic_stories(300))
+    store.upsert_demo_stories({'demo_id': f'demostory{n:03d}'} for n in (1000, 101, 7, 99))
+    serve.register_story_store_metrics(store)
+    handler = type('Handler', (serve.CustomHandler,), {
+        'story_store': store,
+        'log_message': lambda self, *args: None,
+    })
+    server = serve.ThreadingServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield f'http://{host}:{port}'
+    server.shutdown()
+    server.server_close()
+
+
+def get(url: str):
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+def get_json(url: str):
+    status, body = get(url)
+    return status, json.loads(body)
+
+
+def test_search_limit_is_clamped(api):
+    for limit, expected in (('-1', 1), ('0', 1), ('2', 2), ('100000', None)):
+        status, body = get_json(f'{api}/api/search?q=the&limit={limit}')
+        assert status == 200
+        if expected is not None:
+            assert len(body['results']) == expected
+        assert len(body['results']) <= serve.API_MAX_LIMIT
+    assert get_json(f'{api}/api/search?q=the&limit=x')[0] == 400
+
+
+def test_stories_paging(api):
+    status, body = get_json(f'{api}/api/stories?limit=5&offset=10&stage=dev')
+    assert status == 200
+    assert len(body['stories']) == 5
+    assert all(story['_stage'] == 'dev' for story in body['stories'])
+    assert get_json(f'{api}/api/stories?limit=-1')[0] == 400
+    assert get_json(f'{api}/api/stories?bogus=1')[0] == 400
+
+    status, story = get_json(f'{api}/api/stories/{story_id(body["stories"][0])}')
+    assert (status, story) == (200, body['stories'][0])
+    assert get_json(f'{api}/api/stories/nope')[0] == 404
+
+
+def test_demo_stories_in_numeric_order(api):
+    status, body = get_json(f'{api}/api/demo-stories')
+    assert [story['demo_id'] for story in body] == ['demostory007', 'demostory099', 'demostory101',
+                                                    'demostory1000']
+
+
+def test_api_metrics(api):
+    get(f'{api}/api/search?q=boss')
+    get(f'{api}/api/stories?limit=3')
+    status, body = get(f'{api}/metrics')
+    metrics = body.decode('utf-8')
+    assert status == 200
+    assert 'serve_story_store_duration_seconds_count{operation="search"}' in metrics
+    assert 'serve_story_store_duration_seconds_count{operation="query"}' in metrics
+    assert 'serve_story_store_duration_seconds_count{operation="count"}' in metrics
+    assert 'serve_api_results_total{operation="query"}' in metrics
+    assert 'serve_story_store_search_index_build_seconds' in metrics
+
+
+def bytes_sent(route: str) -> float:
+    return serve.BYTES_SENT._values.get((route,), 0)
+
+
+def wait_for_bytes(route: str, expected: float):
+    # The handler records a request after its body is out, so the client can get there first
+    deadline = time.monotonic() + 5
+    while bytes_sent(route) != expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert bytes_sent(route) == expected
+
+
+def test_bytes_sent_are_the_bytes_written(api):
+    before = bytes_sent('api')
+    _, body = get(f'{api}/api/stories?limit=7')
+    wait_for_bytes('api', before + len(body))
+
+    before = bytes_sent('metrics')
+    _, body = get(f'{api}/metrics')
+    wait_for_bytes('metrics', before + len(body))
+
+    # Error pages are written by send_error(); HEAD gets their headers only
+    route = serve.route_for('/missing.txt')
+    before = bytes_sent(route)
+    status, body = get(f'{api}/missing.txt')
+    assert status == 404 and body
+    wait_for_bytes(route, before + len(body))
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(urllib.request.Request(f'{api}/missing.txt', method='HEAD'), timeout=10)
+    wait_for_bytes(route, before + len(body))
+
+
+def test_metrics_with_a_query_string(api):
+    status, body = get(f'{api}/metrics?format=text')
+    assert status == 200
+    assert 'serve_http_response_bytes_total' in body.decode('utf-8')
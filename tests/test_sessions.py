@@ -0,0 +1,73 @@
+"""Sessionizing stories (sessions.py)"""
+
+import random
+import time
+
+import pytest
+
+from sessions import sessionize, story_partition
+from synthetic_data import generate_synthetic_stories
+
+
+def summary(sessions):
+    return [(session['key'], session['start'], session['end'], [story['SK'] for story in session['stories']])
+            for session in sessions]
+
+
+def story(sk, start, end=None, gamer='G#1', stage='dev'):
+    result = {'SK': sk, '_stage': stage, 'GSI1PK': gamer, 'timestamp': start}
+    if end:
+        result.update(game_start=start, game_end=end)
+    return result
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_result_does_not_depend_on_input_order(seed):
+    stories = generate_synthetic_stories(2000, gamers=12, stages=['dev', 'prod'])
+    stories += [story('V#bad#G#1', 'not a timestamp'), story('V#empty#G#2', '')]
+    expected = summary(sessionize(stories, 600, partition=story_partition))
+
+    shuffled = list(stories)
+    random.Random(seed).shuffle(shuffled)
+    undated = [s for s in shuffled if s['SK'] in ('V#bad#G#1', 'V#empty#G#2')]
+    result = summary(sessionize(shuffled, 600, partition=story_partition))
+
+    # Undated stories come last, in input order; everything else is identical
+    assert result[:-2] == expected[:-2]
+    assert [sk for *_, (sk,) in result[-2:]] == [s['SK'] for s in undated]
+    assert sum(len(sks) for *_, sks in result) == len(stories)
+
+
+def test_gap_and_overlap():
+    stories = [
+        story('a', '2025-01-01T10:00:00Z', '2025-01-01T10:30:00Z'),
+        story('b', '2025-01-01T10:20:00Z'),                          # inside a
+        story('c', '2025-01-01T10:39:00Z'),                          # 9 minutes after a ends
+        story('d', '2025-01-01T11:00:00Z'),                          # 21 minutes later
+        story('e', '2025-01-01T10:05:00Z', gamer='G#2'),             # another partition
+    ]
+    sessions = summary(sessionize(stories, 600, partition=story_partition))
+    assert sessions == [
+        (('dev', 'G#1'), '2025-01-01T10:00:00Z', '2025-01-01T10:39:00Z', ['a', 'b', 'c']),
+        (('dev', 'G#1'), '2025-01-01T11:00:00Z', '2025-01-01T11:00:00Z', ['d']),
+        (('dev', 'G#2'), '2025-01-01T10:05:00Z', '2025-01-01T10:05:00Z', ['e']),
+    ]
+
+
+@pytest.fixture
+def non_utc_local_time(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_naive_timestamps_are_utc(non_utc_local_time):
+    stories = [
+        story('naive', '2025-01-01T10:00:00'),
+        story('utc', '2025-01-01T10:05:00Z'),
+        story('offset', '2025-01-01T12:10:00+02:00'),
+    ]
+    sessions = summary(sessionize(stories, 600))
+    assert [sks for *_, sks in sessions] == [['naive', 'utc', 'offset']]
@@ -0,0 +1,52 @@
+"""Streaming dataset reads (story_io)"""
+
+import io
+import json
+
+import pytest
+
+import story_io
+
+STORIES = [
+    {'SK': 'V#1700000000#gamer-1', 'description': 'Boss fight 🐉 [part 1], "best" one', 'participants': '[]'},
+    {'SK': 'V#1700000001#gamer-2', 'nested': {'a': [1, 2, {'b': '}]'}], 'c': None}, 'viewed': 'True'},
+    {},
+    {'SK': 'V#1700000002#gamer-3', 'description': '\\u escapes é中 and a long tail ' + 'x' * 300},
+]
+
+
+def decode(text: str, chunk_size: int):
+    story_io.READ_CHUNK_SIZE = chunk_size
+    return list(story_io._iter_json_array(io.BytesIO(text.encode('utf-8'))))
+
+
+@pytest.fixture(autouse=True)
+def restore_chunk_size(monkeypatch):
+    monkeypatch.setattr(story_io, 'READ_CHUNK_SIZE', story_io.READ_CHUNK_SIZE)
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 64, 1024 * 1024])
+def test_json_array_across_chunk_boundaries(indent, chunk_size):
+    text = '\n ' + json.dumps(STORIES, indent=indent, ensure_ascii=False) + '\n'
+    assert decode(text, chunk_size) == STORIES
+
+
+@pytest.mark.parametrize('text', ['[]', ' [ ] ', '[\n]\n'])
+@pytest.mark.parametrize('chunk_size', [1, 4, 1024])
+def test_empty_json_array(text, chunk_size):
+    assert decode(text, chunk_size) == []
+
+
+@pytest.mark.parametrize('text', ['', '{"SK": "x"}', '[{"SK": "x"}', '[{"SK": "x"},', '[{"SK": "x"}, {"SK"'])
+@pytest.mark.parametrize('chunk_size', [1, 3, 1024])
+def test_invalid_json_array(text, chunk_size):
+    with pytest.raises(ValueError):
+        decode(text, chunk_size)
+
+
+@pytest.mark.parametrize('suffix', ['.json', '.jsonl', '.jsonl.gz'])
+def test_write_then_iter_stories(tmp_path, suffix):
+    path = str(tmp_path / f'stories{suffix}')
+    story_io.write_stories(STORIES, path)
+    assert list(story_io.iter_stories(path)) == STORIES
@@ -0,0 +1,46 @@
+"""Fetching favorites by story ID from the local DynamoDB stand-in"""
+
+import pytest
+
+from local_aws import LocalDynamoDBServer, stage_tables
+from prepare_demo_assets import unresolved_ids
+from scrape_video_stories import enrich_story
+from story_ids import story_id
+from story_lookup import fetch_stories_by_ids
+from synthetic_data import generate_synthetic_stories
+
+CONFIG = {'stages': {
+    'dev': {'region': 'us-east-1', 'dynamodb_table': 'GGEventsTable-dev', 's3_bucket': 'bucket-dev'},
+    'dev-old': {'region': 'us-west-2', 'dynamodb_table': 'GGEventsTable-dev', 's3_bucket': 'bucket-old'},
+}}
+
+
+@pytest.fixture
+def dynamodb(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    stories = generate_synthetic_stories(200, stages=['dev', 'dev-old'], gamers=5)
+    # Recorded as created_at rather than timestamp, as older items are
+    stories[7]['created_at'] = stories[7].pop('timestamp')
+    server = LocalDynamoDBServer()
+    server.load_stories(stories, stage_tables=stage_tables(CONFIG))
+    server.start_in_background()
+    yield [enrich_story(dict(story)) for story in stories], server.endpoint_url
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_by_ids(dynamodb):
+    stories, endpoint = dynamodb
+    picked = [stories[i] for i in (7, 3, 150, 42)]
+    ids = [story_id(story) for story in picked]
+    unknown = 'dev_G_00000000-0000-4000-8000-000000000000_2025-01-01T00_00_00_000Z'
+
+    found = fetch_stories_by_ids(ids + [unknown, 'not-an-id', ids[0]], CONFIG, workers=4, endpoint_url=endpoint)
+
+    assert [story['_computed_story_id'] for story in found] == ids
+    for story, expected in zip(found, picked):
+        assert story['SK'] == expected['SK']
+        assert story['_created'] == expected['_created']
+        assert story['_region'] == CONFIG['stages'][expected['_stage']]['region']
+    assert unresolved_ids(ids + [unknown], found) == [unknown]
@@ -0,0 +1,97 @@
+"""StoryRecord against the dict pipeline it replaces (scan, then enrich_story)"""
+
+import pytest
+
+from scrape_video_stories import enrich_story
+from story_record import StoryRecord, story_dict
+from synthetic_data import iter_synthetic_stories
+
+SCAN = ('dev', 'us-east-1', 'GGEventsTable-dev')
+
+EDGE_ITEMS = [
+    {'PK': 'P#1', 'SK': 'V#2025-01-01T00:00:00.000Z#G#a#b', 'participants': 'not json'},
+    {'PK': 'P#1', 'SK': 'not-a-video', 'created_at': '2025-01-01', 'video_key': 'k.mp4'},
+    {'PK': 'P#1', 'SK': 'V#only-two', 's3_key': 's.mp4', 'GSI1PK': 'G#x', 'participants': ['G#x']},
+    {'PK': 'P#1', 'SK': 'V#t#G#y', 'gameserver_id': 'gs-1', 'game_start': 's', 'game_end': 'e',
+     'viewed': 'True', 'description': None},
+    {'SK': 'V#t#G#z', '_stage': 'raw-stage', '_description': 'raw description'},
+]
+
+
+def legacy_enriched(item, stage, region, table):
+    story = dict(item)
+    story['_stage'] = stage
+    story['_region'] = region
+    story['_table'] = table
+    return enrich_story(story)
+
+
+def items():
+    for story in iter_synthetic_stories(300, seed=7):
+        story.pop('_stage')
+        yield story
+    yield from iter_synthetic_stories(20, seed=8)  # with a raw _stage
+    yield from EDGE_ITEMS
+
+
+@pytest.mark.parametrize('item', list(items()))
+def test_to_dict_matches_enrich_story(item):
+    expected = legacy_enriched(item, *SCAN)
+    record = StoryRecord.from_item(item, *SCAN)
+
+    assert list(record.to_dict().items()) == list(expected.items())
+    assert list(record) == list(expected)
+    assert len(record) == len(expected)
+    assert record.items() == list(expected.items())
+    for key, value in expected.items():
+        assert record[key] == value
+        assert record.get(key) == value
+    assert record.get('_missing', 'default') == 'default'
+
+
+def test_from_dict_round_trip():
+    for item in list(items())[:50] + EDGE_ITEMS:
+        exported = legacy_enriched(item, *SCAN)
+        exported['_presigned_url'] = 'https://example/presigned'
+        assert story_dict(StoryRecord.from_dict(exported)) == exported
+
+
+def test_set_fields_and_copies():
+    item = EDGE_ITEMS[0]
+    record = StoryRecord.from_item(item, *SCAN)
+    copy = record.copy()
+
+    record['_presigned_url'] = 'url'
+    record['SK'] = 'V#2026-01-01T00:00:00.000Z#G#new'
+    assert record['_gamer_extracted'] == 'G#new'
+    assert record['_timestamp_extracted'] == '2026-01-01T00:00:00.000Z'
+
+    assert '_presigned_url' not in copy
+    assert copy['_gamer_extracted'] == 'G#a#b'
+    assert copy.to_dict() == legacy_enriched(item, *SCAN)
+
+    del record['_presigned_url']
+    with pytest.raises(KeyError):
+        del record['_presigned_url']
+    with pytest.raises(KeyError):
+        del record['SK']
+
+    expected = legacy_enriched(dict(item, participants='["G#p"]'), *SCAN)
+    record = StoryRecord.from_item(item, *SCAN)
+    assert record['_participants'] == []
+    record['participants'] = '["G#p"]'
+    assert record.to_dict() == expected
+
+
+def test_writes_to_shadowed_attributes():
+    item = EDGE_ITEMS[-1]
+    record = StoryRecord.from_item(item, *SCAN)
+    expected = legacy_enriched(item, *SCAN)
+
+    for key, value in (('_description', 'new'), ('_stage', 'prod'), ('_presigned_url', 'url')):
+        record[key] = value
+        expected[key] = value
+        assert record[key] == value
+        assert record.get(key) == value
+    assert list(record.to_dict().items()) == list(expected.items())
+    assert story_dict(StoryRecord.from_dict(record.to_dict())) == expected
@@ -0,0 +1,111 @@
+"""HyperLogLog sketches and StoryStats merging and state round trips"""
+
+import json
+
+import pytest
+
+from story_stats import HyperLogLog, StoryStats, generate_stats
+from synthetic_data import generate_synthetic_stories
+
+PRECISION = 8  # sparse up to 16 distinct values
+
+
+def sketch_of(values, precision=PRECISION) -> HyperLogLog:
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def values(start, stop):
+    return [f"G#{i}" for i in range(start, stop)]
+
+
+# (left, right) value ranges: sparse/sparse, sparse/sparse crossing the limit,
+# sparse/dense, dense/sparse, dense/dense, overlapping
+MERGES = [((0, 5), (3, 9)), ((0, 10), (10, 20)), ((0, 5), (0, 400)), ((0, 400), (390, 395)),
+          ((0, 300), (200, 900)), ((0, 0), (0, 50))]
+
+
+@pytest.mark.parametrize('left,right', MERGES)
+def test_merge_matches_sketch_of_union(left, right):
+    merged = sketch_of(values(*left))
+    merged.merge(sketch_of(values(*right)))
+    union = sketch_of(values(*left) + values(*right))
+    assert merged.to_state() == union.to_state()
+    assert merged.count() == union.count()
+
+
+def test_merge_is_idempotent_and_commutative():
+    a, b = sketch_of(values(0, 300)), sketch_of(values(100, 200))
+    ab = sketch_of(values(0, 300))
+    ab.merge(b)
+    ba = sketch_of(values(100, 200))
+    ba.merge(a)
+    assert ab.to_state() == ba.to_state() == a.to_state()
+
+    again = sketch_of(values(0, 300))
+    again.merge(sketch_of(values(0, 300)))
+    assert again.to_state() == a.to_state()
+
+
+def test_merge_rejects_other_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(8).merge(HyperLogLog(9))
+
+
+@pytest.mark.parametrize('distinct', [0, 1, 16, 17, 5000])
+def test_state_round_trip(distinct):
+    sketch = sketch_of(values(0, distinct) * 2)
+    state = json.loads(json.dumps(sketch.to_state()))
+    restored = HyperLogLog.from_state(state, PRECISION)
+    assert restored.to_state() == sketch.to_state()
+    assert restored.count() == sketch.count()
+    if distinct <= 16:
+        assert restored.count() == distinct
+
+    restored.add('G#new')
+    sketch.add('G#new')
+    assert restored.to_state() == sketch.to_state()
+
+
+def test_state_of_other_precision_is_rejected():
+    state = sketch_of(values(0, 1000)).to_state()
+    with pytest.raises(ValueError):
+        HyperLogLog.from_state(state, PRECISION + 1)
+
+
+def test_dense_estimate_is_close():
+    count = sketch_of(values(0, 50000), precision=14).count()
+    assert abs(count - 50000) / 50000 < 0.03
+
+
+def test_story_stats_shards_merge_to_whole():
+    stories = generate_synthetic_stories(600, gamers=40, parents=30, groups=20)
+    whole = generate_stats(stories, precision=PRECISION)
+
+    merged = StoryStats(PRECISION)
+    for shard in (stories[:100], stories[100:450], stories[450:]):
+        merged.merge(StoryStats.from_state(json.loads(json.dumps(generate_stats(shard, PRECISION).to_state()))))
+
+    assert merged.to_state() == whole.to_state()
+    assert merged.to_dict() == whole.to_dict()
+    assert merged.daily() == whole.daily()
+    # Exact while the sketches are sparse
+    exact = generate_stats(stories).to_dict()
+    assert exact['unique_gamers'] == len({story['GSI1PK'] for story in stories})
+    assert exact['unique_parents'] == len({story['PK'] for story in stories})
+
+
+def test_story_stats_state_round_trip():
+    stats = generate_stats(generate_synthetic_stories(200), precision=PRECISION)
+    restored = StoryStats.from_state(json.loads(json.dumps(stats.to_state())))
+    assert restored.to_state() == stats.to_state()
+    assert restored.to_dict() == stats.to_dict()
+
+    with pytest.raises(ValueError):
+        StoryStats.from_state(dict(stats.to_state(), version=0))
+    state = stats.to_state()
+    del state['sketches']
+    with pytest.raises(ValueError):
+        StoryStats.from_state(state)
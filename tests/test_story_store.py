@@ -0,0 +1,63 @@
+"""The SQLite story store: row keys, per-parent items and schema migration"""
+
+import sqlite3
+
+from scrape_video_stories import enrich_story
+from story_ids import story_id
+from story_store import StoryStore, story_key
+
+
+def story(pk: str, description: str = 'clip', **fields):
+    item = {'PK': pk, 'SK': 'V#2025-11-24T18:03:11.123Z#G#gamer-1', 'GSI1PK': 'G#gamer-1',
+            'timestamp': '2025-11-24T18:03:11.123Z', 'description': description, 'viewed': 'False', **fields}
+    return enrich_story(dict(item, _stage='dev'))
+
+
+def test_parents_sharing_a_video_keep_a_row_each(tmp_path):
+    store = StoryStore(str(tmp_path / 'stories.db'))
+    first, second = story('P#1', viewed='True'), story('P#2', description='other parent')
+    assert story_id(first) == story_id(second)
+
+    assert store.upsert_many([first, second]) == 2
+    assert store.count() == 2
+    assert store.count(pk='P#1') == 1 and store.count(pk='P#2') == 1
+    assert [s['PK'] for s in store.get_many([story_id(first)])] == ['P#1', 'P#2']
+    by_pk = {s['PK']: s for s in store.iter_stories()}
+    assert by_pk['P#1']['viewed'] == 'True' and by_pk['P#2']['viewed'] == 'False'
+    assert [result['story']['PK'] for result in store.search('other parent')] == ['P#2']
+
+    # Upserting an item again updates its own row only
+    assert store.upsert_many([story('P#1', _presigned_url='https://example.com/a')]) == 1
+    assert store.count() == 2
+    assert [s['PK'] for s in store.query(available=True)] == ['P#1']
+
+    # A full scrape that no longer finds one parent's item removes just that row
+    assert store.delete_missing('dev', [story_key(first)]) == 1
+    assert [s['PK'] for s in store.iter_stories()] == ['P#1']
+
+
+def test_export_keeps_every_parent(tmp_path):
+    store = StoryStore(str(tmp_path / 'stories.db'))
+    store.upsert_many([story('P#1'), story('P#2')])
+    assert store.export_json(str(tmp_path / 'out.jsonl')) == 2
+
+
+def test_story_id_keyed_databases_are_migrated(tmp_path):
+    path = str(tmp_path / 'stories.db')
+    old = story('P#1', description='fixed the login issue')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE stories (story_id TEXT PRIMARY KEY, stage TEXT, pk TEXT, sk TEXT, gamer TEXT, grp TEXT,
+                              timestamp TEXT, available INTEGER, presign_expires INTEGER, data TEXT NOT NULL);
+        CREATE INDEX stories_stage ON stories (stage, timestamp);
+    """)
+    conn.execute("INSERT INTO stories (story_id, stage, pk, sk, data) VALUES (?, 'dev', 'P#1', ?, "
+                 "'{\"PK\": \"P#1\", \"_description\": \"fixed the login issue\"}')", (story_id(old), old['SK']))
+    conn.commit()
+    conn.close()
+
+    store = StoryStore(path)
+    assert store.count() == 1
+    assert [result['story']['PK'] for result in store.search('login')] == ['P#1']
+    store.upsert_many([story('P#2')])
+    assert store.count() == 2 and store.count(pk='P#1') == 1
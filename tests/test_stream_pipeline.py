@@ -0,0 +1,55 @@
+"""The streaming scrape-and-presign pipeline, against the local DynamoDB and S3 stand-ins"""
+
+import pytest
+
+import aws_clients
+from local_aws import LocalDynamoDBServer, LocalS3Server, stage_tables
+from scrape_video_stories import enrich_story
+from story_store import story_key
+from stream_pipeline import stream_presigned_stories
+from synthetic_data import generate_synthetic_stories
+
+CONFIG = {'stages': {
+    'dev': {'region': 'us-east-1', 'dynamodb_table': 'GGEventsTable-dev', 's3_bucket': 'bucket-dev'},
+}}
+
+
+@pytest.fixture
+def aws(tmp_path, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    stories = generate_synthetic_stories(20, stages=['dev'])
+    # The same video under a second parent
+    stories.append(dict(stories[3], PK=stories[3]['PK'] + '-other'))
+    bucket = tmp_path / 'bucket-dev'
+    for story in stories:
+        path = bucket / enrich_story(dict(story))['_video_url']
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'video')
+
+    dynamodb = LocalDynamoDBServer()
+    dynamodb.load_stories(stories, stage_tables=stage_tables(CONFIG))
+    s3 = LocalS3Server(str(tmp_path))
+    servers = [dynamodb, s3]
+    for server in servers:
+        server.start_in_background()
+    monkeypatch.setenv('AWS_ENDPOINT_URL_DYNAMODB', dynamodb.endpoint_url)
+    monkeypatch.setenv('AWS_ENDPOINT_URL_S3', s3.endpoint_url)
+    # Clients made here pick the endpoints up from the environment: keep them out of the shared cache
+    monkeypatch.setattr(aws_clients, '_sessions', {})
+    monkeypatch.setattr(aws_clients, '_clients', {})
+    yield [enrich_story(dict(story, _stage='dev')) for story in stories]
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_keeps_every_parent_of_a_shared_video(aws):
+    scraped_stages, seen_keys = [], set()
+    streamed = list(stream_presigned_stories(['dev'], CONFIG, scraped_stages, presign_workers=4,
+                                             seen_keys=seen_keys))
+
+    assert sorted(map(story_key, streamed)) == sorted(map(story_key, aws))
+    assert seen_keys == set(map(story_key, aws))
+    assert scraped_stages == ['dev']
+    assert all(story['_presigned_url'] for story in streamed)
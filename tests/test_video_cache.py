@@ -0,0 +1,282 @@
+"""VideoCache and serve.py's video proxy, against the local S3 stand-in"""
+
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from local_aws import LocalS3Server
+from serve import BYTES_SENT, CustomHandler, ThreadingServer, VideoProxy
+from video_cache import FillError, VideoCache
+
+BUCKET = 'videos'
+CONFIG = {'stages': {'dev': {'s3_bucket': BUCKET, 'region': 'us-east-1'}}}
+
+
+def video_bytes(size: int, seed: int = 0) -> bytes:
+    return bytes((seed + i * 7) % 251 for i in range(size))
+
+
+@pytest.fixture
+def s3(tmp_path, monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'test')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'test')
+    root = tmp_path / 's3'
+    (root / BUCKET).mkdir(parents=True)
+    server = LocalS3Server(str(root))
+    server.start_in_background()
+    yield root / BUCKET, server.endpoint_url
+    server.shutdown()
+    server.server_close()
+
+
+def put(bucket_dir, key: str, data: bytes):
+    path = bucket_dir / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+
+
+def read_all(cached) -> bytes:
+    with cached:
+        cached.readable(cached.size)
+        return cached.file.read()
+
+
+def settle(cache: VideoCache):
+    """Wait for background fills to be moved into the cache"""
+    deadline = time.monotonic() + 10
+    while cache._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not cache._pending
+
+
+def test_miss_then_hit(s3, tmp_path):
+    bucket_dir, endpoint = s3
+    data = video_bytes(3 * 1024 * 1024 + 17)
+    put(bucket_dir, 'a/story.mp4', data)
+    proxy = VideoProxy(CONFIG, VideoCache(str(tmp_path / 'cache'), 64 * 1024 * 1024), endpoint)
+
+    assert read_all(proxy.open(BUCKET, 'a/story.mp4', 'us-east-1')) == data
+    settle(proxy.cache)
+    assert read_all(proxy.open(BUCKET, 'a/story.mp4', 'us-east-1')) == data
+
+    stats = proxy.cache.stats()
+    assert (stats['misses'], stats['hits'], stats['entries'], stats['total_bytes']) == (1, 1, 1, len(data))
+
+
+def test_missing_object_raises_without_caching(s3, tmp_path):
+    _, endpoint = s3
+    proxy = VideoProxy(CONFIG, VideoCache(str(tmp_path / 'cache'), 1024), endpoint)
+    with pytest.raises(Exception) as error:
+        proxy.open(BUCKET, 'nope.mp4', 'us-east-1')
+    assert error.value.response['Error']['Code'] in ('NoSuchKey', '404')
+    assert proxy.cache.stats()['entries'] == 0
+    assert not list((tmp_path / 'cache').iterdir())
+
+
+def test_cache_survives_restart(s3, tmp_path):
+    bucket_dir, endpoint = s3
+    put(bucket_dir, 'story.mp4', video_bytes(1000))
+    proxy = VideoProxy(CONFIG, VideoCache(str(tmp_path / 'cache'), 10000), endpoint)
+    read_all(proxy.open(BUCKET, 'story.mp4', 'us-east-1'))
+    settle(proxy.cache)
+
+    cache = VideoCache(str(tmp_path / 'cache'), 10000)
+    assert read_all(cache.open(BUCKET, 'story.mp4', fetch=None)) == video_bytes(1000)
+    assert cache.stats()['hits'] == 1
+
+
+class GatedFetch:
+    """A fetch that hands out its first chunk, then waits to be released"""
+
+    def __init__(self, data: bytes, first: int):
+        self.data = data
+        self.first = first
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        return len(self.data), self.chunks()
+
+    def chunks(self):
+        yield self.data[:self.first]
+        assert self.release.wait(10)
+        yield self.data[self.first:]
+
+
+def test_miss_is_readable_while_filling(tmp_path):
+    data = video_bytes(5000)
+    fetch = GatedFetch(data, 1000)
+    cache = VideoCache(str(tmp_path / 'cache'), 100000)
+
+    cached = cache.open(BUCKET, 'story.mp4', fetch)
+    assert cached.size == len(data)
+    assert cached.readable(1000) == 1000
+    assert cached.file.read(1000) == data[:1000]
+    assert cache.stats()['entries'] == 0
+
+    fetch.release.set()
+    assert cached.readable(len(data)) == len(data)
+    assert cached.file.read() == data[1000:]
+    cached.close()
+
+
+def test_concurrent_misses_coalesce(tmp_path):
+    data = video_bytes(5000)
+    fetch = GatedFetch(data, 1000)
+    cache = VideoCache(str(tmp_path / 'cache'), 100000)
+
+    first = cache.open(BUCKET, 'story.mp4', fetch)
+    results = []
+    readers = [threading.Thread(target=lambda: results.append(read_all(cache.open(BUCKET, 'story.mp4', fetch))))
+               for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    fetch.release.set()
+    for reader in readers:
+        reader.join(10)
+
+    assert read_all(first) == data
+    assert results == [data] * 4
+    assert fetch.calls == 1
+    stats = cache.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] + stats['coalesced'] == 4
+
+
+def test_failed_fill_reaches_readers(tmp_path):
+    def fetch():
+        def chunks():
+            yield b'x' * 100
+            raise ConnectionError('reset')
+        return 1000, chunks()
+
+    cache = VideoCache(str(tmp_path / 'cache'), 100000)
+    cached = cache.open(BUCKET, 'story.mp4', fetch)
+    with pytest.raises(FillError):
+        cached.readable(1000)
+    cached.close()
+    assert cache.stats()['entries'] == 0
+    assert not list((tmp_path / 'cache').iterdir())
+
+
+def test_eviction_keeps_open_readers(s3, tmp_path):
+    bucket_dir, endpoint = s3
+    for name in 'abc':
+        put(bucket_dir, f'{name}.mp4', video_bytes(1000, seed=ord(name)))
+    proxy = VideoProxy(CONFIG, VideoCache(str(tmp_path / 'cache'), 2500), endpoint)
+
+    for name in 'abc':
+        read_all(proxy.open(BUCKET, f'{name}.mp4', 'us-east-1'))
+        settle(proxy.cache)
+        if name == 'a':
+            held = proxy.open(BUCKET, 'a.mp4', 'us-east-1')
+
+    stats = proxy.cache.stats()
+    assert (stats['entries'], stats['evictions'], stats['total_bytes']) == (2, 1, 2000)
+    # Evicted while open: the reader still has the whole object
+    assert read_all(held) == video_bytes(1000, seed=ord('a'))
+
+    read_all(proxy.open(BUCKET, 'a.mp4', 'us-east-1'))
+    assert proxy.cache.stats()['misses'] == 4
+
+
+def test_object_larger_than_cache_is_served_not_kept(s3, tmp_path):
+    bucket_dir, endpoint = s3
+    put(bucket_dir, 'small.mp4', video_bytes(100))
+    put(bucket_dir, 'big.mp4', video_bytes(5000))
+    proxy = VideoProxy(CONFIG, VideoCache(str(tmp_path / 'cache'), 1000), endpoint)
+
+    read_all(proxy.open(BUCKET, 'small.mp4', 'us-east-1'))
+    settle(proxy.cache)
+    assert read_all(proxy.open(BUCKET, 'big.mp4', 'us-east-1')) == video_bytes(5000)
+    settle(proxy.cache)
+    read_all(proxy.open(BUCKET, 'big.mp4', 'us-east-1'))
+    settle(proxy.cache)
+
+    stats = proxy.cache.stats()
+    assert (stats['entries'], stats['total_bytes'], stats['evictions']) == (1, 100, 0)
+    assert stats['misses'] == 3
+
+
+@pytest.fixture
+def proxy_server(s3, tmp_path):
+    bucket_dir, endpoint = s3
+    cache = VideoCache(str(tmp_path / 'cache'), 64 * 1024 * 1024)
+    handler = type('Handler', (CustomHandler,), {
+        'video_proxy': VideoProxy(CONFIG, cache, endpoint),
+        'log_message': lambda self, *args: None,
+    })
+    server = ThreadingServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield bucket_dir, f'http://{host}:{port}', cache
+    server.shutdown()
+    server.server_close()
+
+
+def get(url: str, range_header: str = None):
+    request = urllib.request.Request(url, headers={'Range': range_header} if range_header else {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+@pytest.mark.parametrize('warm', [False, True])
+def test_proxy_range_requests(proxy_server, warm):
+    bucket_dir, base, cache = proxy_server
+    data = video_bytes(2 * 1024 * 1024 + 5)
+    put(bucket_dir, 'clips/story.mp4', data)
+    url = f'{base}/video/dev/clips/story.mp4'
+    if warm:
+        get(url)
+        settle(cache)
+
+    status, headers, body = get(url, 'bytes=1048570-1048580')
+    assert status == 206
+    assert headers['Content-Range'] == f'bytes 1048570-1048580/{len(data)}'
+    assert body == data[1048570:1048581]
+
+    status, headers, body = get(url, 'bytes=-10')
+    assert (status, body) == (206, data[-10:])
+
+    status, headers, body = get(url)
+    assert status == 200
+    assert headers['Content-Type'] == 'video/mp4'
+    assert int(headers['Content-Length']) == len(data)
+    assert body == data
+
+    status, headers, _ = get(url, f'bytes={len(data)}-')
+    assert status == 416
+    assert headers['Content-Range'] == f'bytes */{len(data)}'
+
+    settle(cache)
+    stats = cache.stats()
+    assert (stats['misses'], stats['entries']) == (1, 1)
+
+
+def test_proxy_counts_bytes_sent(proxy_server):
+    bucket_dir, base, _ = proxy_server
+    data = video_bytes(3 * 1024 * 1024)
+    put(bucket_dir, 'story.mp4', data)
+    url = f'{base}/video/dev/story.mp4'
+
+    before = BYTES_SENT._values.get(('video_proxy',), 0)
+    get(url, 'bytes=100-2099999')
+    get(url)
+    expected = before + 2100000 - 100 + len(data)
+    deadline = time.monotonic() + 5
+    while BYTES_SENT._values.get(('video_proxy',), 0) != expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert BYTES_SENT._values.get(('video_proxy',), 0) == expected
+
+
+def test_proxy_unknown_video(proxy_server):
+    _, base, _ = proxy_server
+    assert get(f'{base}/video/dev/missing.mp4')[0] == 404
+    assert get(f'{base}/video/nostage/story.mp4')[0] == 404
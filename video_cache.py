@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Size-bounded on-disk LRU cache for S3 video objects.
+
+Used by serve.py's optional video proxy (--proxy) so that repeat plays of the
+same story are served from local disk instead of going back to S3 through a
+presigned URL every time.
+
+- Objects are stored under the cache directory, named by a hash of bucket/key
+- Least recently used files are evicted once the total size exceeds the limit
+- Concurrent misses for the same object are coalesced into a single S3 fetch
+- A miss is served from the fill's temp file as it is written, not after the
+  whole object has been downloaded
+- Objects larger than the whole cache are streamed through but not kept
+- File mtimes track recency, so the LRU order survives server restarts
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Optional, Tuple
+
+
+class FillError(IOError):
+    """An object's fetch failed or ended short; readers of the fill get this"""
+
+
+class _PendingFill:
+    """
+    A fetch in progress, written to a temp file that readers follow as it grows
+
+    size is set once the object's length is known; written counts the bytes
+    flushed to the file so far. Both, and done/error, change under `changed`.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.size: Optional[int] = None
+        self.written = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.changed = threading.Condition()
+
+    def wait_for(self, end: int) -> int:
+        """Block until `end` bytes are in the file or the fetch ended; returns the bytes available"""
+        with self.changed:
+            while self.written < end and not self.done:
+                self.changed.wait()
+            if self.written < end and self.error is not None:
+                raise FillError(f"Fetch failed after {self.written} bytes: {self.error}") from self.error
+            return self.written
+
+
+class CachedObject:
+    """
+    An open cached object: a finished cache file, or a fill still being written
+
+    Readers call readable(end) before reading past what they've already
+    read; on a finished file it returns the size straight away. The file is
+    held open, so eviction (which only unlinks) never affects a reader.
+    """
+    def __init__(self, f: BinaryIO, size: int, fill: Optional[_PendingFill] = None):
+        self.file = f
+        self.size = size
+        self._fill = fill
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def readable(self, end: int) -> int:
+        """
+        Wait until the first `end` bytes can be read
+
+        Returns:
+            int: Bytes that can be read now (at least min(end, size))
+
+        Raises:
+            FillError: If the fetch failed before reaching `end`
+        """
+        if self._fill is None:
+            return self.size
+        return self._fill.wait_for(min(end, self.size))
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class VideoCache:
+    """
+    On-disk LRU cache keyed by (bucket, key)
+
+    Args:
+        cache_dir: Directory holding cached objects (created if missing)
+        max_bytes: Total size limit; older entries are evicted beyond this
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # name -> size, oldest first
+        self._pending = {}
+        self.total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+        self._load_existing()
+
+    def _load_existing(self):
+        """Rebuild the LRU order from files left by a previous run"""
+        files = []
+        for path in self.cache_dir.iterdir():
+            if path.name.startswith('.fill-'):
+                # Partial download from an interrupted run
+                path.unlink()
+            elif path.is_file() and not path.name.startswith('.'):
+                stat = path.stat()
+                files.append((stat.st_mtime, path.name, stat.st_size))
+
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.total_bytes += size
+
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def cache_name(bucket: str, key: str) -> str:
+        """File name for an object, keeping the extension for content-type guessing"""
+        digest = hashlib.sha256(f"{bucket}/{key}".encode('utf-8')).hexdigest()
+        suffix = Path(key).suffix.lower()
+        return digest + suffix if len(suffix) <= 8 else digest
+
+    def _evict(self):
+        """Drop least recently used entries until under the size limit (lock held)"""
+        # Never evict the most recent entry, even if it alone exceeds the limit
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evictions += 1
+            try:
+                (self.cache_dir / name).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _open_hit(self, name: str) -> Optional[CachedObject]:
+        """Open a cached entry and mark it most recently used (lock held)"""
+        if name not in self._entries:
+            return None
+        path = self.cache_dir / name
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            # Removed behind our back; forget it and refetch
+            self.total_bytes -= self._entries.pop(name)
+            return None
+        self._entries.move_to_end(name)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return CachedObject(f, os.fstat(f.fileno()).st_size)
+
+    def open(self, bucket: str, key: str, fetch: Callable[[], Tuple[int, Iterable[bytes]]]) -> CachedObject:
+        """
+        Open a cached object, starting a fetch on a miss
+
+        A miss returns as soon as the object's size is known: the fetch
+        continues in the background into a temp file, which this and any
+        concurrent request for the same object read as it grows.
+
+        Args:
+            bucket: S3 bucket name
+            key: S3 object key
+            fetch: Returns the object's size and an iterable of its bytes
+
+        Returns:
+            CachedObject: The open object. The caller is responsible for closing it.
+
+        Raises:
+            Whatever fetch raised, if the object's size couldn't be had
+        """
+        name = self.cache_name(bucket, key)
+
+        with self._lock:
+            cached = self._open_hit(name)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            pending = self._pending.get(name)
+            if pending is None:
+                fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix='.fill-')
+                pending = _PendingFill(tmp_path)
+                self._pending[name] = pending
+                self.misses += 1
+                threading.Thread(target=self._fill, args=(name, pending, fd, fetch),
+                                 name=f'fill-{name[:12]}', daemon=True).start()
+            else:
+                self.coalesced += 1
+            # The temp file is only renamed or removed under the lock, after
+            # the fill leaves _pending, so it still exists here
+            f = open(pending.path, 'rb')
+
+        with pending.changed:
+            while pending.size is None and not pending.done:
+                pending.changed.wait()
+        if pending.size is None:
+            f.close()
+            raise pending.error
+        return CachedObject(f, pending.size, pending)
+
+    def _fill(self, name: str, pending: _PendingFill, fd: int, fetch: Callable[[], Tuple[int, Iterable[bytes]]]):
+        """Fetch an object into its temp file, then move it into place (runs in its own thread)"""
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                size, chunks = fetch()
+                with pending.changed:
+                    pending.size = size
+                    pending.changed.notify_all()
+                for chunk in chunks:
+                    tmp.write(chunk)
+                    tmp.flush()
+                    with pending.changed:
+                        pending.written += len(chunk)
+                        pending.changed.notify_all()
+            if pending.written != size:
+                raise FillError(f"Expected {size} bytes, got {pending.written}")
+
+            with self._lock:
+                self._pending.pop(name, None)
+                if size > self.max_bytes:
+                    # Served to the requests reading it, but caching it would flush everything else
+                    os.unlink(pending.path)
+                else:
+                    os.replace(pending.path, self.cache_dir / name)
+                    self.total_bytes -= self._entries.pop(name, 0)
+                    self._entries[name] = size
+                    self.total_bytes += size
+                    self._evict()
+        except BaseException as e:
+            with self._lock:
+                self._pending.pop(name, None)
+            try:
+                os.unlink(pending.path)
+            except FileNotFoundError:
+                pass
+            pending.error = e
+        finally:
+            with pending.changed:
+                pending.done = True
+                pending.changed.notify_all()
+
+    def stats(self) -> dict:
+        """Snapshot of cache counters"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'evictions': self.evictions,
+            }